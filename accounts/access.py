@@ -0,0 +1,152 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Role flags in bit order; the order is only used in-process and in the
+# role cache, never stored in the database.
+PERMISSION_FLAGS = (
+    'can_create_tasks',
+    'can_edit_tasks',
+    'can_delete_tasks',
+    'can_assign_tasks',
+    'can_create_projects',
+    'can_edit_projects',
+    'can_delete_projects',
+    'can_manage_team',
+    'can_invite_members',
+    'can_remove_members',
+    'can_view_reports',
+    'can_manage_settings',
+)
+PERMISSION_BITS = {flag: 1 << index for index, flag in enumerate(PERMISSION_FLAGS)}
+
+# Users without a role (no profile, or a deleted role) are named members
+# (see UserProfile.role_name) but are granted no flags
+# (see UserProfile.has_permission); /me still reports the member defaults
+# below. Users without a profile also fail every role check.
+DEFAULT_ROLE_NAME = 'member'
+DEFAULT_ROLE_MASK = 0
+DEFAULT_REPORTED_MASK = PERMISSION_BITS['can_create_tasks'] | PERMISSION_BITS['can_edit_tasks']
+
+ROLE_CACHE_VERSION_KEY = 'role-permissions:version'
+ROLE_CACHE_TIMEOUT = 3600
+
+_REQUEST_ATTR = '_permission_set'
+
+
+def role_mask(role):
+    mask = 0
+    for flag, bit in PERMISSION_BITS.items():
+        if getattr(role, flag):
+            mask |= bit
+    return mask
+
+
+class PermissionSet:
+    """
+    A user's role and role flags, as a name plus a bitmask. `reported_mask`
+    is what flags() shows when it differs from the granted mask (users
+    without a role).
+    """
+
+    __slots__ = ('role_name', 'role_display_name', 'mask', 'is_superuser', 'has_profile', 'reported_mask')
+
+    def __init__(self, role_name, role_display_name, mask, is_superuser=False, has_profile=True,
+                 reported_mask=None):
+        self.role_name = role_name
+        self.role_display_name = role_display_name
+        self.mask = mask
+        self.is_superuser = is_superuser
+        self.has_profile = has_profile
+        self.reported_mask = mask if reported_mask is None else reported_mask
+
+    def has(self, flag):
+        return self.is_superuser or bool(self.mask & PERMISSION_BITS[flag])
+
+    def has_role(self, *names):
+        return self.is_superuser or (self.has_profile and self.role_name in names)
+
+    def role(self):
+        return {'name': self.role_name, 'display_name': self.role_display_name}
+
+    def flags(self):
+        """The role's flags by name, as reported (superuser status is not folded in)."""
+        return {flag: bool(self.reported_mask & bit) for flag, bit in PERMISSION_BITS.items()}
+
+
+def invalidate_role_permissions():
+    if not settings.SHARED_CACHE:
+        return
+    cache.set(ROLE_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _role_entry(role):
+    return role.name, role.get_name_display(), role_mask(role)
+
+
+def _load_role_table():
+    from .models import Role
+
+    return {role.id: _role_entry(role) for role in Role.objects.all()}
+
+
+def get_role_table():
+    """role id -> (name, display name, mask) for every role, cached when the cache is shared."""
+    if not settings.SHARED_CACHE:
+        return _load_role_table()
+    version = cache.get(ROLE_CACHE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(ROLE_CACHE_VERSION_KEY, version, None)
+    key = f'role-permissions:table:{version}'
+    table = cache.get(key)
+    if table is None:
+        table = _load_role_table()
+        cache.set(key, table, ROLE_CACHE_TIMEOUT)
+    return table
+
+
+def permission_set_for_role(role_id, is_superuser=False, has_profile=True, role=None):
+    """`role` is the Role row when it was already loaded with the profile."""
+    if role is not None:
+        entry = _role_entry(role)
+    else:
+        entry = get_role_table().get(role_id) if role_id is not None else None
+    if entry is None:
+        return PermissionSet(
+            DEFAULT_ROLE_NAME, 'Member', DEFAULT_ROLE_MASK, is_superuser, has_profile, DEFAULT_REPORTED_MASK,
+        )
+    return PermissionSet(*entry, is_superuser, has_profile)
+
+
+def _profile_role(user):
+    """(has a profile, the profile's role id, the Role if select_related loaded it)."""
+    from .models import UserProfile
+
+    descriptor = user._meta.model.profile
+    if descriptor.is_cached(user):
+        # select_related('profile') already ran (None if there is no profile).
+        profile = descriptor.related.get_cached_value(user)
+        if profile is None:
+            return False, None, None
+        role_field = UserProfile._meta.get_field('role')
+        role = role_field.get_cached_value(profile) if role_field.is_cached(profile) else None
+        return True, profile.role_id, role
+    row = UserProfile.objects.filter(user_id=user.pk).values_list('role_id').first()
+    return (True, row[0], None) if row is not None else (False, None, None)
+
+
+def resolve_permissions(user):
+    """
+    The PermissionSet of `user`, resolved once per user object (i.e. once per
+    request). A role loaded with select_related('profile__role') is used as
+    is; otherwise one query reads the profile's role id and the flags come
+    from the role table.
+    """
+    permission_set = getattr(user, _REQUEST_ATTR, None)
+    if permission_set is None:
+        has_profile, role_id, role = _profile_role(user)
+        permission_set = permission_set_for_role(role_id, user.is_superuser, has_profile, role)
+        setattr(user, _REQUEST_ATTR, permission_set)
+    return permission_set
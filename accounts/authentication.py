@@ -0,0 +1,96 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .access import ROLE_CACHE_VERSION_KEY
+
+# Per-process snapshots of authenticated users (with profile and role).
+# Values are pickled, so every request gets its own User instance.
+_snapshots = LocMemCache('jwt-users', {
+    'TIMEOUT': settings.JWT_USER_CACHE_TIMEOUT,
+    'OPTIONS': {'MAX_ENTRIES': 10000},
+})
+
+
+def _version_key(user_id):
+    return f'auth-user:version:{user_id}'
+
+
+def invalidate_auth_user(user_id):
+    """Drop every process's snapshot of the user (the version lives in the shared cache)."""
+    invalidate_auth_users([user_id])
+
+
+def invalidate_auth_users(user_ids):
+    """
+    invalidate_auth_user for many users. QuerySet.update() sends no signals, so
+    bulk updates of users (e.g. deactivating them) must call this themselves;
+    UserProfile.objects.update() already does.
+    """
+    if not settings.SHARED_CACHE:
+        return
+    cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in set(user_ids)}, None)
+
+
+def _snapshot_key(user_id):
+    versions = cache.get_many([_version_key(user_id), ROLE_CACHE_VERSION_KEY])
+    user_version = versions.get(_version_key(user_id))
+    if user_version is None:
+        user_version = uuid.uuid4().hex
+        cache.set(_version_key(user_id), user_version, None)
+    # Role flags are part of the snapshot, so a Role edit retires it too.
+    return f'{user_id}:{user_version}:{versions.get(ROLE_CACHE_VERSION_KEY, "")}'
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves the user, profile and role from a short
+    lived per-process snapshot instead of a query per request; a warm request
+    only reads the two version keys from the shared cache. Snapshots are keyed
+    by a per-user version that is bumped whenever the user or their profile is
+    saved or bulk-updated (password change or reset, role change,
+    deactivation) and by the role table version. Without a shared cache
+    (SHARED_CACHE) versions cannot reach the other workers, so the user is
+    loaded with one query per request instead.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        if settings.SHARED_CACHE:
+            key = _snapshot_key(user_id)
+            user = _snapshots.get(key)
+        else:
+            key = user = None
+        if user is None:
+            try:
+                user = (
+                    self.user_model.objects
+                    .select_related('profile__role')
+                    .get(**{api_settings.USER_ID_FIELD: user_id})
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            if key is not None:
+                _snapshots.set(key, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
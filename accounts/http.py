@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # Optional: async callers then use the pooled session in a thread.
+    httpx = None
+
+POOL_SIZE = 10
+
+_local = threading.local()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def pooled_session():
+    """
+    This thread's keep-alive session for outbound API calls. Connections to
+    a host are reused across requests instead of a TCP/TLS handshake each.
+    No automatic retries: callers pass explicit timeouts and decide.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _local.session = session
+    return session
+
+
+def async_client():
+    """The running loop's shared httpx.AsyncClient, or None without httpx."""
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=POOL_SIZE))
+        _async_clients[loop] = client
+    return client
+
+
+class UpstreamError(Exception):
+    """An outbound call failed: connection error, timeout or a non-JSON body."""
+
+
+_TRANSPORT_ERRORS = (requests.RequestException, ValueError) + ((httpx.HTTPError,) if httpx else ())
+
+
+async def afetch_json(method, url, *, connect_timeout, read_timeout, **kwargs):
+    """
+    (status code, decoded JSON body) of an outbound call made from async
+    code, on the loop's pooled httpx client, or on this module's pooled
+    requests session in a worker thread when httpx is not installed.
+    `kwargs` are the ones both libraries accept (headers, data, params).
+    """
+    client = async_client()
+    try:
+        if client is None:
+            def fetch():
+                return pooled_session().request(method, url, timeout=(connect_timeout, read_timeout), **kwargs)
+            response = await sync_to_async(fetch, thread_sensitive=False)()
+        else:
+            response = await client.request(
+                method, url, timeout=httpx.Timeout(read_timeout, connect=connect_timeout), **kwargs,
+            )
+        return response.status_code, response.json()
+    except _TRANSPORT_ERRORS as exc:
+        raise UpstreamError(str(exc)) from exc
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after `failure_threshold` consecutive
+    failures; after `reset_timeout` seconds one trial call is let through,
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
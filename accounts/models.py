@@ -1,8 +1,19 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .access import invalidate_role_permissions
+from .authentication import invalidate_auth_user, invalidate_auth_users
+
+
+class RoleQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Bulk updates send no post_save, so retire the cached role table here."""
+        updated = super().update(**kwargs)
+        invalidate_role_permissions()
+        return updated
+
 
 class Role(models.Model):
     """Роли пользователей"""
@@ -38,6 +49,8 @@ class Role(models.Model):
     can_manage_settings = models.BooleanField(default=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = RoleQuerySet.as_manager()
     
     def __str__(self):
         return self.get_name_display()
@@ -46,6 +59,16 @@ class Role(models.Model):
         ordering = ['name']
 
 
+class UserProfileQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Bulk updates send no post_save, so retire the users' JWT snapshots here."""
+        with transaction.atomic():
+            user_ids = list(self.order_by().values_list('user_id', flat=True))
+            updated = super().update(**kwargs)
+        invalidate_auth_users(user_ids)
+        return updated
+
+
 class UserProfile(models.Model):
     """Расширенный профиль пользователя"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -59,6 +82,8 @@ class UserProfile(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserProfileQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.user.username}'s profile"
@@ -77,4 +102,22 @@ class UserProfile(models.Model):
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         default_role = Role.objects.filter(name='member').first()
-        UserProfile.objects.get_or_create(user=instance, defaults={'role': default_role})
\ No newline at end of file
+        UserProfile.objects.get_or_create(user=instance, defaults={'role': default_role})
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_cache(sender, **kwargs):
+    invalidate_role_permissions()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    invalidate_auth_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_snapshot(sender, instance, **kwargs):
+    invalidate_auth_user(instance.user_id)
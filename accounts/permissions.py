@@ -1,81 +1,55 @@
 from rest_framework import permissions
 
+from .access import resolve_permissions
+
+
+class RolePermission(permissions.BasePermission):
+    """Base: authenticated users whose role grants `flag` or is one of `roles`."""
+    flag = None
+    roles = ()
 
-class IsAdmin(permissions.BasePermission):
-    """Только админы"""
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.role_name == 'admin'
+        permission_set = resolve_permissions(request.user)
+        if self.flag is not None:
+            return permission_set.has(self.flag)
+        return permission_set.has_role(*self.roles)
 
 
-class IsManagerOrAdmin(permissions.BasePermission):
+class IsAdmin(RolePermission):
+    """Только админы"""
+    roles = ('admin',)
+
+
+class IsManagerOrAdmin(RolePermission):
     """Менеджеры и админы"""
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.role_name in ['admin', 'manager']
+    roles = ('admin', 'manager')
 
 
-class IsMemberOrAbove(permissions.BasePermission):
+class IsMemberOrAbove(RolePermission):
     """Member, Manager, Admin"""
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.role_name in ['admin', 'manager', 'member']
+    roles = ('admin', 'manager', 'member')
 
 
-class CanCreateTasks(permissions.BasePermission):
+class CanCreateTasks(RolePermission):
     """Может создавать задачи"""
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.has_permission('can_create_tasks')
+    flag = 'can_create_tasks'
 
 
-class CanEditTasks(permissions.BasePermission):
+class CanEditTasks(RolePermission):
     """Может редактировать задачи"""
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.has_permission('can_edit_tasks')
+    flag = 'can_edit_tasks'
 
 
-class CanDeleteTasks(permissions.BasePermission):
+class CanDeleteTasks(RolePermission):
     """Может удалять задачи"""
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.has_permission('can_delete_tasks')
+    flag = 'can_delete_tasks'
 
 
-class CanManageTeam(permissions.BasePermission):
+class CanManageTeam(RolePermission):
     """Может управлять командой"""
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.is_superuser:
-            return True
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.has_permission('can_manage_team')
+    flag = 'can_manage_team'
 
 
 class IsOwnerOrAdmin(permissions.BasePermission):
@@ -96,11 +70,10 @@ class IsOwnerOrAdmin(permissions.BasePermission):
                 return True
         
         # Проверяем роль
-        profile = getattr(request.user, 'profile', None)
-        return profile and profile.role_name == 'admin'
+        return resolve_permissions(request.user).has_role('admin')
 
 
 class ReadOnly(permissions.BasePermission):
     """Только чтение"""
     def has_permission(self, request, view):
-        return request.method in permissions.SAFE_METHODS
\ No newline at end of file
+        return request.method in permissions.SAFE_METHODS
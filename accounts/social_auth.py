@@ -1,4 +1,9 @@
+import functools
+import json
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
@@ -12,6 +17,9 @@ from dj_rest_auth.registration.views import SocialLoginView
 
 from django.contrib.auth import get_user_model
 
+from .http import UpstreamError
+from .oauth import OAuthError, get_provider
+
 User = get_user_model()
 
 
@@ -29,185 +37,95 @@ class GitHubLogin(SocialLoginView):
     client_class = OAuth2Client
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def google_auth(request):
+def async_post_endpoint(view):
     """
-    Получает access_token от Google и создаёт/входит пользователя
+    POST-only, CSRF-exempt JSON endpoint around an async view (the token
+    exchange is not session-authenticated, as with the DRF views before).
+    Django 4.2's own view decorators only wrap sync views.
     """
-    access_token = request.data.get('access_token')
-    
-    if not access_token:
-        return Response(
-            {'error': 'Access token is required'},
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        return await view(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+def _login_response(profile):
+    """Создаёт/находит пользователя и выдаёт JWT токены"""
+    user, created = User.objects.get_or_create(
+        email=profile['email'],
+        defaults={
+            'username': profile['username'],
+            'first_name': profile['first_name'],
+            'last_name': profile['last_name'],
+        }
+    )
+    refresh = RefreshToken.for_user(user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'user': {
+            'id': user.id,
+            'email': user.email,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+        },
+        'created': created
+    }
+
+
+async def _social_login(request, provider_name, credential_field, missing_message):
+    provider = get_provider(provider_name)
+    credential = _request_data(request).get(credential_field)
+    if not credential:
+        return JsonResponse({'error': missing_message}, status=status.HTTP_400_BAD_REQUEST)
+    if not provider.is_configured():
+        return JsonResponse(
+            {'error': f'{provider.display_name} OAuth is not configured'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    google_client_id = settings.SOCIALACCOUNT_PROVIDERS['google']['APP']['client_id']
-    if not google_client_id:
-        return Response(
-            {'error': 'Google OAuth is not configured'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
     try:
-        # Получаем информацию о пользователе от Google
-        import requests
-        google_response = requests.get(
-            'https://www.googleapis.com/oauth2/v3/userinfo',
-            headers={'Authorization': f'Bearer {access_token}'}
-        )
-        
-        if google_response.status_code != 200:
-            return Response(
-                {'error': 'Invalid Google token'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        google_data = google_response.json()
-        email = google_data.get('email')
-        
-        if not email:
-            return Response(
-                {'error': 'Email not provided by Google'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Создаём или получаем пользователя
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'username': email.split('@')[0],
-                'first_name': google_data.get('given_name', ''),
-                'last_name': google_data.get('family_name', ''),
-            }
-        )
-        
-        # Генерируем JWT токены
-        refresh = RefreshToken.for_user(user)
-        
-        return Response({
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-            },
-            'created': created
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        profile = await provider.fetch_profile(credential)
+    except OAuthError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except UpstreamError:
+        return JsonResponse(
+            {'error': f'{provider.display_name} is not responding, please try again'},
+            status=status.HTTP_502_BAD_GATEWAY
         )
 
+    return JsonResponse(await sync_to_async(_login_response)(profile))
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def github_auth(request):
+
+@async_post_endpoint
+async def google_auth(request):
     """
-    Получает code от GitHub и создаёт/входит пользователя
+    Получает access_token от Google и создаёт/входит пользователя
     """
-    code = request.data.get('code')
-    
-    if not code:
-        return Response(
-            {'error': 'Authorization code is required'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    return await _social_login(request, 'google', 'access_token', 'Access token is required')
 
-    github_client_id = settings.SOCIALACCOUNT_PROVIDERS['github']['APP']['client_id']
-    github_client_secret = settings.SOCIALACCOUNT_PROVIDERS['github']['APP']['secret']
-    if not github_client_id or not github_client_secret:
-        return Response(
-            {'error': 'GitHub OAuth is not configured'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    try:
-        import requests
-        
-        # Обмениваем code на access_token
-        token_response = requests.post(
-            'https://github.com/login/oauth/access_token',
-            data={
-                'client_id': github_client_id,
-                'client_secret': github_client_secret,
-                'code': code,
-            },
-            headers={'Accept': 'application/json'}
-        )
-        
-        token_data = token_response.json()
-        access_token = token_data.get('access_token')
-        
-        if not access_token:
-            return Response(
-                {'error': 'Failed to get access token from GitHub'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Получаем информацию о пользователе
-        user_response = requests.get(
-            'https://api.github.com/user',
-            headers={'Authorization': f'Bearer {access_token}'}
-        )
-        github_data = user_response.json()
-        
-        # Получаем email (может быть приватным)
-        email = github_data.get('email')
-        if not email:
-            emails_response = requests.get(
-                'https://api.github.com/user/emails',
-                headers={'Authorization': f'Bearer {access_token}'}
-            )
-            emails = emails_response.json()
-            for e in emails:
-                if e.get('primary'):
-                    email = e.get('email')
-                    break
-        
-        if not email:
-            return Response(
-                {'error': 'Email not provided by GitHub'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Создаём или получаем пользователя
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'username': github_data.get('login', email.split('@')[0]),
-                'first_name': github_data.get('name', '').split()[0] if github_data.get('name') else '',
-                'last_name': ' '.join(github_data.get('name', '').split()[1:]) if github_data.get('name') else '',
-            }
-        )
-        
-        # Генерируем JWT токены
-        refresh = RefreshToken.for_user(user)
-        
-        return Response({
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-            },
-            'created': created
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+
+@async_post_endpoint
+async def github_auth(request):
+    """
+    Получает code от GitHub и создаёт/входит пользователя
+    """
+    return await _social_login(request, 'github', 'code', 'Authorization code is required')
 
 
 @api_view(['GET'])
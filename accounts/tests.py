@@ -0,0 +1,384 @@
+import asyncio
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .access import resolve_permissions
+from .authentication import invalidate_auth_users
+from .captcha import CAPTCHA_ERRORS, REJECTED, UNAVAILABLE, VERIFIED, RecaptchaBackend, StubCaptchaBackend
+from .http import CircuitBreaker, UpstreamError
+from .models import Role, UserProfile
+from .oauth import GitHubProvider, GoogleProvider
+from .permissions import CanCreateTasks, IsMemberOrAbove
+
+User = get_user_model()
+
+
+class RolePermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member_role = Role.objects.create(name='member', can_create_tasks=True, can_edit_tasks=True)
+        self.user = User.objects.create_user('member', 'member@example.com', 'pass')
+
+    def permissions(self):
+        # A fresh user object: permissions are resolved once per instance.
+        return resolve_permissions(User.objects.get(pk=self.user.pk))
+
+    def test_role_flags(self):
+        permission_set = self.permissions()
+        self.assertEqual(permission_set.role_name, 'member')
+        self.assertTrue(permission_set.has('can_create_tasks'))
+        self.assertFalse(permission_set.has('can_delete_tasks'))
+
+    def check(self, permission_class):
+        request = Request(RequestFactory().get('/'))
+        request.user = User.objects.get(pk=self.user.pk)
+        return permission_class().has_permission(request, None)
+
+    def test_user_without_profile(self):
+        # As in UserProfile: no flags, and no role checks passed without a profile.
+        UserProfile.objects.filter(user=self.user).delete()
+        permission_set = self.permissions()
+        self.assertEqual(permission_set.role_name, 'member')
+        self.assertFalse(permission_set.has('can_create_tasks'))
+        self.assertFalse(self.check(IsMemberOrAbove))
+        self.assertFalse(self.check(CanCreateTasks))
+
+    def test_user_without_role(self):
+        UserProfile.objects.filter(user=self.user).update(role=None)
+        self.assertFalse(self.permissions().has('can_create_tasks'))
+        self.assertTrue(self.check(IsMemberOrAbove))
+        self.assertFalse(self.check(CanCreateTasks))
+
+    def test_me_reports_member_defaults_without_role(self):
+        client = APIClient()
+        for remove_role in (
+            lambda: UserProfile.objects.filter(user=self.user).update(role=None),
+            lambda: UserProfile.objects.filter(user=self.user).delete(),
+        ):
+            remove_role()
+            client.force_authenticate(User.objects.get(pk=self.user.pk))
+            data = client.get('/api/auth/me/').json()
+            self.assertEqual(data['role'], {'name': 'member', 'display_name': 'Member'})
+            self.assertTrue(data['permissions']['can_create_tasks'])
+            self.assertTrue(data['permissions']['can_edit_tasks'])
+            self.assertFalse(data['permissions']['can_delete_tasks'])
+
+    def test_deleted_role_grants_nothing(self):
+        self.member_role.delete()
+        self.assertEqual(UserProfile.objects.get(user=self.user).role, None)
+        self.assertFalse(self.permissions().has('can_create_tasks'))
+
+    def test_role_changes_are_picked_up(self):
+        self.assertTrue(self.permissions().has('can_create_tasks'))
+        self.member_role.can_create_tasks = False
+        self.member_role.save()
+        self.assertFalse(self.permissions().has('can_create_tasks'))
+
+    def test_superuser_has_every_flag(self):
+        self.user.is_superuser = True
+        self.user.save()
+        UserProfile.objects.filter(user=self.user).update(role=None)
+        self.assertTrue(self.permissions().has('can_manage_settings'))
+
+    def test_me_reports_role_and_flags(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get('/api/auth/me/').json()
+        self.assertEqual(data['role']['name'], 'member')
+        self.assertTrue(data['permissions']['can_edit_tasks'])
+        self.assertFalse(data['permissions']['can_manage_team'])
+
+
+class UserListTests(TestCase):
+    url = '/api/auth/users/'
+
+    def setUp(self):
+        cache.clear()
+        self.manager_role = Role.objects.create(name='manager', can_manage_team=True)
+        self.users = [User.objects.create_user(f'user{index}', f'user{index}@example.com', 'pass') for index in range(7)]
+        UserProfile.objects.filter(user__in=self.users[:2]).update(role=self.manager_role)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def walk(self, params):
+        names, url = [], self.url
+        while url:
+            data = self.client.get(url, params).json()
+            names.extend(user['username'] for user in data['results'])
+            url, params = data['next'], None
+        return names
+
+    def test_cursor_walks_newest_first(self):
+        self.assertEqual(self.walk({'page_size': 3}), [f'user{index}' for index in range(6, -1, -1)])
+
+    def test_search(self):
+        User.objects.create_user('someone', 'user3-alias@example.org', 'pass')
+        self.assertEqual(self.walk({'search': 'USER3'}), ['someone', 'user3'])
+
+    def test_role_filter(self):
+        UserProfile.objects.filter(user=self.users[2]).delete()
+        self.assertEqual(self.walk({'role': 'manager'}), ['user1', 'user0'])
+        # Users without a profile or a role are listed as members.
+        self.assertEqual(self.walk({'role': 'member'}), ['user6', 'user5', 'user4', 'user3', 'user2'])
+        self.assertEqual(self.walk({'role': 'admin'}), [])
+
+    def test_query_count_does_not_grow_with_users(self):
+        # One query: the page, with profiles and roles joined in.
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data['results']), 7)
+        self.assertEqual(data['results'][-1]['role']['name'], 'manager')
+        for index in range(7, 20):
+            User.objects.create_user(f'user{index}', f'user{index}@example.com', 'pass')
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get(self.url).json()['results']), 20)
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedJWTAuthenticationTests(TestCase):
+    url = '/api/auth/me/'
+
+    def setUp(self):
+        cache.clear()
+        self.member_role = Role.objects.create(name='member', can_create_tasks=True)
+        self.admin_role = Role.objects.create(name='admin', can_manage_settings=True)
+        self.user = User.objects.create_user('member', 'member@example.com', 'pass')
+        self.client = APIClient()
+        self.authenticate()
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def me(self):
+        return self.client.get(self.url)
+
+    def test_warm_request_takes_no_queries(self):
+        self.me()
+        with self.assertNumQueries(0):
+            response = self.me()
+        self.assertEqual(response.json()['role']['name'], 'member')
+
+    def test_without_shared_cache_user_is_read_per_request(self):
+        with self.settings(SHARED_CACHE=False):
+            self.me()
+            # The user with profile and role; the role needs no second read.
+            with self.assertNumQueries(1):
+                self.me()
+
+    def test_role_change_retires_snapshot(self):
+        self.me()
+        profile = UserProfile.objects.get(user=self.user)
+        profile.role = self.admin_role
+        profile.save()
+        self.assertEqual(self.me().json()['role']['name'], 'admin')
+
+    def test_bulk_role_change_retires_snapshot(self):
+        self.me()
+        UserProfile.objects.filter(user=self.user).update(role=self.admin_role)
+        self.assertEqual(self.me().json()['role']['name'], 'admin')
+
+    def test_bulk_role_flag_change_retires_snapshot(self):
+        self.assertTrue(self.me().json()['permissions']['can_create_tasks'])
+        Role.objects.filter(pk=self.member_role.pk).update(can_create_tasks=False)
+        self.assertFalse(self.me().json()['permissions']['can_create_tasks'])
+
+    def test_deactivated_user_is_rejected(self):
+        self.me()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_bulk_deactivation_with_invalidation_is_rejected(self):
+        self.me()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        invalidate_auth_users([self.user.pk])
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_password_change_retires_snapshot(self):
+        # simplejwt binds its settings at import, so override_settings cannot reach them.
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.authenticate()
+            self.assertEqual(self.me().status_code, 200)
+            response = self.client.post(
+                '/api/auth/change-password/',
+                {'old_password': 'pass', 'new_password': 'n3w-Passw0rd!', 'new_password2': 'n3w-Passw0rd!'},
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(self.me().status_code, 401)
+            self.user.refresh_from_db()
+            self.authenticate()
+            self.assertEqual(self.me().status_code, 200)
+
+
+class CaptchaTests(TestCase):
+    def test_stub_backend(self):
+        backend = StubCaptchaBackend()
+        self.assertEqual(backend.verify('pass'), VERIFIED)
+        self.assertEqual(backend.verify('wrong'), REJECTED)
+        self.assertEqual(backend.verify('unavailable'), UNAVAILABLE)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        with mock.patch('accounts.http.time.monotonic', return_value=100.0) as monotonic:
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+            # Half-open: one trial call after the timeout; a failure re-opens.
+            monotonic.return_value = 131.0
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+            monotonic.return_value = 162.0
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.is_open)
+
+    @override_settings(RECAPTCHA_PRIVATE_KEY='secret')
+    def test_siteverify_outage_opens_circuit(self):
+        backend = RecaptchaBackend()
+        session = mock.Mock()
+        session.post.side_effect = requests.ConnectionError
+        with mock.patch('accounts.captcha.pooled_session', return_value=session):
+            results = [backend.verify('token') for _ in range(8)]
+        self.assertEqual(set(results), {UNAVAILABLE})
+        self.assertEqual(session.post.call_count, backend.breaker.failure_threshold)
+
+    @override_settings(RECAPTCHA_BACKEND='accounts.captcha.StubCaptchaBackend')
+    def test_register_and_login_check_captcha(self):
+        client = APIClient()
+        registration = {
+            'username': 'newcomer', 'email': 'newcomer@example.com',
+            'password': 'Str0ng-passw0rd', 'password2': 'Str0ng-passw0rd',
+        }
+        for token, error in (('', CAPTCHA_ERRORS[None]), ('wrong', CAPTCHA_ERRORS[REJECTED])):
+            response = client.post('/api/auth/register/', {**registration, 'captcha_token': token}, format='json')
+            self.assertEqual((response.status_code, response.json()), (400, {'captcha': error}))
+        self.assertFalse(User.objects.filter(username='newcomer').exists())
+        response = client.post('/api/auth/register/', {**registration, 'captcha_token': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        credentials = {'email': 'newcomer@example.com', 'password': 'Str0ng-passw0rd'}
+        response = client.post('/api/auth/login/', {**credentials, 'captcha_token': 'unavailable'}, format='json')
+        self.assertEqual((response.status_code, response.json()), (400, {'captcha': CAPTCHA_ERRORS[UNAVAILABLE]}))
+        response = client.post('/api/auth/login/', {**credentials, 'captcha_token': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+
+
+class StubProviderMixin:
+    """Answers fetch() from `responses` ({url: (status, data) or an exception})."""
+    responses = {}
+
+    def is_configured(self):
+        return True
+
+    async def fetch(self, method, url, **kwargs):
+        response = self.responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class StubGoogleProvider(StubProviderMixin, GoogleProvider):
+    pass
+
+
+class StubGitHubProvider(StubProviderMixin, GitHubProvider):
+    in_flight = max_in_flight = 0
+
+    async def fetch(self, method, url, **kwargs):
+        cls = type(self)
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        await asyncio.sleep(0)
+        try:
+            return await super().fetch(method, url, **kwargs)
+        finally:
+            cls.in_flight -= 1
+
+
+@override_settings(OAUTH_PROVIDERS={
+    'google': 'accounts.tests.StubGoogleProvider',
+    'github': 'accounts.tests.StubGitHubProvider',
+})
+class SocialLoginTests(TestCase):
+    google_url = '/api/auth/oauth/google/'
+    github_url = '/api/auth/oauth/github/'
+    github_token = (200, {'access_token': 'token'})
+
+    def setUp(self):
+        StubGitHubProvider.max_in_flight = 0
+
+    async def post(self, url, data):
+        return await self.async_client.post(url, data, content_type='application/json')
+
+    async def test_google_login_returns_tokens(self):
+        StubGoogleProvider.responses = {
+            GoogleProvider.userinfo_url: (200, {'email': 'ada@example.com', 'given_name': 'Ada', 'family_name': 'Lovelace'}),
+        }
+        response = await self.post(self.google_url, {'access_token': 'token'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['created'])
+        self.assertEqual((data['user']['username'], data['user']['first_name']), ('ada', 'Ada'))
+        self.assertIn('access', data)
+        self.assertIn('refresh', data)
+        self.assertFalse((await self.post(self.google_url, {'access_token': 'token'})).json()['created'])
+
+    async def test_google_upstream_failure(self):
+        StubGoogleProvider.responses = {GoogleProvider.userinfo_url: UpstreamError('timed out')}
+        response = await self.post(self.google_url, {'access_token': 'token'})
+        self.assertEqual(response.status_code, 502)
+
+    async def test_google_without_email(self):
+        StubGoogleProvider.responses = {GoogleProvider.userinfo_url: (200, {'given_name': 'Ada'})}
+        response = await self.post(self.google_url, {'access_token': 'token'})
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Email not provided by Google'}))
+
+    async def test_missing_credential(self):
+        response = await self.post(self.github_url, {})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_github_reads_profile_and_emails_concurrently(self):
+        StubGitHubProvider.responses = {
+            GitHubProvider.token_url: self.github_token,
+            GitHubProvider.user_url: (200, {'login': 'octo', 'name': 'Octo Cat', 'email': None}),
+            GitHubProvider.emails_url: (200, [
+                {'email': 'other@example.com', 'primary': False},
+                {'email': 'octo@example.com', 'primary': True},
+            ]),
+        }
+        response = await self.post(self.github_url, {'code': 'code'})
+        self.assertEqual(response.status_code, 200)
+        user = response.json()['user']
+        self.assertEqual((user['email'], user['username'], user['last_name']), ('octo@example.com', 'octo', 'Cat'))
+        self.assertEqual(StubGitHubProvider.max_in_flight, 2)
+
+    async def test_github_without_email(self):
+        StubGitHubProvider.responses = {
+            GitHubProvider.token_url: self.github_token,
+            GitHubProvider.user_url: (200, {'login': 'octo', 'email': None}),
+            GitHubProvider.emails_url: (404, {'message': 'Not Found'}),
+        }
+        response = await self.post(self.github_url, {'code': 'code'})
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Email not provided by GitHub'}))
+
+    async def test_github_upstream_failure(self):
+        StubGitHubProvider.responses = {
+            GitHubProvider.token_url: self.github_token,
+            GitHubProvider.user_url: UpstreamError('timed out'),
+            GitHubProvider.emails_url: (200, []),
+        }
+        response = await self.post(self.github_url, {'code': 'code'})
+        self.assertEqual(response.status_code, 502)
@@ -12,10 +12,13 @@ from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import Q
 
-import requests as http_requests
 from projects.invitations import join_user_from_session_invite
+from projects.pagination import KeysetPagination
 
+from .access import DEFAULT_ROLE_NAME, resolve_permissions
+from .captcha import captcha_error
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
@@ -42,38 +45,10 @@ def _team_payload(team):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
-    captcha_token = request.data.get('captcha_token')
-    recaptcha_private_key = getattr(settings, 'RECAPTCHA_PRIVATE_KEY', '')
-
-    if recaptcha_private_key:
-        if not captcha_token:
-            return Response(
-                {'captcha': 'Please complete the reCAPTCHA verification.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        try:
-            captcha_response = http_requests.post(
-                'https://www.google.com/recaptcha/api/siteverify',
-                data={
-                    'secret': recaptcha_private_key,
-                    'response': captcha_token,
-                },
-                timeout=10,
-            )
-            captcha_result = captcha_response.json()
-        except Exception:
-            return Response(
-                {'captcha': 'reCAPTCHA verification error.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    captcha_message = captcha_error(request)
+    if captcha_message:
+        return Response({'captcha': captcha_message}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not captcha_result.get('success'):
-            return Response(
-                {'captcha': 'reCAPTCHA verification failed.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
@@ -95,36 +70,10 @@ def login(request):
         password = serializer.validated_data['password']
         
         # reCAPTCHA verification (enabled when RECAPTCHA_PRIVATE_KEY is set)
-        captcha_token = request.data.get('captcha_token')
-        if getattr(settings, 'RECAPTCHA_PRIVATE_KEY', ''):
-            if not captcha_token:
-                return Response(
-                    {'captcha': 'Please complete the reCAPTCHA verification.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            try:
-                captcha_response = http_requests.post(
-                    'https://www.google.com/recaptcha/api/siteverify',
-                    data={
-                        'secret': settings.RECAPTCHA_PRIVATE_KEY,
-                        'response': captcha_token,
-                    },
-                    timeout=10,
-                )
-                captcha_result = captcha_response.json()
-            except Exception:
-                return Response(
-                    {'captcha': 'reCAPTCHA verification error.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            if not captcha_result.get('success'):
-                return Response(
-                    {'captcha': 'reCAPTCHA verification failed.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
+        captcha_message = captcha_error(request)
+        if captcha_message:
+            return Response({'captcha': captcha_message}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             user = User.objects.get(email=email)
         except User.DoesNotExist:
@@ -170,44 +119,9 @@ def logout(request):
 @permission_classes([IsAuthenticated])
 def me(request):
     data = UserSerializer(request.user).data
-    
-    profile = getattr(request.user, 'profile', None)
-    if profile and profile.role:
-        data['role'] = {
-            'name': profile.role.name,
-            'display_name': profile.role.get_name_display()
-        }
-        data['permissions'] = {
-            'can_create_tasks': profile.role.can_create_tasks,
-            'can_edit_tasks': profile.role.can_edit_tasks,
-            'can_delete_tasks': profile.role.can_delete_tasks,
-            'can_assign_tasks': profile.role.can_assign_tasks,
-            'can_create_projects': profile.role.can_create_projects,
-            'can_edit_projects': profile.role.can_edit_projects,
-            'can_delete_projects': profile.role.can_delete_projects,
-            'can_manage_team': profile.role.can_manage_team,
-            'can_invite_members': profile.role.can_invite_members,
-            'can_remove_members': profile.role.can_remove_members,
-            'can_view_reports': profile.role.can_view_reports,
-            'can_manage_settings': profile.role.can_manage_settings,
-        }
-    else:
-        data['role'] = {'name': 'member', 'display_name': 'Member'}
-        data['permissions'] = {
-            'can_create_tasks': True,
-            'can_edit_tasks': True,
-            'can_delete_tasks': False,
-            'can_assign_tasks': False,
-            'can_create_projects': False,
-            'can_edit_projects': False,
-            'can_delete_projects': False,
-            'can_manage_team': False,
-            'can_invite_members': False,
-            'can_remove_members': False,
-            'can_view_reports': False,
-            'can_manage_settings': False,
-        }
-    
+    permission_set = resolve_permissions(request.user)
+    data['role'] = permission_set.role()
+    data['permissions'] = permission_set.flags()
     return Response(data)
 
 
@@ -330,22 +244,36 @@ def get_roles(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_users(request):
-    users = User.objects.all().order_by('-date_joined')
+    """
+    Users newest first, a keyset page at a time (?cursor= from `next`).
+    ?search= matches username or email, ?role= a role name ('member' also
+    covers users without a role).
+    """
+    users = User.objects.select_related('profile__role')
+
+    search = request.query_params.get('search', '').strip()
+    if search:
+        users = users.filter(Q(username__icontains=search) | Q(email__icontains=search))
+
+    role = request.query_params.get('role')
+    if role:
+        role_filter = Q(profile__role__name=role)
+        if role == DEFAULT_ROLE_NAME:
+            role_filter |= Q(profile__isnull=True) | Q(profile__role__isnull=True)
+        users = users.filter(role_filter)
+
+    # Newest first by id rather than date_joined: same order for accounts
+    # created through the app, and a primary-key range read per page.
+    paginator = KeysetPagination(ordering=['-id'])
+    page = paginator.paginate_queryset(users, request)
     data = []
-    for user in users:
+    for user in page:
         user_data = UserSerializer(user).data
-        profile = getattr(user, 'profile', None)
-        if profile and profile.role:
-            user_data['role'] = {'name': profile.role.name, 'display_name': profile.role.get_name_display()}
-            user_data['permissions'] = {
-                'can_create_tasks': profile.role.can_create_tasks,
-                'can_manage_team': profile.role.can_manage_team,
-            }
-        else:
-            user_data['role'] = {'name': 'member', 'display_name': 'Member'}
-            user_data['permissions'] = {}
+        permission_set = resolve_permissions(user)
+        user_data['role'] = permission_set.role()
+        user_data['permissions'] = permission_set.flags()
         data.append(user_data)
-    return Response(data)
+    return paginator.get_paginated_response(data)
 
 
 @api_view(['PUT'])
@@ -325,3 +325,24 @@ export const useDeleteCalendarEvent = () => {
     },
   });
 };
+
+export const useUpdateCalendarSeries = () => {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: ({ id, params, data }) =>
+      calendarEventsApi.updateSeries(id, params, data).then(res => res.data),
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ['calendar-events'] });
+    },
+  });
+};
+
+export const useDeleteCalendarSeries = () => {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: ({ id, params }) => calendarEventsApi.deleteSeries(id, params),
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ['calendar-events'] });
+    },
+  });
+};
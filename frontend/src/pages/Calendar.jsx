@@ -28,8 +28,10 @@ import {
   useCompleteTask,
   useCreateCalendarEvent,
   useDeleteCalendarEvent,
+  useDeleteCalendarSeries,
   useTasks,
   useUpdateCalendarEvent,
+  useUpdateCalendarSeries,
 } from '../hooks/useApi';
 import { useAuth } from '../context/AuthContext';
 const localizer = dateFnsLocalizer({
@@ -130,18 +132,30 @@ export default function CalendarPage() {
     refetchIntervalInBackground: true,
   };
 
+  const [date, setDate] = useState(new Date());
+  const [view, setView] = useState('work_week');
+
+  // Recurring events are expanded by the API for the requested window only.
+  const eventsRange = useMemo(
+    () => ({
+      from: startOfWeek(startOfMonth(date), { weekStartsOn: 1 }).toISOString(),
+      to: addDays(endOfWeek(endOfMonth(date), { weekStartsOn: 1 }), 1).toISOString(),
+    }),
+    [date]
+  );
+
   const { data: tasksData, isLoading, error } = useTasks({}, syncOptions);
   const {
     data: calendarEventsData,
     isLoading: isEventsLoading,
-  } = useCalendarEvents({}, syncOptions);
+  } = useCalendarEvents(eventsRange, syncOptions);
   const completeTask = useCompleteTask();
   const createCalendarEvent = useCreateCalendarEvent();
   const updateCalendarEvent = useUpdateCalendarEvent();
   const deleteCalendarEvent = useDeleteCalendarEvent();
+  const updateCalendarSeries = useUpdateCalendarSeries();
+  const deleteCalendarSeries = useDeleteCalendarSeries();
 
-  const [date, setDate] = useState(new Date());
-  const [view, setView] = useState('work_week');
   const [miniMonth, setMiniMonth] = useState(startOfMonth(new Date()));
 
   const [calendars, setCalendars] = useState([
@@ -190,7 +204,9 @@ export default function CalendarPage() {
           return null;
         }
         return {
-          id: `calendar-${event.id}`,
+          id: event.occurrence_start
+            ? `calendar-${event.id}-${event.occurrence_start}`
+            : `calendar-${event.id}`,
           apiId: event.id,
           title: event.title,
           start,
@@ -204,6 +220,7 @@ export default function CalendarPage() {
           recurrence: event.recurrence || 'none',
           isRecurring: event.recurrence && event.recurrence !== 'none',
           seriesId: event.series_id || null,
+          occurrenceStart: event.occurrence_start || null,
           isAllDay: event.is_all_day || false,
         };
       })
@@ -375,9 +392,24 @@ const createDefaultForm = (baseDate = new Date(), calendarId = 'my') => {
     }));
   };
 
+  // Series-scoped writes: 'this' occurrence, 'following' or 'all'.
+  const updateSeries = (event, scope, data) =>
+    updateCalendarSeries.mutateAsync({
+      id: event.apiId,
+      params: { scope, occurrence: event.occurrenceStart },
+      data,
+    });
+
   const handleEventDrop = ({ event, start, end }) => {
     if (event.source !== 'calendar') return;
     if (!event.apiId) return;
+    if (event.occurrenceStart) {
+      updateSeries(event, 'this', {
+        start_time: start.toISOString(),
+        end_time: end.toISOString(),
+      });
+      return;
+    }
     updateCalendarEvent.mutate({
       id: event.apiId,
       data: {
@@ -390,6 +422,13 @@ const createDefaultForm = (baseDate = new Date(), calendarId = 'my') => {
   const handleEventResize = ({ event, start, end }) => {
     if (event.source !== 'calendar') return;
     if (!event.apiId) return;
+    if (event.occurrenceStart) {
+      updateSeries(event, 'this', {
+        start_time: start.toISOString(),
+        end_time: end.toISOString(),
+      });
+      return;
+    }
     updateCalendarEvent.mutate({
       id: event.apiId,
       data: {
@@ -431,20 +470,15 @@ const createDefaultForm = (baseDate = new Date(), calendarId = 'my') => {
       is_all_day: false,
     };
 
+    const editingEvent = calendarEvents.find((item) => item.id === editingEventId);
+
     try {
       if (editingEventApiId) {
         if (applyToSeries && editingSeriesId) {
-          const seriesEvents = calendarEvents.filter(
-            (item) => item.seriesId === editingSeriesId
-          );
-          await Promise.all(
-            seriesEvents.map((item) =>
-              updateCalendarEvent.mutateAsync({
-                id: item.apiId,
-                data: payload,
-              })
-            )
-          );
+          // One request; the API shifts every row by the edited occurrence's offset.
+          await updateSeries(editingEvent, 'all', payload);
+        } else if (editingEvent?.occurrenceStart) {
+          await updateSeries(editingEvent, 'this', payload);
         } else {
           await updateCalendarEvent.mutateAsync({
             id: editingEventApiId,
@@ -452,40 +486,18 @@ const createDefaultForm = (baseDate = new Date(), calendarId = 'my') => {
           });
         }
       } else {
-        const seriesId =
-          eventForm.recurrence !== 'none' ? `series-${Date.now()}` : null;
-        const count =
-          eventForm.recurrence === 'daily'
-            ? 10
-            : eventForm.recurrence === 'weekly'
-            ? 8
-            : 1;
-
-        const requests = [];
-        for (let i = 0; i < count; i += 1) {
-          const offsetStart =
+        // One master row; the API expands the occurrences.
+        await createCalendarEvent.mutateAsync({
+          ...payload,
+          // Series repeat on this zone's wall clock, across DST changes.
+          time_zone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+          recurrence_count:
             eventForm.recurrence === 'daily'
-              ? addDays(start, i)
+              ? 10
               : eventForm.recurrence === 'weekly'
-              ? addWeeks(start, i)
-              : start;
-          const offsetEnd =
-            eventForm.recurrence === 'daily'
-              ? addDays(end, i)
-              : eventForm.recurrence === 'weekly'
-              ? addWeeks(end, i)
-              : end;
-
-          requests.push(
-            createCalendarEvent.mutateAsync({
-              ...payload,
-              start_time: offsetStart.toISOString(),
-              end_time: offsetEnd.toISOString(),
-              series_id: seriesId,
-            })
-          );
-        }
-        await Promise.all(requests);
+              ? 8
+              : null,
+        });
       }
 
       setIsEventModalOpen(false);
@@ -506,14 +518,17 @@ const createDefaultForm = (baseDate = new Date(), calendarId = 'my') => {
     const shouldDeleteSeries =
       selectedEvent.seriesId &&
       window.confirm('Delete the whole series? Click Cancel to delete only this event.');
-    const deleteTargets = shouldDeleteSeries
-      ? calendarEvents.filter((item) => item.seriesId === selectedEvent.seriesId)
-      : [selectedEvent];
-    deleteTargets.forEach((item) => {
-      if (item.apiId) {
-        deleteCalendarEvent.mutate(item.apiId);
-      }
-    });
+    if (shouldDeleteSeries || selectedEvent.occurrenceStart) {
+      deleteCalendarSeries.mutate({
+        id: selectedEvent.apiId,
+        params: {
+          scope: shouldDeleteSeries ? 'all' : 'this',
+          occurrence: selectedEvent.occurrenceStart,
+        },
+      });
+    } else if (selectedEvent.apiId) {
+      deleteCalendarEvent.mutate(selectedEvent.apiId);
+    }
     setSelectedEvent(null);
   };
 
@@ -9,23 +9,34 @@ import api from '../services/api';
 export default function Users() {
   const { can } = useAuth();
   const [users, setUsers] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [roles, setRoles] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [search, setSearch] = useState('');
+  const [roleFilter, setRoleFilter] = useState('');
   const [selectedUser, setSelectedUser] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
 
   useEffect(() => {
-    fetchData();
+    api.get('/auth/roles/')
+      .then((response) => setRoles(response.data))
+      .catch((error) => console.error('Failed to fetch roles:', error));
   }, []);
 
+  useEffect(() => {
+    const timer = setTimeout(fetchData, 300);
+    return () => clearTimeout(timer);
+  }, [search, roleFilter]);
+
   const fetchData = async () => {
     try {
-      const [usersRes, rolesRes] = await Promise.all([
-        api.get('/auth/users/'),
-        api.get('/auth/roles/')
-      ]);
-      setUsers(usersRes.data);
-      setRoles(rolesRes.data);
+      const params = {};
+      if (search.trim()) params.search = search.trim();
+      if (roleFilter) params.role = roleFilter;
+      const response = await api.get('/auth/users/', { params });
+      setUsers(response.data.results);
+      setNextPage(response.data.next);
     } catch (error) {
       console.error('Failed to fetch data:', error);
     } finally {
@@ -33,6 +44,20 @@ export default function Users() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPage) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(nextPage);
+      setUsers((current) => [...current, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (error) {
+      console.error('Failed to fetch more users:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleChangeRole = async (userId, roleId) => {
     try {
       await api.put(`/auth/users/${userId}/role/`, { role_id: roleId });
@@ -81,7 +106,7 @@ export default function Users() {
     <PageTransition>
       <Header 
         title="Users Management" 
-        subtitle={`${users.length} users in the system`}
+        subtitle={`${users.length}${nextPage ? '+' : ''} users${search || roleFilter ? ' found' : ' in the system'}`}
       />
 
       <main style={{ padding: '32px' }}>
@@ -121,6 +146,31 @@ export default function Users() {
           })}
         </div>
 
+        {/* Filters */}
+        <div style={{ display: 'flex', gap: '12px', marginBottom: '24px', flexWrap: 'wrap' }}>
+          <input
+            type="search"
+            className="input"
+            placeholder="Search by username or email"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            style={{ flex: '1 1 260px', maxWidth: '420px' }}
+          />
+          <select
+            className="input"
+            value={roleFilter}
+            onChange={(e) => setRoleFilter(e.target.value)}
+            style={{ width: '180px' }}
+          >
+            <option value="">All roles</option>
+            {roles.map(role => (
+              <option key={role.id} value={role.name}>
+                {role.name.charAt(0).toUpperCase() + role.name.slice(1)}
+              </option>
+            ))}
+          </select>
+        </div>
+
         {/* Users Grid */}
         <div style={{ 
           display: 'grid', 
@@ -208,6 +258,14 @@ export default function Users() {
             );
           })}
         </div>
+
+        {nextPage && (
+          <div style={{ display: 'flex', justifyContent: 'center', marginTop: '24px' }}>
+            <button className="btn btn-primary" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </main>
 
       {/* Edit Role Modal */}
@@ -115,6 +115,9 @@ export const calendarEventsApi = {
   create: (data) => api.post('/v1/calendar-events/', data),
   update: (id, data) => api.patch(`/v1/calendar-events/${id}/`, data),
   delete: (id) => api.delete(`/v1/calendar-events/${id}/`),
+  updateSeries: (id, params, data) =>
+    api.patch(`/v1/calendar-events/${id}/series/`, data, { params }),
+  deleteSeries: (id, params) => api.delete(`/v1/calendar-events/${id}/series/`, { params }),
 };
 
 export default api;
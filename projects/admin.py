@@ -17,7 +17,7 @@ class CategoryAdmin(admin.ModelAdmin):
     colored_badge.short_description = "Badge"
 
     def task_count(self, obj):
-        return obj.tasks.count()
+        return obj.task_total
     task_count.short_description = "Tasks"
 
 
@@ -26,13 +26,16 @@ class TaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'team', 'responsible', 'priority', 'status', 'due_date', 'is_completed')
     list_filter = ('status', 'priority', 'team', 'is_completed')
     search_fields = ('title', 'description')
-    actions = ['mark_completed']
+    actions = ['mark_completed', 'mark_reopened']
 
     def mark_completed(self, request, queryset):
-        for task in queryset:
-            task.complete()
+        queryset.complete()
     mark_completed.short_description = "Mark as completed"
 
+    def mark_reopened(self, request, queryset):
+        queryset.reopen()
+    mark_reopened.short_description = "Reopen"
+
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
@@ -47,10 +50,6 @@ class TeamAdmin(admin.ModelAdmin):
     list_filter = ('is_active',)
     filter_horizontal = ('members',)
 
-    def member_count(self, obj):
-        return obj.members.count()
-    member_count.short_description = "Members"
-
 
 @admin.register(TeamMessage)
 class TeamMessageAdmin(admin.ModelAdmin):
@@ -0,0 +1,228 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import (
+    recount_category_counters,
+    recount_project_counters,
+    recount_team_counters,
+)
+from .models import Category, Project, Task, Team, TeamMembership, Tombstone
+from .search import index_documents
+from .serializers import TaskBulkDataSerializer
+from .visibility import note_personal_task
+
+User = get_user_model()
+
+UPDATABLE_FIELDS = [
+    'title', 'description', 'team_id', 'responsible_id', 'category_id',
+    'status', 'priority', 'due_date',
+]
+
+
+class BulkTaskOperations:
+    """
+    Validates and applies a batch of task operations for one user.
+
+    Every referenced team, user, category and task is loaded once for the
+    whole batch; team access is checked once per distinct team. Items that
+    fail validation are reported and skipped, the rest are written with
+    bulk_create/bulk_update/delete inside one transaction.
+    """
+
+    def __init__(self, user, visible_tasks, operations):
+        self.user = user
+        self.visible_tasks = visible_tasks
+        self.operations = operations
+        self.results = [
+            {'index': index, 'op': item['op'], 'id': item.get('id'), 'status': None}
+            for index, item in enumerate(operations)
+        ]
+
+    def run(self):
+        self._load_targets()
+        self._validate_data()
+        self._load_references()
+        self._plan()
+        with transaction.atomic():
+            self._apply()
+        return self.results
+
+    def _fail(self, index, errors):
+        self.results[index]['status'] = 'error'
+        self.results[index]['errors'] = errors
+
+    def _load_targets(self):
+        ids = {item['id'] for item in self.operations if item['op'] != 'create'}
+        self.tasks = self.visible_tasks.in_bulk(ids) if ids else {}
+        for index, item in enumerate(self.operations):
+            if item['op'] != 'create' and item['id'] not in self.tasks:
+                self._fail(index, {'id': 'Task not found.'})
+
+    def _validate_data(self):
+        self.cleaned = {}
+        for index, item in enumerate(self.operations):
+            if self.results[index]['status'] or item['op'] not in ('create', 'update'):
+                continue
+            serializer = TaskBulkDataSerializer(data=item['data'], partial=item['op'] == 'update')
+            if serializer.is_valid():
+                self.cleaned[index] = serializer.validated_data
+            else:
+                self._fail(index, serializer.errors)
+
+    def _load_references(self):
+        team_ids, user_ids, category_ids = set(), set(), set()
+        for index, data in self.cleaned.items():
+            task = self.tasks.get(self.operations[index].get('id'))
+            team_ids.add(data.get('team_id', task.team_id if task else None))
+            user_ids.add(data.get('responsible_id', task.responsible_id if task else self.user.id))
+            category_ids.add(data.get('category_id', task.category_id if task else None))
+        team_ids.discard(None)
+        category_ids.discard(None)
+
+        self.teams = Team.objects.in_bulk(team_ids)
+        self.user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        self.category_ids = set(Category.objects.filter(id__in=category_ids).values_list('id', flat=True))
+        self.team_member_pairs = set(
+            TeamMembership.objects.filter(
+                team_id__in=team_ids,
+                user_id__in=user_ids | {self.user.id},
+            ).values_list('team_id', 'user_id')
+        )
+
+    def _access_errors(self, team_id, responsible_id, category_id):
+        if team_id is not None and team_id not in self.teams:
+            return {'team': 'Team not found.'}
+        if responsible_id not in self.user_ids:
+            return {'responsible': 'User not found.'}
+        if category_id is not None and category_id not in self.category_ids:
+            return {'category': 'Category not found.'}
+
+        if team_id is None:
+            if responsible_id != self.user.id and not self.user.is_superuser:
+                return {'responsible': 'Personal task can only be assigned to yourself.'}
+            return None
+
+        if (team_id, self.user.id) not in self.team_member_pairs and not self.user.is_superuser:
+            return {'team': 'You are not a member of this team.'}
+        if (team_id, responsible_id) not in self.team_member_pairs:
+            return {'responsible': 'Responsible user must belong to the selected team.'}
+        return None
+
+    def _plan(self):
+        now = timezone.now()
+        self.to_create = []
+        self.to_update = {}
+        self.to_delete = {}
+        self.previous_team_ids = {}
+        self.touched_team_ids = set()
+        self.touched_category_ids = set()
+
+        for index, item in enumerate(self.operations):
+            if self.results[index]['status']:
+                continue
+            op = item['op']
+            task = self.tasks.get(item.get('id'))
+
+            if task is not None and task.pk in self.to_delete:
+                self._fail(index, {'id': 'Task is deleted earlier in this batch.'})
+                continue
+
+            if op == 'delete':
+                self.to_delete[task.pk] = task
+                self.to_update.pop(task.pk, None)
+                self.results[index]['status'] = 'deleted'
+                continue
+
+            if op == 'complete':
+                self._track(task)
+                task.is_completed = True
+                task.status = 'done'
+                task.completed_at = now
+                task.updated_at = now
+                self.to_update[task.pk] = task
+                self.results[index]['status'] = 'completed'
+                continue
+
+            data = self.cleaned[index]
+            if op == 'create':
+                data.setdefault('responsible_id', self.user.id)
+                errors = self._access_errors(
+                    data.get('team_id'), data['responsible_id'], data.get('category_id'),
+                )
+                if errors:
+                    self._fail(index, errors)
+                    continue
+                task = Task(**data)
+                self.to_create.append((index, task))
+            else:
+                errors = self._access_errors(
+                    data.get('team_id', task.team_id),
+                    data.get('responsible_id', task.responsible_id),
+                    data.get('category_id', task.category_id),
+                )
+                if errors:
+                    self._fail(index, errors)
+                    continue
+                self._track(task)
+                self.previous_team_ids.setdefault(task.pk, task.team_id)
+                for field, value in data.items():
+                    setattr(task, field, value)
+                self.to_update[task.pk] = task
+                self.results[index]['status'] = 'updated'
+
+            task.priority_rank = Task.PRIORITY_RANKS.get(task.priority, 0)
+            task.updated_at = now
+            self._track(task)
+
+    def _track(self, task):
+        self.touched_team_ids.add(task.team_id)
+        self.touched_category_ids.add(task.category_id)
+
+    def _apply(self):
+        created = Task.objects.bulk_create([task for _, task in self.to_create])
+        for (index, _), task in zip(self.to_create, created):
+            self.results[index]['id'] = task.pk
+            self.results[index]['status'] = 'created'
+
+        updated = list(self.to_update.values())
+        Task.objects.bulk_update(
+            updated,
+            UPDATABLE_FIELDS + ['priority_rank', 'is_completed', 'completed_at', 'updated_at'],
+            batch_size=500,
+        )
+
+        # Moved to another team: members of the old one lose sight of it, as
+        # update_task_counters_on_save records for single saves.
+        Tombstone.objects.bulk_create([
+            Tombstone(
+                kind='task',
+                object_id=task.pk,
+                team_id=self.previous_team_ids[task.pk],
+                user_id=task.responsible_id,
+            )
+            for task in updated
+            if self.previous_team_ids.get(task.pk, task.team_id) != task.team_id
+        ])
+
+        if self.to_delete:
+            # Regular delete: per-task signals keep counters and links consistent.
+            Task.objects.filter(pk__in=list(self.to_delete)).delete()
+
+        # bulk_create/bulk_update send no signals: resync the denormalized state.
+        for task in created + updated:
+            self._track(task)
+        self.touched_team_ids.discard(None)
+        self.touched_category_ids.discard(None)
+        if self.touched_team_ids:
+            recount_team_counters(self.touched_team_ids)
+        if self.touched_category_ids:
+            recount_category_counters(self.touched_category_ids)
+        if updated:
+            project_ids = Project.tasks.through.objects.filter(
+                task_id__in=[task.pk for task in updated],
+            ).values_list('project_id', flat=True)
+            recount_project_counters(set(project_ids))
+        for responsible_id in {task.responsible_id for task in created + updated if task.team_id is None}:
+            note_personal_task(responsible_id)
+        index_documents(created + updated)
@@ -0,0 +1,102 @@
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Now
+
+# Task fields the Team/Category/Project counters depend on.
+TASK_COUNTER_FIELDS = ('team_id', 'category_id', 'is_completed')
+
+
+def task_counter_state(task):
+    return (task.team_id, task.category_id, task.is_completed)
+
+
+def _count_subquery(queryset, group_field):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_field)
+            .annotate(count=Count('pk'))
+            .values('count')[:1],
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _restrict(queryset, ids):
+    if ids is None:
+        return queryset
+    return queryset.filter(pk__in=list(ids))
+
+
+def recount_team_counters(team_ids=None):
+    from .models import Task, Team
+
+    tasks = Task.objects.filter(team_id=OuterRef('pk'))
+    members = Team.members.through.objects.filter(team_id=OuterRef('pk'))
+    return _restrict(Team.objects.all(), team_ids).update(
+        member_count=_count_subquery(members, 'team_id'),
+        task_total=_count_subquery(tasks, 'team_id'),
+        task_completed=_count_subquery(tasks.filter(is_completed=True), 'team_id'),
+    )
+
+
+def recount_project_counters(project_ids=None):
+    from .models import Project
+
+    links = Project.tasks.through.objects.filter(project_id=OuterRef('pk'))
+    return _restrict(Project.objects.all(), project_ids).update(
+        task_total=_count_subquery(links, 'project_id'),
+        task_completed=_count_subquery(links.filter(task__is_completed=True), 'project_id'),
+        # Progress is part of the project payload: let delta sync pick it up.
+        updated_at=Now(),
+    )
+
+
+def recount_category_counters(category_ids=None):
+    from .models import Category, Task
+
+    tasks = Task.objects.filter(category_id=OuterRef('pk'))
+    return _restrict(Category.objects.all(), category_ids).update(
+        task_total=_count_subquery(tasks, 'category_id'),
+        task_completed=_count_subquery(tasks.filter(is_completed=True), 'category_id'),
+    )
+
+
+def apply_task_counter_delta(old, new):
+    """Move one task's contribution from the `old` to the `new` counter state."""
+    from .models import Category, Team
+
+    for model, index in ((Team, 0), (Category, 1)):
+        old_id = old[index] if old else None
+        new_id = new[index] if new else None
+
+        if old_id is not None and old_id == new_id:
+            if old[2] != new[2]:
+                model.objects.filter(pk=old_id).update(
+                    task_completed=F('task_completed') + (1 if new[2] else -1),
+                )
+            continue
+
+        if old_id is not None:
+            model.objects.filter(pk=old_id).update(
+                task_total=F('task_total') - 1,
+                task_completed=F('task_completed') - int(old[2]),
+            )
+        if new_id is not None:
+            model.objects.filter(pk=new_id).update(
+                task_total=F('task_total') + 1,
+                task_completed=F('task_completed') + int(new[2]),
+            )
+
+
+def apply_completed_delta(model, counts, sign, **extra):
+    """Shift `task_completed` by sign * count for each {pk: count} in one UPDATE."""
+    counts = {pk: count for pk, count in counts.items() if pk is not None and count}
+    if not counts:
+        return
+    delta = Case(
+        *[When(pk=pk, then=Value(sign * count)) for pk, count in counts.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    model.objects.filter(pk__in=list(counts)).update(task_completed=F('task_completed') + delta, **extra)
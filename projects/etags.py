@@ -0,0 +1,82 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    # Weak: nested objects (user names, categories) are not part of the version.
+    return f'W/"{digest}"'
+
+
+def queryset_version(queryset):
+    """(max(updated_at), count) of `queryset`, read with a single aggregate."""
+    version = queryset.order_by().aggregate(last=Max('updated_at'), count=Count('pk'))
+    return version['last'], version['count']
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    opaque = etag.removeprefix('W/')
+    return any(
+        candidate == '*' or candidate.removeprefix('W/') == opaque
+        for candidate in parse_etags(header)
+    )
+
+
+def conditional_response(request, etag, build):
+    """
+    304 if the client already holds `etag`; otherwise build the response.
+    `build` (and so the serializer) only runs on a miss.
+    """
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build()
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        # Always revalidate; the browser then sends If-None-Match by itself.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / If-None-Match for list and retrieve. Lists are versioned by
+    (max(updated_at), count) of the filtered queryset, objects by their own
+    updated_at; a matching request gets a 304 before anything is serialized.
+    """
+
+    def get_list_etag(self, *parts):
+        queryset = self.filter_queryset(self.get_queryset())
+        return make_etag(
+            self.request.user.pk,
+            self.request.get_full_path(),
+            *queryset_version(queryset),
+            *parts,
+        )
+
+    def get_object_etag(self, instance):
+        return make_etag(self.request.user.pk, instance.pk, instance.updated_at)
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        return conditional_response(
+            request,
+            self.get_list_etag(),
+            lambda: parent.list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request,
+            self.get_object_etag(instance),
+            lambda: Response(self.get_serializer(instance).data),
+        )
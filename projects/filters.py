@@ -0,0 +1,38 @@
+from rest_framework import filters
+
+from .search import matching_ids, search_terms
+
+
+class AliasedOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that maps public ordering names onto stored sort columns
+    via `view.ordering_aliases`, e.g. `?ordering=-priority` -> `-priority_rank`.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        aliases = getattr(view, 'ordering_aliases', None)
+        if not ordering or not aliases:
+            return ordering
+
+        resolved = []
+        for term in ordering:
+            prefix = '-' if term.startswith('-') else ''
+            name = term.lstrip('-')
+            resolved.append(prefix + aliases.get(name, name))
+        return resolved
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    `?search=` through the full-text index (see projects/search.py) for the
+    view's `search_kind`: every word must prefix-match a word of the row.
+    Without an index it falls back to SearchFilter on `search_fields`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(' '.join(self.get_search_terms(request)))
+        ids = matching_ids(view.search_kind, terms) if terms else None
+        if ids is None:
+            return super().filter_queryset(request, queryset, view)
+        return queryset.filter(pk__in=ids)
@@ -0,0 +1,478 @@
+import re
+import uuid
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CalendarEvent
+from .recurrence import LONG_EVENT_DURATION, occurrence_at, parse_exceptions
+from .search import index_documents
+
+PRODID = '-//TaskFlow//Calendar//EN'
+IMPORT_BATCH_SIZE = 500
+
+# Written by an import, together with the RRULE-derived fields.
+IMPORT_FIELDS = [
+    'title', 'description', 'location', 'start_time', 'end_time', 'is_all_day', 'time_zone', 'is_long',
+    'recurrence', 'recurrence_interval', 'recurrence_count', 'recurrence_until', 'recurrence_exceptions',
+    'updated_at',
+]
+
+# The UID iter_ics writes for events that were not imported.
+_EXPORTED_UID = re.compile(r'event-(\d+)@taskflow')
+
+# RFC 5545 PRIORITY: 1 is highest, 9 is lowest.
+TASK_PRIORITIES = {'urgent': 1, 'high': 3, 'medium': 5, 'low': 9}
+
+_FREQUENCIES = {'DAILY': 'daily', 'WEEKLY': 'weekly'}
+
+
+# ---------------------------------------------------------------- export
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets, never splitting a UTF-8 sequence."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, limit = [], 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event_zone(event):
+    """The event's zone if its times are written with a TZID, else None (UTC)."""
+    if event.is_all_day or event.time_zone in ('', 'UTC'):
+        return None
+    try:
+        return ZoneInfo(event.time_zone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _datetime(name, value, zone):
+    # Wall-clock time plus TZID, so importers repeat the series in that zone
+    # (across DST changes) rather than at a fixed UTC time.
+    if zone is None:
+        return f'{name}:{_utc(value)}'
+    return f'{name};TZID={zone.key}:{value.astimezone(zone):%Y%m%dT%H%M%S}'
+
+
+def _event_lines(event):
+    yield 'BEGIN:VEVENT'
+    yield f'UID:{_escape(event.ical_uid or f"event-{event.pk}@taskflow")}'
+    yield f'DTSTAMP:{_utc(event.updated_at)}'
+    zone = _event_zone(event)
+    if event.is_all_day:
+        yield f'DTSTART;VALUE=DATE:{timezone.localtime(event.start_time):%Y%m%d}'
+        yield f'DTEND;VALUE=DATE:{timezone.localtime(event.end_time):%Y%m%d}'
+    else:
+        yield _datetime('DTSTART', event.start_time, zone)
+        yield _datetime('DTEND', event.end_time, zone)
+    yield f'SUMMARY:{_escape(event.title)}'
+    if event.description:
+        yield f'DESCRIPTION:{_escape(event.description)}'
+    if event.location:
+        yield f'LOCATION:{_escape(event.location)}'
+    if event.recurrence != 'none':
+        rule = [f'FREQ={event.recurrence.upper()}']
+        if event.recurrence_interval > 1:
+            rule.append(f'INTERVAL={event.recurrence_interval}')
+        if event.recurrence_until is not None:
+            until = event.recurrence_until
+            if event.recurrence_count is not None:
+                # An RRULE takes COUNT or UNTIL, not both: keep the earlier end.
+                until = min(until, occurrence_at(event, event.recurrence_count - 1))
+            rule.append(f'UNTIL={_utc(until)}')
+        elif event.recurrence_count is not None:
+            rule.append(f'COUNT={event.recurrence_count}')
+        yield 'RRULE:' + ';'.join(rule)
+        for value in sorted(parse_exceptions(event.recurrence_exceptions)):
+            yield _datetime('EXDATE', value, zone)
+    yield 'END:VEVENT'
+
+
+def _task_lines(task):
+    yield 'BEGIN:VTODO'
+    yield f'UID:task-{task.pk}@taskflow'
+    yield f'DTSTAMP:{_utc(task.updated_at)}'
+    yield f'DUE;VALUE=DATE:{task.due_date:%Y%m%d}'
+    yield f'SUMMARY:{_escape(task.title)}'
+    if task.description:
+        yield f'DESCRIPTION:{_escape(task.description)}'
+    yield f'PRIORITY:{TASK_PRIORITIES.get(task.priority, 0)}'
+    yield f'STATUS:{"COMPLETED" if task.is_completed else "NEEDS-ACTION"}'
+    yield 'END:VTODO'
+
+
+def iter_ics(events, tasks=()):
+    """
+    Yield an iCalendar document piece by piece: events as VEVENTs (recurring
+    ones as RRULE masters), tasks with a due date as VTODOs. Feed it
+    `.iterator()` querysets so nothing is held in memory.
+    """
+    yield _fold('BEGIN:VCALENDAR') + _fold('VERSION:2.0') + _fold(f'PRODID:{PRODID}')
+    for event in events:
+        yield ''.join(_fold(line) for line in _event_lines(event))
+    for task in tasks:
+        yield ''.join(_fold(line) for line in _task_lines(task))
+    yield _fold('END:VCALENDAR')
+
+
+# ---------------------------------------------------------------- import
+
+def _unescape(value):
+    result, chars = [], iter(value)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '')
+            result.append('\n' if char in ('n', 'N') else char)
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def iter_content_lines(raw_lines):
+    """Unfold physical lines (bytes or str) into content lines, one at a time."""
+    current = None
+    for raw in raw_lines:
+        line = raw.decode('utf-8', errors='replace') if isinstance(raw, bytes) else raw
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_content_line(line):
+    """`NAME;PARAM=VALUE:content` -> (name, params, content)."""
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        head, value = line, ''
+    name, *raw_params = head.split(';')
+    params = {}
+    for raw_param in raw_params:
+        key, _, param_value = raw_param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def iter_components(lines, names=('VEVENT',)):
+    """
+    Yield (component name, {property: [(params, value), ...]}) for each
+    top-level component in `names`; nested components such as VALARM are
+    skipped.
+    """
+    component, properties, depth = None, None, 0
+    for line in lines:
+        name, params, value = parse_content_line(line)
+        if name == 'BEGIN':
+            if component is not None:
+                depth += 1
+            elif value.upper() in names:
+                component, properties, depth = value.upper(), {}, 0
+        elif name == 'END':
+            if component is None:
+                continue
+            if depth:
+                depth -= 1
+            elif value.upper() == component:
+                yield component, properties
+                component = None
+        elif component is not None and not depth:
+            properties.setdefault(name, []).append((params, value))
+
+
+def parse_ics_datetime(value, params):
+    """Return (aware datetime, is_date) for a DATE or DATE-TIME value."""
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        day = datetime.strptime(value[:8], '%Y%m%d').date()
+        return timezone.make_aware(datetime.combine(day, time.min)), True
+    if value.endswith('Z'):
+        return datetime.strptime(value[:15], '%Y%m%dT%H%M%S').replace(tzinfo=dt_timezone.utc), False
+    naive = datetime.strptime(value[:15], '%Y%m%dT%H%M%S')
+    tz = timezone.get_current_timezone()
+    if params.get('TZID'):
+        try:
+            tz = ZoneInfo(params['TZID'])
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.make_aware(naive, tz), False
+
+
+def ics_zone_name(value, params):
+    """The IANA zone a DATE-TIME is written in; '' for floating times and dates."""
+    if value.strip().endswith('Z'):
+        return 'UTC'
+    if params.get('TZID'):
+        try:
+            ZoneInfo(params['TZID'])
+        except (ZoneInfoNotFoundError, ValueError):
+            return ''
+        return params['TZID']
+    return ''
+
+
+def parse_ics_duration(value):
+    sign = -1 if value.startswith('-') else 1
+    value = value.lstrip('+-')
+    if not value.startswith('P'):
+        return None
+    total, number, in_time = timedelta(), '', False
+    units = {'W': 'weeks', 'D': 'days', 'H': 'hours', 'M': 'minutes', 'S': 'seconds'}
+    for char in value[1:]:
+        if char == 'T':
+            in_time = True
+        elif char.isdigit():
+            number += char
+        elif char in units and number:
+            if char == 'M' and not in_time:
+                return None
+            total += timedelta(**{units[char]: int(number)})
+            number = ''
+        else:
+            return None
+    return sign * total
+
+
+def _first(properties, name):
+    values = properties.get(name)
+    return values[0] if values else None
+
+
+def _text(properties, name, max_length=None):
+    found = _first(properties, name)
+    if found is None:
+        return ''
+    text = _unescape(found[1])
+    return text[:max_length] if max_length else text
+
+
+def _series_id(uid):
+    # Stable per UID, so a master and its RECURRENCE-ID overrides share it.
+    return f'series-{uuid.uuid5(uuid.NAMESPACE_URL, uid).hex}'
+
+
+def build_event(owner, properties):
+    """
+    Map one VEVENT to an unsaved CalendarEvent, plus the RECURRENCE-ID it
+    overrides (if any). Returns None for events that cannot be stored.
+
+    Only plain DAILY/WEEKLY rules (INTERVAL, COUNT, UNTIL, EXDATE) are kept;
+    other rules import the first occurrence only.
+    """
+    dtstart = _first(properties, 'DTSTART')
+    if dtstart is None:
+        return None
+    try:
+        start, is_all_day = parse_ics_datetime(dtstart[1], dtstart[0])
+        dtend = _first(properties, 'DTEND')
+        duration = _first(properties, 'DURATION')
+        if dtend is not None:
+            end = parse_ics_datetime(dtend[1], dtend[0])[0]
+        elif duration is not None:
+            end = start + (parse_ics_duration(duration[1]) or timedelta())
+        else:
+            end = start + (timedelta(days=1) if is_all_day else timedelta())
+    except ValueError:
+        return None
+    if end < start:
+        return None
+
+    uid = _text(properties, 'UID') or uuid.uuid4().hex
+    if len(uid) > 255:
+        uid = uuid.uuid5(uuid.NAMESPACE_URL, uid).hex
+    event = CalendarEvent(
+        owner=owner,
+        title=_text(properties, 'SUMMARY', 200) or '(No title)',
+        description=_text(properties, 'DESCRIPTION'),
+        location=_text(properties, 'LOCATION', 200),
+        start_time=start,
+        end_time=end,
+        is_all_day=is_all_day,
+        time_zone='' if is_all_day else ics_zone_name(dtstart[1], dtstart[0]),
+        # Stored with bulk_create, which skips CalendarEvent.save().
+        is_long=end - start > LONG_EVENT_DURATION,
+        ical_uid=uid,
+    )
+
+    recurrence_id = _first(properties, 'RECURRENCE-ID')
+    if recurrence_id is not None:
+        event.series_id = _series_id(uid)
+        try:
+            overridden = parse_ics_datetime(recurrence_id[1], recurrence_id[0])[0]
+        except ValueError:
+            event.ical_uid = f'{uid};{recurrence_id[1].strip()}'
+            return event, None
+        event.ical_uid = f'{uid};{_utc(overridden)}'
+        return event, overridden
+
+    rrule = _first(properties, 'RRULE')
+    if rrule is not None:
+        rule = dict(part.partition('=')[::2] for part in rrule[1].upper().split(';'))
+        if rule.get('FREQ') in _FREQUENCIES:
+            try:
+                event.recurrence = _FREQUENCIES[rule['FREQ']]
+                event.recurrence_interval = min(max(int(rule.get('INTERVAL', 1)), 1), 32767)
+                if 'COUNT' in rule:
+                    event.recurrence_count = max(int(rule['COUNT']), 1)
+                if 'UNTIL' in rule:
+                    event.recurrence_until = parse_ics_datetime(rule['UNTIL'], {})[0]
+                event.recurrence_exceptions = [
+                    parse_ics_datetime(value, params)[0].isoformat()
+                    for params, values in properties.get('EXDATE', [])
+                    for value in values.split(',') if value
+                ]
+            except ValueError:
+                event.recurrence = 'none'
+            else:
+                event.series_id = _series_id(uid)
+    return event, None
+
+
+def _stored_overrides(owner, series_ids):
+    """{series_id: {RECURRENCE-ID, ...}} of overrides imported by earlier batches."""
+    stored = {}
+    rows = (
+        CalendarEvent.objects
+        .filter(owner=owner, series_id__in=series_ids, recurrence='none')
+        .exclude(ical_uid='')
+        .values_list('series_id', 'ical_uid')
+    )
+    for series_id, ical_uid in rows:
+        _, separator, recurrence_id = ical_uid.rpartition(';')
+        if separator:
+            try:
+                stored.setdefault(series_id, set()).add(parse_ics_datetime(recurrence_id, {})[0])
+            except ValueError:
+                pass
+    return stored
+
+
+def _store_batch(owner, batch):
+    """
+    Upsert one batch of (event, RECURRENCE-ID) pairs on (owner, ical_uid) and
+    keep the series' recurrence_exceptions in step with their overrides,
+    whichever batch the master and the overrides arrive in. Returns the
+    stored events.
+    """
+    by_uid = {event.ical_uid: (event, recurrence_id) for event, recurrence_id in batch}
+    exported = {int(match.group(1)): uid for uid in by_uid if (match := _EXPORTED_UID.fullmatch(uid))}
+    existing = (
+        CalendarEvent.objects
+        .filter(Q(ical_uid__in=list(by_uid)) | Q(pk__in=list(exported), ical_uid=''), owner=owner)
+        .values_list('pk', 'ical_uid', 'series_id', 'time_zone')
+    )
+    for pk, ical_uid, series_id, time_zone in existing:
+        event = by_uid[ical_uid or exported[pk]][0]
+        # Matched rows keep their series, with any events detached from it.
+        event.pk, event.series_id = pk, series_id
+        if not event.is_all_day and event.time_zone in ('', 'UTC'):
+            # UTC or floating times name no zone: keep the one the series
+            # repeats in rather than pinning it to UTC.
+            event.time_zone = time_zone
+    overrides = {}
+    for event, recurrence_id in by_uid.values():
+        if recurrence_id is not None:
+            overrides.setdefault(event.series_id, set()).add(recurrence_id)
+
+    masters = {event.series_id: event for event, _ in by_uid.values() if event.recurrence != 'none'}
+    stored_overrides = _stored_overrides(owner, list(masters))
+    for series_id, master in masters.items():
+        exceptions = parse_exceptions(master.recurrence_exceptions)
+        exceptions |= overrides.get(series_id, set()) | stored_overrides.get(series_id, set())
+        master.recurrence_exceptions = sorted(value.isoformat() for value in exceptions)
+
+    events = [event for event, _ in by_uid.values()]
+    now = timezone.now()
+    updated = [event for event in events if event.pk is not None]
+    for event in updated:
+        event.updated_at = now
+    CalendarEvent.objects.bulk_create([event for event in events if event.pk is None])
+    CalendarEvent.objects.bulk_update(updated, IMPORT_FIELDS)
+
+    # Overrides of masters stored by an earlier batch (or import).
+    pending = {series_id: values for series_id, values in overrides.items() if series_id not in masters}
+    if pending:
+        stored_masters = list(
+            CalendarEvent.objects
+            .filter(owner=owner, series_id__in=list(pending))
+            .exclude(recurrence='none')
+            .only('pk', 'series_id', 'recurrence_exceptions')
+        )
+        for master in stored_masters:
+            exceptions = parse_exceptions(master.recurrence_exceptions) | pending[master.series_id]
+            master.recurrence_exceptions = sorted(value.isoformat() for value in exceptions)
+            master.updated_at = now
+        CalendarEvent.objects.bulk_update(stored_masters, ['recurrence_exceptions', 'updated_at'])
+    return events
+
+
+def import_ics(owner, raw_lines, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import the VEVENTs of an iCalendar stream for `owner`.
+
+    The input is parsed line by line and stored in batches, one transaction
+    per batch, so memory stays flat however large the file is. Events are
+    matched on their UID (see CalendarEvent.ical_uid), so importing a feed
+    again updates the events of the previous import instead of duplicating
+    them. Yields a progress dict after every batch; the last one has
+    done=True.
+    """
+    progress = {'imported': 0, 'skipped': 0, 'done': False}
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            index_documents(_store_batch(owner, batch))
+        progress['imported'] += len(batch)
+        batch.clear()
+
+    for _, properties in iter_components(iter_content_lines(raw_lines)):
+        built = build_event(owner, properties)
+        if built is None:
+            progress['skipped'] += 1
+            continue
+        batch.append(built)
+        if len(batch) >= batch_size:
+            flush()
+            yield dict(progress)
+
+    if batch:
+        flush()
+    progress['done'] = True
+    yield dict(progress)
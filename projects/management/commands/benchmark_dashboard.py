@@ -0,0 +1,75 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from projects.models import Project, Task, Team
+from projects.views import dashboard_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Times /api/v1/dashboard/ against a seeded task table; nothing is kept'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['tasks'])
+            timings, queries = self.measure(user, options['requests'])
+            transaction.set_rollback(True)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["tasks"]} tasks, {len(timings)} requests on {connection.vendor}: '
+            f'{queries} queries, median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms'
+        ))
+
+    def seed(self, count):
+        user = User.objects.create_user('dashboard-benchmark', 'dashboard-benchmark@example.com')
+        team = Team.objects.create(team_lead=user, name='Dashboard benchmark')
+        Project.objects.create(project_title='Dashboard benchmark', team=team, status='active')
+        priorities = [priority for priority, _ in Task.PRIORITY_CHOICES]
+        statuses = [task_status for task_status, _ in Task.STATUS_CHOICES]
+        today = timezone.now().date()
+        Task.objects.bulk_create(
+            (
+                Task(
+                    title=f'Task {index}',
+                    team=team if index % 10 else None,
+                    responsible=user,
+                    priority=priorities[index % len(priorities)],
+                    # bulk_create skips Task.save(), which derives the rank.
+                    priority_rank=Task.PRIORITY_RANKS[priorities[index % len(priorities)]],
+                    status=statuses[index % len(statuses)],
+                    is_completed=statuses[index % len(statuses)] == 'done',
+                    due_date=today + timedelta(days=index % 60 - 30),
+                )
+                for index in range(count)
+            ),
+            batch_size=5000,
+        )
+        return user
+
+    def measure(self, user, requests):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(requests + 1):
+            request = factory.get('/api/v1/dashboard/')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                dashboard_stats(request)
+                timings.append((time.perf_counter() - started) * 1000)
+        # The first request only warms caches.
+        return timings[1:], len(captured)
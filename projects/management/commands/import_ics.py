@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from projects.ical import IMPORT_BATCH_SIZE, import_ics
+
+
+class Command(BaseCommand):
+    help = 'Imports the events of an iCalendar (.ics) file into a user calendar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            owner = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        with open(options['path'], 'rb') as ics_file:
+            for progress in import_ics(owner, ics_file, batch_size=options['batch_size']):
+                self.stdout.write(
+                    f"Imported {progress['imported']} events, skipped {progress['skipped']}"
+                )
+
+        self.stdout.write(self.style.SUCCESS('✅ Calendar imported!'))
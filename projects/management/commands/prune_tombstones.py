@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from projects.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes delta-sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'✅ Pruned {deleted} tombstones'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from projects.counters import (
+    recount_category_counters,
+    recount_project_counters,
+    recount_team_counters,
+)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized task/member counters on teams, projects and categories'
+
+    def handle(self, *args, **options):
+        counters = [
+            ('teams', recount_team_counters),
+            ('projects', recount_project_counters),
+            ('categories', recount_category_counters),
+        ]
+
+        for label, recount in counters:
+            updated = recount()
+            self.stdout.write(
+                self.style.SUCCESS(f'Recounted {updated} {label}')
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ All counters are up to date!'))
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_team_memberships(apps, schema_editor):
+    Team = apps.get_model('projects', 'Team')
+    TeamMembership = apps.get_model('projects', 'TeamMembership')
+
+    memberships = []
+    for team in Team.objects.prefetch_related('members').all():
+        user_ids = {member.id for member in team.members.all()}
+        user_ids.add(team.team_lead_id)
+        for user_id in user_ids:
+            memberships.append(TeamMembership(
+                user_id=user_id,
+                team_id=team.id,
+                is_lead=user_id == team.team_lead_id,
+                is_active=team.is_active,
+            ))
+    TeamMembership.objects.bulk_create(memberships, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0012_teammessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_lead', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='projects.team')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'is_active', 'team'], name='teammembership_user_active')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='teammembership',
+            constraint=models.UniqueConstraint(fields=('user', 'team'), name='unique_team_membership'),
+        ),
+        migrations.RunPython(populate_team_memberships, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:50
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_counters(apps, schema_editor):
+    Category = apps.get_model('projects', 'Category')
+    Team = apps.get_model('projects', 'Team')
+    Project = apps.get_model('projects', 'Project')
+
+    categories = list(Category.objects.annotate(
+        total=Count('tasks', distinct=True),
+        completed=Count('tasks', filter=Q(tasks__is_completed=True), distinct=True),
+    ))
+    for category in categories:
+        category.task_total = category.total
+        category.task_completed = category.completed
+    Category.objects.bulk_update(categories, ['task_total', 'task_completed'], batch_size=500)
+
+    teams = list(Team.objects.annotate(
+        members_total=Count('members', distinct=True),
+        total=Count('tasks', distinct=True),
+        completed=Count('tasks', filter=Q(tasks__is_completed=True), distinct=True),
+    ))
+    for team in teams:
+        team.member_count = team.members_total
+        team.task_total = team.total
+        team.task_completed = team.completed
+    Team.objects.bulk_update(teams, ['member_count', 'task_total', 'task_completed'], batch_size=500)
+
+    projects = list(Project.objects.annotate(
+        total=Count('tasks', distinct=True),
+        completed=Count('tasks', filter=Q(tasks__is_completed=True), distinct=True),
+    ))
+    for project in projects:
+        project.task_total = project.total
+        project.task_completed = project.completed
+    Project.objects.bulk_update(projects, ['task_total', 'task_completed'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_teammembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='task_completed',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='task_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_completed',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='task_completed',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='task_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teammessage',
+            index=models.Index(fields=['team', 'created_at', 'id'], name='teammessage_team_created'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team', 'is_completed', 'due_date'], name='task_team_open_due'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['responsible', 'is_completed', 'due_date'], name='task_responsible_open_due'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['due_date'], name='task_open_due_date'),
+        ),
+    ]
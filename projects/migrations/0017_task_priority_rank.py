@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:53
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+
+def populate_priority_rank(apps, schema_editor):
+    Task = apps.get_model('projects', 'Task')
+    Task.objects.update(priority_rank=Case(
+        *[When(priority=priority, then=Value(rank)) for priority, rank in PRIORITY_RANKS.items()],
+        default=Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_task_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-priority_rank', 'due_date', '-created_at']},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.SmallIntegerField(default=2, editable=False),
+        ),
+        migrations.RunPython(populate_priority_rank, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-priority_rank', 'due_date', '-created_at', '-id'], name='task_ordering_keyset'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:57
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations, models
+
+STEPS = {'daily': timedelta(days=1), 'weekly': timedelta(weeks=1)}
+COPIED_FIELDS = ('title', 'description', 'calendar_id', 'color', 'location', 'participants', 'is_all_day', 'recurrence')
+
+
+def collapse_materialized_series(apps, schema_editor):
+    """
+    The calendar used to store every occurrence as its own row sharing a
+    series_id. Keep the earliest row of each series as the master and turn the
+    rest into a count + exceptions rule. Rows that were edited individually
+    (different content or off the step grid) stay as one-off events.
+    """
+    CalendarEvent = apps.get_model('projects', 'CalendarEvent')
+    series = defaultdict(list)
+    events = (
+        CalendarEvent.objects
+        .filter(series_id__isnull=False, recurrence__in=list(STEPS))
+        .exclude(series_id='')
+        .order_by('start_time', 'id')
+    )
+    for event in events.iterator():
+        series[(event.owner_id, event.series_id)].append(event)
+
+    for rows in series.values():
+        master, rest = rows[0], rows[1:]
+        step = STEPS[master.recurrence]
+        duration = master.end_time - master.start_time
+        covered, detached, duplicates = {0}, [], []
+        last_index = 0
+
+        for row in rest:
+            index, remainder = divmod(row.start_time - master.start_time, step)
+            aligned = not remainder
+            if aligned:
+                last_index = max(last_index, index)
+            same = all(getattr(row, field) == getattr(master, field) for field in COPIED_FIELDS)
+            if aligned and same and row.end_time - row.start_time == duration and index not in covered:
+                covered.add(index)
+                duplicates.append(row.pk)
+            else:
+                detached.append(row.pk)
+
+        master.recurrence_count = last_index + 1
+        master.recurrence_exceptions = [
+            (master.start_time + step * index).isoformat()
+            for index in range(last_index + 1)
+            if index not in covered
+        ]
+        master.save(update_fields=['recurrence_count', 'recurrence_exceptions'])
+        CalendarEvent.objects.filter(pk__in=duplicates).delete()
+        CalendarEvent.objects.filter(pk__in=detached).update(recurrence='none')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_task_priority_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence_exceptions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(collapse_materialized_series, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0018_calendarevent_recurrence_rule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['owner', 'start_time', 'end_time'], name='calendarevent_owner_window'),
+        ),
+    ]
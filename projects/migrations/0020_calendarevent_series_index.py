@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0019_calendarevent_window_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['owner', 'series_id', 'start_time'], name='calendarevent_series'),
+        ),
+    ]
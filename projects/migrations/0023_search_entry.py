@@ -0,0 +1,131 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:14
+
+from django.db import OperationalError, migrations, models
+
+# Copied from projects/search.py as of this migration, which must not change
+# when that module does.
+SEARCH_TABLE = 'projects_searchentry'
+FTS_TABLE = 'projects_searchentry_fts'
+
+# model name -> (kind, team_id, user_id, title, body, updated_at)
+DOCUMENTS = {
+    'Task': lambda task: (
+        'task', task.team_id, task.responsible_id, task.title, task.description, task.updated_at,
+    ),
+    'Project': lambda project: (
+        'project', project.team_id, None, project.project_title, project.description, project.updated_at,
+    ),
+    'TeamMessage': lambda message: (
+        'message', message.team_id, message.author_id, '', message.content, message.created_at,
+    ),
+    'CalendarEvent': lambda event: (
+        'event', None, event.owner_id, event.title,
+        '\n'.join(filter(None, [event.description, event.location])), event.updated_at,
+    ),
+}
+
+POSTGRES_INDEX = [
+    f"""
+    ALTER TABLE {SEARCH_TABLE} ADD COLUMN document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', title), 'A') ||
+        setweight(to_tsvector('simple', body), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX searchentry_document ON {SEARCH_TABLE} USING GIN (document)",
+]
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, content='{SEARCH_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER searchentry_fts_insert AFTER INSERT ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER searchentry_fts_delete AFTER DELETE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER searchentry_fts_update AFTER UPDATE ON {SEARCH_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_INDEX
+    elif vendor == 'sqlite':
+        statements = SQLITE_INDEX
+    else:
+        return
+    try:
+        for statement in statements:
+            schema_editor.execute(statement)
+    except OperationalError:
+        # SQLite built without FTS5: search falls back to LIKE scans.
+        if vendor != 'sqlite':
+            raise
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def index_existing_rows(apps, schema_editor):
+    SearchEntry = apps.get_model('projects', 'SearchEntry')
+    for model_name, document in DOCUMENTS.items():
+        queryset = apps.get_model('projects', model_name).objects.order_by('pk')
+        batch = []
+        for instance in queryset.iterator(chunk_size=1000):
+            kind, team_id, user_id, title, body, updated_at = document(instance)
+            batch.append(SearchEntry(
+                kind=kind, object_id=instance.pk, team_id=team_id, user_id=user_id,
+                title=title or '', body=body or '', updated_at=updated_at,
+            ))
+            if len(batch) == 1000:
+                SearchEntry.objects.bulk_create(batch)
+                batch = []
+        SearchEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0022_team_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Task'), ('project', 'Project'), ('message', 'Team message'), ('event', 'Calendar event')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('team_id', models.BigIntegerField(blank=True, null=True)),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['team_id'], name='searchentry_team'), models.Index(fields=['user_id'], name='searchentry_user')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='searchentry_kind_object'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
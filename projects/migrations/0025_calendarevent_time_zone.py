@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0024_task_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='time_zone',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
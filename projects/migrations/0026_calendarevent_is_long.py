@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:36
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+# recurrence.LONG_EVENT_DURATION when this migration was written.
+LONG_EVENT_DURATION = timedelta(days=31)
+
+
+def flag_long_events(apps, schema_editor):
+    CalendarEvent = apps.get_model('projects', 'CalendarEvent')
+    CalendarEvent.objects.filter(end_time__gt=F('start_time') + LONG_EVENT_DURATION).update(is_long=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0025_calendarevent_time_zone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='is_long',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(flag_long_events, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(condition=models.Q(('is_long', True)), fields=['owner', 'start_time'], name='calendarevent_owner_long'),
+        ),
+    ]
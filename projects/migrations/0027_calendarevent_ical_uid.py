@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0026_calendarevent_is_long'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='ical_uid',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['owner', 'ical_uid'], name='calendarevent_ical_uid'),
+        ),
+    ]
@@ -1,8 +1,27 @@
+from collections import Counter
+
 from django.conf import settings 
-from django.db import models 
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.utils import timezone
 import uuid
 
+from .counters import (
+    TASK_COUNTER_FIELDS,
+    apply_completed_delta,
+    apply_task_counter_delta,
+    recount_project_counters,
+    recount_team_counters,
+    task_counter_state,
+)
+from .realtime import publish_access_changed, publish_team_message
+from .recurrence import LONG_EVENT_DURATION
+from .search import index_documents, unindex_document
+from .signals import tasks_completion_changed
+from .visibility import invalidate_visibility, note_personal_task
+
 
 class Category(models.Model):
     """Категории для задач"""
@@ -10,6 +29,8 @@ class Category(models.Model):
     color = models.CharField(max_length=7, default='#6366f1')
     icon = models.CharField(max_length=50, default='folder')
     created_at = models.DateTimeField(auto_now_add=True)
+    task_total = models.IntegerField(default=0, editable=False)
+    task_completed = models.IntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -34,7 +55,12 @@ class Team(models.Model):
         blank=True
     )
     created_at = models.DateTimeField(default=timezone.now)
+    # Also bumped when members change: the member list is part of the team payload.
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    member_count = models.IntegerField(default=0, editable=False)
+    task_total = models.IntegerField(default=0, editable=False)
+    task_completed = models.IntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -42,9 +68,111 @@ class Team(models.Model):
     def __str__(self):
         return self.name
 
-    @property
-    def member_count(self):
-        return self.members.count()
+
+class TeamMembership(models.Model):
+    """Денормализованный индекс доступа: кто состоит в какой команде"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='team_memberships'
+    )
+    team = models.ForeignKey(
+        Team,
+        on_delete=models.CASCADE,
+        related_name='memberships'
+    )
+    is_lead = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'team'], name='unique_team_membership'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'is_active', 'team'], name='teammembership_user_active'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.team}"
+
+
+def sync_team_memberships(team):
+    """Rebuild the membership index rows of a single team from lead + members."""
+    user_ids = set(team.members.values_list('id', flat=True))
+    user_ids.add(team.team_lead_id)
+
+    stale = TeamMembership.objects.filter(team=team).exclude(user_id__in=user_ids)
+    changed_user_ids = set(stale.values_list('user_id', flat=True))
+    revoked_user_ids = set(changed_user_ids)
+    stale.delete()
+    existing = {
+        membership.user_id: membership
+        for membership in TeamMembership.objects.filter(team=team)
+    }
+
+    to_create = []
+    to_update = []
+    for user_id in user_ids:
+        is_lead = user_id == team.team_lead_id
+        membership = existing.get(user_id)
+        if membership is None:
+            to_create.append(TeamMembership(
+                user_id=user_id,
+                team=team,
+                is_lead=is_lead,
+                is_active=team.is_active,
+            ))
+        elif membership.is_lead != is_lead or membership.is_active != team.is_active:
+            if membership.is_active != team.is_active:
+                changed_user_ids.add(user_id)
+                if not team.is_active:
+                    revoked_user_ids.add(user_id)
+            membership.is_lead = is_lead
+            membership.is_active = team.is_active
+            to_update.append(membership)
+
+    TeamMembership.objects.bulk_create(to_create, ignore_conflicts=True)
+    TeamMembership.objects.bulk_update(to_update, ['is_lead', 'is_active'])
+    changed_user_ids.update(membership.user_id for membership in to_create)
+    invalidate_visibility(changed_user_ids)
+    if revoked_user_ids:
+        # Open chat sockets of these users recheck access and disconnect.
+        transaction.on_commit(lambda: publish_access_changed(team.pk, revoked_user_ids))
+
+
+class TaskQuerySet(models.QuerySet):
+    def complete(self):
+        return self._set_completed(True)
+
+    def reopen(self):
+        return self._set_completed(False)
+
+    def _set_completed(self, completed):
+        """Flip every matching task in one UPDATE and send one batched signal."""
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                self.exclude(is_completed=completed)
+                .order_by()
+                .values_list('id', 'team_id', 'category_id')
+            )
+            if not rows:
+                return 0
+            task_ids = [task_id for task_id, _, _ in rows]
+            updated = Task.objects.filter(pk__in=task_ids).update(
+                is_completed=completed,
+                status='done' if completed else 'todo',
+                completed_at=now if completed else None,
+                updated_at=now,
+            )
+            tasks_completion_changed.send(
+                sender=Task,
+                task_ids=task_ids,
+                completed=completed,
+                team_counts=Counter(team_id for _, team_id, _ in rows),
+                category_counts=Counter(category_id for _, _, category_id in rows),
+            )
+        return updated
 
 
 class Task(models.Model):
@@ -62,20 +190,26 @@ class Task(models.Model):
         ('done', 'Done'),
     ]
 
+    PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     
+    # No single-column indexes on team/responsible: the composite indexes in
+    # Meta lead with them and serve every lookup by either column.
     team = models.ForeignKey(
         Team, 
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='tasks'
+        related_name='tasks',
+        db_index=False,
     )
     responsible = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.CASCADE,
-        related_name='assigned_tasks'
+        related_name='assigned_tasks',
+        db_index=False,
     )
     category = models.ForeignKey(
         Category,
@@ -95,6 +229,8 @@ class Task(models.Model):
         choices=PRIORITY_CHOICES,
         default='medium'
     )
+    # Numeric mirror of `priority` so the DB can sort by urgency, not alphabetically.
+    priority_rank = models.SmallIntegerField(default=2, editable=False)
     
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -103,27 +239,62 @@ class Task(models.Model):
     
     is_completed = models.BooleanField(default=False)
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-priority', 'due_date', '-created_at']
+        ordering = ['-priority_rank', 'due_date', '-created_at']
+        indexes = [
+            # Keyset pagination walks the default ordering (+ id tiebreaker).
+            models.Index(fields=['-priority_rank', 'due_date', '-created_at', '-id'], name='task_ordering_keyset'),
+            # Visibility filters (team_id IN / responsible) narrowed by completion and due date.
+            models.Index(fields=['team', 'is_completed', 'due_date'], name='task_team_open_due'),
+            models.Index(fields=['responsible', 'is_completed', 'due_date'], name='task_responsible_open_due'),
+            # Delta sync: rows changed since a watermark, per visibility scope.
+            models.Index(fields=['team', 'updated_at'], name='task_team_updated'),
+            models.Index(fields=['responsible', 'updated_at'], name='task_responsible_updated'),
+            # Overdue/today lookups only ever read open tasks.
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(is_completed=False),
+                name='task_open_due_date',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields().intersection(TASK_COUNTER_FIELDS):
+            instance._counter_state = task_counter_state(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'priority_rank'}
+        super().save(*args, **kwargs)
+
     def is_overdue(self):
         if self.due_date and not self.is_completed:
             return self.due_date < timezone.now().date()
         return False
 
     def complete(self):
-        self.is_completed = True
-        self.status = 'done'
-        self.completed_at = timezone.now()
-        self.save()
+        Task.objects.filter(pk=self.pk).complete()
+        self.refresh_from_db(fields=['is_completed', 'status', 'completed_at', 'updated_at'])
+        self._counter_state = task_counter_state(self)
+
+    def reopen(self):
+        Task.objects.filter(pk=self.pk).reopen()
+        self.refresh_from_db(fields=['is_completed', 'status', 'completed_at', 'updated_at'])
+        self._counter_state = task_counter_state(self)
 
     @property
     def priority_level(self):
-        levels = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
-        return levels.get(self.priority, 0)
+        return self.priority_rank
 
 
 class TeamMessage(models.Model):
@@ -142,6 +313,9 @@ class TeamMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['team', 'created_at', 'id'], name='teammessage_team_created'),
+        ]
 
     def __str__(self):
         return f"{self.author} in {self.team}: {self.content[:40]}"
@@ -175,9 +349,14 @@ class Project(models.Model):
     deadline = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    task_total = models.IntegerField(default=0, editable=False)
+    task_completed = models.IntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['team', 'updated_at'], name='project_team_updated'),
+        ]
 
     def __str__(self):
         return self.project_title
@@ -189,11 +368,9 @@ class Project(models.Model):
 
     @property
     def progress(self):
-        total = self.tasks.count()
-        if total == 0:
+        if self.task_total <= 0:
             return 0
-        completed = self.tasks.filter(is_completed=True).count()
-        return int((completed / total) * 100)
+        return int((self.task_completed / self.task_total) * 100)
 
 
 class CalendarEvent(models.Model):
@@ -217,13 +394,287 @@ class CalendarEvent(models.Model):
     location = models.CharField(max_length=200, blank=True)
     participants = models.JSONField(default=list, blank=True)
     recurrence = models.CharField(max_length=20, choices=RECURRENCE_CHOICES, default='none')
+    # Repeat rule for a master row: every `recurrence_interval` days/weeks,
+    # limited by `recurrence_count` and/or `recurrence_until`. Occurrences are
+    # expanded on read (projects/recurrence.py); `recurrence_exceptions` holds
+    # ISO start times of skipped occurrences.
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_count = models.PositiveIntegerField(null=True, blank=True)
+    recurrence_until = models.DateTimeField(null=True, blank=True)
+    recurrence_exceptions = models.JSONField(default=list, blank=True)
+    # IANA zone whose wall clock a series repeats on; empty means
+    # settings.TIME_ZONE.
+    time_zone = models.CharField(max_length=64, blank=True)
     series_id = models.CharField(max_length=50, blank=True, null=True)
+    # Source of an imported row: the VEVENT's UID, plus ';' and the UTC
+    # RECURRENCE-ID for overrides. Re-imports update rows matched on it.
+    ical_uid = models.CharField(max_length=300, blank=True, editable=False)
     is_all_day = models.BooleanField(default=False)
+    # Longer than LONG_EVENT_DURATION; window reads fetch these separately.
+    is_long = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['owner', 'start_time', 'end_time'], name='calendarevent_owner_window'),
+            models.Index(
+                fields=['owner', 'start_time'],
+                condition=models.Q(is_long=True),
+                name='calendarevent_owner_long',
+            ),
+            models.Index(fields=['owner', 'series_id', 'start_time'], name='calendarevent_series'),
+            models.Index(fields=['owner', 'updated_at'], name='calendarevent_owner_updated'),
+            models.Index(fields=['owner', 'ical_uid'], name='calendarevent_ical_uid'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.is_long = self.end_time - self.start_time > LONG_EVENT_DURATION
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'is_long'}
+        super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    A deleted task, project or calendar event, kept so delta sync clients
+    (see projects/sync.py) learn about removals. Scoped like the row was:
+    by team, or by user for personal tasks and calendar events.
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('project', 'Project'),
+        ('event', 'Calendar event'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    team_id = models.BigIntegerField(null=True, blank=True)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['team_id', 'deleted_at'], name='tombstone_team_deleted'),
+            models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_deleted'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+    @classmethod
+    def record(cls, kind, object_id, team_id=None, user_id=None):
+        return cls.objects.create(kind=kind, object_id=object_id, team_id=team_id, user_id=user_id)
+
+
+class SearchEntry(models.Model):
+    """
+    Searchable text of a task, project, team message or calendar event,
+    scoped like Tombstone (by team, or by user for personal rows). The
+    full-text index over title/body is created per database by migration
+    0023: a generated tsvector column with a GIN index on PostgreSQL, an
+    FTS5 table kept in sync by triggers on SQLite. See projects/search.py.
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('project', 'Project'),
+        ('message', 'Team message'),
+        ('event', 'Calendar event'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    team_id = models.BigIntegerField(null=True, blank=True)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=200, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchentry_kind_object'),
+        ]
+        indexes = [
+            models.Index(fields=['team_id'], name='searchentry_team'),
+            models.Index(fields=['user_id'], name='searchentry_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+@receiver(post_save, sender=Team)
+def sync_team_memberships_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_team_memberships(instance)
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def sync_team_memberships_on_members_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        sync_team_memberships(instance)
+        recount_team_counters([instance.pk])
+        Team.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+        instance.refresh_from_db(fields=['member_count', 'updated_at'])
+        return
+
+    # user.teams.add(...) / .remove(...) / .clear(): instance is the user
+    if action == 'post_clear':
+        team_ids = TeamMembership.objects.filter(user=instance).values_list('team_id', flat=True)
+    else:
+        team_ids = pk_set or ()
+    teams = list(Team.objects.filter(id__in=list(team_ids)))
+    for team in teams:
+        sync_team_memberships(team)
+    recount_team_counters([team.id for team in teams])
+    Team.objects.filter(id__in=[team.id for team in teams]).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Team)
+def invalidate_visibility_on_team_delete(sender, instance, **kwargs):
+    # Memberships cascade away and the team's tasks become personal (SET_NULL).
+    user_ids = set(instance.memberships.values_list('user_id', flat=True))
+    user_ids.update(instance.tasks.values_list('responsible_id', flat=True))
+    invalidate_visibility(user_ids)
+    team_id = instance.pk
+    transaction.on_commit(lambda: publish_access_changed(team_id))
+
+
+@receiver(post_save, sender=Task)
+def track_personal_task_scope(sender, instance, raw=False, **kwargs):
+    if raw or instance.team_id is not None:
+        return
+    note_personal_task(instance.responsible_id)
+
+
+@receiver(pre_save, sender=Task)
+def load_task_counter_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or hasattr(instance, '_counter_state'):
+        return
+    previous = Task.objects.filter(pk=instance.pk).values_list(*TASK_COUNTER_FIELDS).first()
+    instance._counter_state = previous
+
+
+@receiver(post_save, sender=Task)
+def update_task_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_counter_state', None)
+    new = task_counter_state(instance)
+    apply_task_counter_delta(old, new)
+    if old is not None and old[2] != new[2]:
+        Project.objects.filter(tasks=instance).update(
+            task_completed=F('task_completed') + (1 if new[2] else -1),
+            updated_at=timezone.now(),
+        )
+    if old is not None and old[0] != new[0]:
+        # Moved to another team: members of the old one lose sight of it.
+        Tombstone.record('task', instance.pk, team_id=old[0], user_id=instance.responsible_id)
+    instance._counter_state = new
+
+
+@receiver(pre_delete, sender=Task)
+def update_project_counters_on_task_delete(sender, instance, **kwargs):
+    # The Project.tasks links are removed with the task and send no m2m_changed.
+    Project.objects.filter(tasks=instance).update(
+        task_total=F('task_total') - 1,
+        task_completed=F('task_completed') - int(instance.is_completed),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=Task)
+def update_task_counters_on_delete(sender, instance, **kwargs):
+    old = getattr(instance, '_counter_state', None) or task_counter_state(instance)
+    apply_task_counter_delta(old, None)
+
+
+@receiver(m2m_changed, sender=Project.tasks.through)
+def recount_project_counters_on_tasks_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_project_ids = list(instance.projects.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recount_project_counters([instance.pk])
+        instance.refresh_from_db(fields=['task_total', 'task_completed'])
+        return
+
+    # task.projects.add(...) / .remove(...) / .clear(): instance is the task
+    if action == 'post_clear':
+        project_ids = instance.__dict__.pop('_cleared_project_ids', [])
+    else:
+        project_ids = pk_set or ()
+    recount_project_counters(project_ids)
+
+
+@receiver(tasks_completion_changed, sender=Task)
+def update_counters_on_completion_change(sender, task_ids, completed, team_counts, category_counts, **kwargs):
+    sign = 1 if completed else -1
+    apply_completed_delta(Team, team_counts, sign)
+    apply_completed_delta(Category, category_counts, sign)
+    project_counts = dict(
+        Project.tasks.through.objects.filter(task_id__in=task_ids)
+        .values('project_id')
+        .annotate(count=Count('id'))
+        .values_list('project_id', 'count')
+    )
+    apply_completed_delta(Project, project_counts, sign, updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, **kwargs):
+    Tombstone.record('task', instance.pk, team_id=instance.team_id, user_id=instance.responsible_id)
+
+
+@receiver(post_delete, sender=Project)
+def record_project_tombstone(sender, instance, **kwargs):
+    Tombstone.record('project', instance.pk, team_id=instance.team_id)
+
+
+@receiver(post_delete, sender=CalendarEvent)
+def record_calendar_event_tombstone(sender, instance, **kwargs):
+    Tombstone.record('event', instance.pk, user_id=instance.owner_id)
+
+
+@receiver(post_save, sender=TeamMessage)
+def push_team_message(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish_team_message(instance))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=TeamMessage)
+@receiver(post_save, sender=CalendarEvent)
+def update_search_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_documents([instance])
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=TeamMessage)
+@receiver(post_delete, sender=CalendarEvent)
+def delete_search_entry(sender, instance, **kwargs):
+    unindex_document(instance)
+
+
+@receiver(post_delete, sender=Team)
+def unscope_search_entries_on_team_delete(sender, instance, **kwargs):
+    # The team's tasks became personal (SET_NULL) without a post_save.
+    SearchEntry.objects.filter(kind='task', team_id=instance.pk).update(team_id=None)
@@ -0,0 +1,223 @@
+import base64
+import datetime
+import itertools
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _json_default(value):
+    # Full-precision ISO strings: truncating microseconds would skip rows.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the view's ordering columns.
+
+    The cursor carries the ordering values of the last row on the page, so the
+    next page is a `WHERE (cols) > (cursor)` range read instead of an OFFSET
+    scan, and no COUNT(*) is issued. `pk` is appended as a tiebreaker.
+    Nullable columns are ordered NULLS LAST in both directions.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering_fields(queryset, view)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(self._to_python(queryset.model, position)))
+
+        rows = list(queryset.order_by(*self._order_expressions())[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self._position(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering_fields(self, queryset, view):
+        ordering = (
+            self.ordering
+            or getattr(view, 'keyset_ordering', None)
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+        )
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        fields = []
+        for name in ordering:
+            if not isinstance(name, str):
+                continue
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            if name == 'pk':
+                name = pk_name
+            field = model._meta.get_field(name)
+            fields.append((field.attname, descending, field.null))
+            if name == pk_name:
+                break
+        else:
+            descending = fields[-1][1] if fields else False
+            fields.append((model._meta.pk.attname, descending, False))
+        return fields
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _to_python(self, model, position):
+        """The cursor's values as their fields' types; a tampered cursor is a 404."""
+        try:
+            return [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _, _), value in zip(self.fields, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _order_expressions(self):
+        expressions = []
+        for name, descending, nullable in self.fields:
+            if not nullable:
+                expressions.append(f'-{name}' if descending else name)
+            elif descending:
+                expressions.append(F(name).desc(nulls_last=True))
+            else:
+                expressions.append(F(name).asc(nulls_last=True))
+        return expressions
+
+    def _position(self, obj):
+        return [getattr(obj, name) for name, _, _ in self.fields]
+
+    def _after(self, position):
+        """(col1, col2, ...) strictly after `position` in the pagination order."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending, nullable), value in zip(self.fields, position):
+            if value is None:
+                # NULLs sort last: only later columns can move past a NULL.
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            strictly_after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            if nullable:
+                strictly_after |= Q(**{f'{name}__isnull': True})
+            condition |= equal & strictly_after
+            equal &= Q(**{name: value})
+        return condition
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; `?pagination=cursor` (or any `?cursor=`)
+    switches the request to KeysetPagination.
+    """
+    keyset_class = KeysetPagination
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view=view)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class OccurrenceKeysetPagination(KeysetPagination):
+    """
+    KeysetPagination over expanded calendar occurrences, which are not rows:
+    the cursor is the (start_time, id) of the last occurrence on the page and
+    is handed to occurrences_in_window as `after`.
+    """
+    fields = [('start_time', False, False), ('id', False, False)]
+
+    def get_after(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        if position is None:
+            return None
+        start_time, pk = position
+        try:
+            start_time = datetime.datetime.fromisoformat(start_time)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if start_time.tzinfo is None or not isinstance(pk, int):
+            raise NotFound(self.invalid_cursor_message)
+        return start_time, pk
+
+    def paginate_occurrences(self, occurrences):
+        occurrences = list(itertools.islice(occurrences, self.page_size + 1))
+        self.has_next = len(occurrences) > self.page_size
+        occurrences = occurrences[:self.page_size]
+        self.next_position = self._position(occurrences[-1]) if self.has_next else None
+        return occurrences
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+TEAM_CHAT_PATH = re.compile(r'^/ws/teams/(?P<team_id>\d+)/chat/$')
+
+# Close codes in the 4000-4999 range are free for applications.
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+class DatabaseSyncToAsync(SyncToAsync):
+    """
+    sync_to_async for ORM calls from a long-lived socket. Outside the request
+    cycle nothing closes connections that outlived CONN_MAX_AGE or broke, so
+    they are checked before and after each call.
+    """
+
+    def thread_handler(self, loop, *args, **kwargs):
+        close_old_connections()
+        try:
+            return super().thread_handler(loop, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+
+database_sync_to_async = DatabaseSyncToAsync
+
+
+class ChatBroker(ABC):
+    """
+    Fan-out of team chat events to connected sockets.
+
+    `publish` may be called from any thread (views run in a worker thread);
+    `subscribe` is called on the event loop that serves the socket. Swap the
+    implementation with the CHAT_BROKER setting, e.g. for a Redis pub/sub
+    backend when running several server processes.
+    """
+
+    @abstractmethod
+    def subscribe(self, team_id):
+        ...
+
+    @abstractmethod
+    def publish(self, team_id, event):
+        ...
+
+
+class Subscription:
+    def __init__(self, broker, team_id, maxsize):
+        self.broker = broker
+        self.team_id = team_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event):
+        # Runs on the subscriber's loop. A reader this far behind loses events
+        # rather than growing the queue without bound.
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(ChatBroker):
+    """Delivers events to sockets served by this process only."""
+
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, team_id):
+        subscription = Subscription(self, team_id, self.queue_size)
+        with self._lock:
+            self._subscriptions[team_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.team_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.team_id]
+
+    def publish(self, team_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(team_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop is gone; it unsubscribes on its way out.
+                pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CHAT_BROKER)()
+    return _broker
+
+
+def message_event(message):
+    return {
+        'type': 'message',
+        'message': {
+            'id': message.id,
+            'team': message.team_id,
+            'author': {'id': message.author_id, 'username': message.author.username},
+            'content': message.content,
+            'created_at': message.created_at.isoformat(),
+        },
+    }
+
+
+def publish_team_message(message):
+    get_broker().publish(message.team_id, message_event(message))
+
+
+def publish_access_changed(team_id, user_ids=None):
+    """Make the team's sockets of `user_ids` (None: everyone) recheck access."""
+    get_broker().publish(team_id, {
+        'type': 'access_changed',
+        'user_ids': None if user_ids is None else sorted(user_ids),
+    })
+
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def _origin_allowed(headers):
+    """Cookie-authenticated sockets must come from our own pages (no CSWSH)."""
+    origin = headers.get('origin')
+    if not origin:
+        return True
+    if urlsplit(origin).netloc == headers.get('host'):
+        return True
+    return origin in settings.CSRF_TRUSTED_ORIGINS
+
+
+def _authenticate(headers, query):
+    from django.contrib.auth import get_user
+    from django.contrib.auth.models import AnonymousUser
+
+    token = (query.get('token') or [None])[0]
+    if token:
+        from rest_framework.exceptions import AuthenticationFailed
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+        authentication = JWTAuthentication()
+        try:
+            return authentication.get_user(authentication.get_validated_token(token))
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            # Also a deleted or deactivated user.
+            return AnonymousUser()
+
+    cookies = SimpleCookie(headers.get('cookie', ''))
+    session_cookie = cookies.get(settings.SESSION_COOKIE_NAME)
+    if session_cookie is None:
+        return AnonymousUser()
+    session = import_string(f'{settings.SESSION_ENGINE}.SessionStore')(session_cookie.value)
+    return get_user(SimpleNamespace(session=session))
+
+
+def _can_join(user, team_id):
+    """Lead or member of the active team, and still an active user; one query."""
+    from .models import TeamMembership
+
+    if not user.is_authenticated:
+        return False
+    return TeamMembership.objects.filter(
+        team_id=team_id, user_id=user.id, is_active=True, user__is_active=True,
+    ).exists()
+
+
+class AccessRevoked(Exception):
+    """The socket's user may no longer see the team."""
+
+
+def _save_message(user, team_id, content):
+    from .forms import TeamMessageForm
+
+    if not _can_join(user, team_id):
+        raise AccessRevoked
+    form = TeamMessageForm({'content': content})
+    if not form.is_valid():
+        return form.errors['content'][0]
+    message = form.save(commit=False)
+    message.team_id = team_id
+    message.author = user
+    message.save()
+    return None
+
+
+class TeamChatConsumer:
+    """
+    One socket per viewer of a team room: pushes every new message of the
+    team, and accepts {"content": "..."} frames to post one. Access is checked
+    on connect, before each post and whenever the team's membership changes;
+    a user who lost it is disconnected with CLOSE_FORBIDDEN.
+    """
+
+    async def __call__(self, scope, receive, send):
+        match = TEAM_CHAT_PATH.match(scope['path'])
+        team_id = int(match['team_id'])
+        headers = _headers(scope)
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+
+        if (await receive())['type'] != 'websocket.connect':
+            return
+        if not _origin_allowed(headers):
+            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+        user = await database_sync_to_async(_authenticate)(headers, query)
+        if not user.is_authenticated:
+            await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+            return
+        if not await database_sync_to_async(_can_join)(user, team_id):
+            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+
+        closed = False
+
+        async def close(code):
+            nonlocal closed
+            if not closed:
+                closed = True
+                await send({'type': 'websocket.close', 'code': code})
+
+        subscription = get_broker().subscribe(team_id)
+        await send({'type': 'websocket.accept'})
+        writer = asyncio.ensure_future(self._push(user, team_id, subscription, send, close))
+        try:
+            while not closed:
+                event = await receive()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                if event['type'] == 'websocket.receive':
+                    await self._handle_frame(user, team_id, event, send, close)
+        finally:
+            writer.cancel()
+            subscription.close()
+
+    async def _push(self, user, team_id, subscription, send, close):
+        while True:
+            event = await subscription.get()
+            if event['type'] == 'access_changed':
+                # Internal: recheck before anything else is delivered.
+                if event['user_ids'] is None or user.id in event['user_ids']:
+                    if not await database_sync_to_async(_can_join)(user, team_id):
+                        await close(CLOSE_FORBIDDEN)
+                        return
+                continue
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    async def _handle_frame(self, user, team_id, event, send, close):
+        try:
+            data = json.loads(event.get('text') or '')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            error = 'Expected a JSON object.'
+        else:
+            try:
+                error = await database_sync_to_async(_save_message)(user, team_id, data.get('content'))
+            except AccessRevoked:
+                await close(CLOSE_FORBIDDEN)
+                return
+        if error:
+            await send({'type': 'websocket.send', 'text': json.dumps({'type': 'error', 'detail': error})})
+
+
+def websocket_router(http_application):
+    """Serve team chat sockets; hand everything else to Django."""
+    chat = TeamChatConsumer()
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'websocket':
+            if TEAM_CHAT_PATH.match(scope['path']):
+                return await chat(scope, receive, send)
+            await receive()
+            await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+            return
+        return await http_application(scope, receive, send)
+
+    return application
@@ -0,0 +1,174 @@
+import copy
+import heapq
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Wall-clock steps: a daily 09:00 event stays at 09:00 across DST changes.
+RECURRENCE_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+# Upper bound for one expansion request, so a window can never be unbounded.
+MAX_EXPANSION_WINDOW = timedelta(days=366)
+
+# Events up to this long are read with a lower start_time bound, so a window
+# read costs the same however much history the owner has. Longer ones are
+# flagged CalendarEvent.is_long and read from their own partial index.
+LONG_EVENT_DURATION = timedelta(days=31)
+
+_RESOLUTION = timedelta(microseconds=1)
+
+
+def recurrence_step(event):
+    step = RECURRENCE_STEPS.get(event.recurrence)
+    if step is None:
+        return None
+    return step * max(event.recurrence_interval or 1, 1)
+
+
+def event_timezone(event):
+    """The zone a series repeats in: the event's own, else settings.TIME_ZONE."""
+    if event.time_zone:
+        try:
+            return ZoneInfo(event.time_zone)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.get_default_timezone()
+
+
+def occurrence_index(event, occurrence_start):
+    """The slot index of `occurrence_start`, counted in the event's local time."""
+    tz = event_timezone(event)
+    wall_start = event.start_time.astimezone(tz).replace(tzinfo=None)
+    wall_occurrence = occurrence_start.astimezone(tz).replace(tzinfo=None)
+    return (wall_occurrence - wall_start) // recurrence_step(event)
+
+
+def occurrence_at(event, index):
+    """The start of slot `index` (0 is the master's start), stepped in local time."""
+    local_start = event.start_time.astimezone(event_timezone(event))
+    return (local_start + recurrence_step(event) * index).astimezone(dt_timezone.utc)
+
+
+def parse_exceptions(values):
+    exceptions = set()
+    for value in values or ():
+        parsed = parse_datetime(value) if isinstance(value, str) else value
+        if parsed is not None:
+            exceptions.add(parsed)
+    return exceptions
+
+
+def iter_occurrences(event, window_start, window_end):
+    """
+    Yield (start, end) of every occurrence of `event` overlapping
+    [window_start, window_end), in order.
+
+    Occurrences step by days/weeks * interval of local time in the event's
+    zone (see event_timezone), keeping the master's wall-clock start, and
+    last as long as the master. The first candidate is computed
+    arithmetically, so the cost depends on the window, not on how long the
+    series has been running.
+    """
+    duration = event.end_time - event.start_time
+    step = recurrence_step(event)
+    if step is None:
+        if event.start_time < window_end and event.end_time > window_start:
+            yield event.start_time, event.end_time
+        return
+
+    exceptions = parse_exceptions(event.recurrence_exceptions)
+    # Local steps drift from fixed 24h/7d ones by at most a DST shift, which
+    # is less than one step: start one slot early.
+    index = max((window_start - duration - event.start_time) // step - 1, 0)
+    while True:
+        if event.recurrence_count is not None and index >= event.recurrence_count:
+            return
+        start = occurrence_at(event, index)
+        if start >= window_end:
+            return
+        if event.recurrence_until is not None and start > event.recurrence_until:
+            return
+        end = start + duration
+        if end > window_start and start not in exceptions:
+            yield start, end
+        index += 1
+
+
+def expand_event(event, window_start, window_end):
+    """Yield transient copies of `event`, one per occurrence inside the window."""
+    for start, end in iter_occurrences(event, window_start, window_end):
+        occurrence = copy.copy(event)
+        occurrence.start_time = start
+        occurrence.end_time = end
+        occurrence.occurrence_start = start if event.recurrence != 'none' else None
+        yield occurrence
+
+
+def expand_events(events, window_start, window_end):
+    """Merge the expansions of many events into one stream ordered by start_time."""
+    return heapq.merge(
+        *(expand_event(event, window_start, window_end) for event in events),
+        key=lambda occurrence: (occurrence.start_time, occurrence.pk),
+    )
+
+
+def occurrences_in_window(queryset, window_start, window_end, after=None):
+    """
+    Every occurrence from `queryset` overlapping [window_start, window_end),
+    ordered by (start_time, id); with `after` = (start_time, id), only the
+    occurrences ordered after that position.
+
+    One-off events are range reads (start_time < end AND end_time > start)
+    streamed from the database: events up to LONG_EVENT_DURATION with that
+    much of a lower start_time bound, long events separately. Recurring
+    masters are fetched apart and expanded in memory; the three streams are
+    merged.
+    """
+    queryset = queryset.order_by('start_time', 'pk')
+    single = queryset.filter(recurrence='none', start_time__lt=window_end, end_time__gt=window_start)
+    masters = queryset.exclude(recurrence='none').filter(
+        Q(recurrence_until__isnull=True)
+        | Q(recurrence_until__gt=window_start - (F('end_time') - F('start_time'))),
+        start_time__lt=window_end,
+    )
+    expand_from = window_start
+    if after is not None:
+        after_start, after_id = after
+        single = single.filter(Q(start_time__gt=after_start) | Q(start_time=after_start, pk__gt=after_id))
+        # Occurrences starting at or after `after_start` end after this too.
+        expand_from = max(window_start, after_start - _RESOLUTION)
+
+    occurrences = heapq.merge(
+        single.filter(is_long=False, start_time__gt=window_start - LONG_EVENT_DURATION).iterator(),
+        single.filter(is_long=True).iterator(),
+        expand_events(list(masters), expand_from, window_end),
+        key=lambda occurrence: (occurrence.start_time, occurrence.pk),
+    )
+    if after is None:
+        return occurrences
+    return (occurrence for occurrence in occurrences if (occurrence.start_time, occurrence.pk) > after)
+
+
+def merge_busy_intervals(occurrences, window_start, window_end):
+    """
+    Collapse occurrences (ordered by start_time, any number of owners) into
+    disjoint busy intervals per owner_id, clipped to the window, in one pass.
+    """
+    busy = {}
+    for occurrence in occurrences:
+        start = max(occurrence.start_time, window_start)
+        end = min(occurrence.end_time, window_end)
+        intervals = busy.setdefault(occurrence.owner_id, [])
+        if intervals and start <= intervals[-1][1]:
+            if end > intervals[-1][1]:
+                intervals[-1][1] = end
+        else:
+            intervals.append([start, end])
+    return busy
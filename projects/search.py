@@ -0,0 +1,169 @@
+import functools
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+SEARCH_KINDS = ('task', 'project', 'message', 'event')
+MAX_SEARCH_RESULTS = 50
+
+SEARCH_TABLE = 'projects_searchentry'
+# SQLite only: FTS5 index over SEARCH_TABLE, kept in sync by triggers.
+FTS_TABLE = 'projects_searchentry_fts'
+
+_TERM = re.compile(r'\w+')
+_COLUMNS = 'e.id, e.kind, e.object_id, e.team_id, e.user_id, e.title, e.body, e.updated_at'
+
+# model name -> (kind, team_id, user_id, title, body, updated_at). Migration
+# 0023 indexes existing rows with its own copy.
+_DOCUMENTS = {
+    'Task': lambda task: (
+        'task', task.team_id, task.responsible_id, task.title, task.description, task.updated_at,
+    ),
+    'Project': lambda project: (
+        'project', project.team_id, None, project.project_title, project.description, project.updated_at,
+    ),
+    'TeamMessage': lambda message: (
+        'message', message.team_id, message.author_id, '', message.content, message.created_at,
+    ),
+    'CalendarEvent': lambda event: (
+        'event', None, event.owner_id, event.title,
+        '\n'.join(filter(None, [event.description, event.location])), event.updated_at,
+    ),
+}
+
+
+def entry_values(instance):
+    kind, team_id, user_id, title, body, updated_at = _DOCUMENTS[type(instance).__name__](instance)
+    return {
+        'kind': kind,
+        'object_id': instance.pk,
+        'team_id': team_id,
+        'user_id': user_id,
+        'title': title or '',
+        'body': body or '',
+        'updated_at': updated_at,
+    }
+
+
+def index_documents(instances):
+    """Upsert the search entries of `instances` (one statement per call)."""
+    from .models import SearchEntry
+
+    entries = [SearchEntry(**entry_values(instance)) for instance in instances]
+    if entries:
+        SearchEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['team_id', 'user_id', 'title', 'body', 'updated_at'],
+        )
+
+
+def unindex_document(instance):
+    from .models import SearchEntry
+
+    kind = _DOCUMENTS[type(instance).__name__](instance)[0]
+    SearchEntry.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def search_terms(query):
+    return _TERM.findall(query.lower())
+
+
+@functools.lru_cache(maxsize=None)
+def _has_fts_table(database_name):
+    # Missing when SQLite was built without FTS5 (see migration 0023).
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def _backend():
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and _has_fts_table(str(connection.settings_dict['NAME'])):
+        return 'sqlite'
+    return 'fallback'
+
+
+def _match_expression(terms, backend):
+    # Every term must match, as a prefix so results show up while typing.
+    # Terms are \w+ runs, so they carry no query syntax of either engine.
+    if backend == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching_ids(kind, terms):
+    """
+    Subquery of the ids of `kind` objects matching all `terms`, to filter a
+    model queryset with (`pk__in=...`). None without a full-text index.
+    """
+    backend = _backend()
+    if backend == 'postgresql':
+        sql = (
+            f'SELECT object_id FROM {SEARCH_TABLE} '
+            "WHERE kind = %s AND document @@ to_tsquery('simple', %s)"
+        )
+    elif backend == 'sqlite':
+        sql = (
+            f'SELECT e.object_id FROM {FTS_TABLE} JOIN {SEARCH_TABLE} e ON e.id = {FTS_TABLE}.rowid '
+            f'WHERE e.kind = %s AND {FTS_TABLE} MATCH %s'
+        )
+    else:
+        return None
+    return RawSQL(sql, [kind, _match_expression(terms, backend)])
+
+
+def _scope_sql(team_ids, user_id, kinds):
+    # Team rows of the user's teams, plus their personal tasks and events.
+    scope = ['(e.team_id IS NULL AND e.user_id = %s)']
+    params = [user_id]
+    if team_ids:
+        scope.append(f"e.team_id IN ({', '.join(['%s'] * len(team_ids))})")
+        params.extend(team_ids)
+    kinds = list(kinds)
+    sql = f"({' OR '.join(scope)}) AND e.kind IN ({', '.join(['%s'] * len(kinds))})"
+    return sql, params + kinds
+
+
+def search_entries(user, query, team_ids, kinds=SEARCH_KINDS, limit=20):
+    """
+    Entries visible to `user` matching every word of `query`, best first.
+    Each entry carries a `rank` (higher is better; None without an index).
+    """
+    from .models import SearchEntry
+
+    terms = search_terms(query)
+    if not terms:
+        return []
+    scope, scope_params = _scope_sql(team_ids, user.id, kinds)
+    backend = _backend()
+
+    if backend == 'postgresql':
+        sql = (
+            f'SELECT {_COLUMNS}, ts_rank(e.document, q) AS rank '
+            f"FROM {SEARCH_TABLE} e, to_tsquery('simple', %s) q "
+            f'WHERE e.document @@ q AND {scope} '
+            'ORDER BY rank DESC, e.updated_at DESC LIMIT %s'
+        )
+    elif backend == 'sqlite':
+        # bm25() is lower-is-better; titles weigh ten times the body.
+        sql = (
+            f'SELECT {_COLUMNS}, -bm25({FTS_TABLE}, 10.0, 1.0) AS rank '
+            f'FROM {FTS_TABLE} JOIN {SEARCH_TABLE} e ON e.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND {scope} '
+            'ORDER BY rank DESC, e.updated_at DESC LIMIT %s'
+        )
+    else:
+        match, match_params = [], []
+        for term in terms:
+            match.append('(e.title LIKE %s OR e.body LIKE %s)')
+            match_params.extend([f'%{term}%'] * 2)
+        sql = (
+            f'SELECT {_COLUMNS}, NULL AS rank FROM {SEARCH_TABLE} e '
+            f"WHERE {' AND '.join(match)} AND {scope} "
+            'ORDER BY e.updated_at DESC LIMIT %s'
+        )
+        return list(SearchEntry.objects.raw(sql, match_params + scope_params + [limit]))
+
+    return list(SearchEntry.objects.raw(sql, [_match_expression(terms, backend)] + scope_params + [limit]))
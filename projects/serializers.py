@@ -1,6 +1,9 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Category, Team, Task, Project, CalendarEvent
+from django.utils.text import Truncator
+from .models import Category, Team, Task, Project, CalendarEvent, TeamMessage, SearchEntry
 
 User = get_user_model()
 
@@ -13,16 +16,13 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    task_count = serializers.SerializerMethodField()
+    task_count = serializers.IntegerField(source='task_total', read_only=True)
 
     class Meta:
         model = Category
         fields = ['id', 'name', 'color', 'icon', 'task_count', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-    def get_task_count(self, obj):
-        return obj.tasks.count()
-
 
 class TeamListSerializer(serializers.ModelSerializer):
     team_lead = UserSerializer(read_only=True)
@@ -123,10 +123,43 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class TaskBulkDataSerializer(serializers.ModelSerializer):
+    """Field validation for bulk task writes; related ids are resolved in bulk by the caller."""
+    team = serializers.IntegerField(source='team_id', required=False, allow_null=True)
+    responsible = serializers.IntegerField(source='responsible_id', required=False)
+    category = serializers.IntegerField(source='category_id', required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = [
+            'title', 'description', 'team', 'responsible',
+            'category', 'status', 'priority', 'due_date'
+        ]
+
+
+class TaskBulkOperationSerializer(serializers.Serializer):
+    OPERATIONS = ['create', 'update', 'complete', 'delete']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and attrs.get('id') is None:
+            raise serializers.ValidationError({"id": "This field is required."})
+        if attrs['op'] in ('create', 'update') and 'data' not in attrs:
+            raise serializers.ValidationError({"data": "This field is required."})
+        return attrs
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    operations = TaskBulkOperationSerializer(many=True, allow_empty=False, max_length=1000)
+
+
 class ProjectListSerializer(serializers.ModelSerializer):
     team = TeamListSerializer(read_only=True)
     progress = serializers.ReadOnlyField()
-    task_count = serializers.SerializerMethodField()
+    task_count = serializers.IntegerField(source='task_total', read_only=True)
 
     class Meta:
         model = Project
@@ -135,9 +168,6 @@ class ProjectListSerializer(serializers.ModelSerializer):
             'task_count', 'deadline', 'created_at'
         ]
 
-    def get_task_count(self, obj):
-        return obj.tasks.count()
-
 
 class ProjectDetailSerializer(serializers.ModelSerializer):
     team = TeamListSerializer(read_only=True)
@@ -168,6 +198,7 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
 
 class CalendarEventSerializer(serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
+    occurrence_start = serializers.SerializerMethodField()
 
     class Meta:
         model = CalendarEvent
@@ -182,10 +213,72 @@ class CalendarEventSerializer(serializers.ModelSerializer):
             'location',
             'participants',
             'recurrence',
+            'recurrence_interval',
+            'recurrence_count',
+            'recurrence_until',
+            'recurrence_exceptions',
+            'time_zone',
             'series_id',
+            'occurrence_start',
             'is_all_day',
             'owner',
             'created_at',
             'updated_at',
         ]
         read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
+        extra_kwargs = {
+            'recurrence_interval': {'min_value': 1},
+            'recurrence_count': {'min_value': 1},
+        }
+
+    def get_occurrence_start(self, obj):
+        # Set only on occurrences expanded from a recurring master.
+        occurrence_start = getattr(obj, 'occurrence_start', None)
+        if occurrence_start is None:
+            return None
+        return serializers.DateTimeField().to_representation(occurrence_start)
+
+    def validate(self, attrs):
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time and end_time:
+            if end_time <= start_time:
+                raise serializers.ValidationError({'end_time': 'End time must be later than start time.'})
+        return attrs
+
+    def validate_time_zone(self, value):
+        if value:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise serializers.ValidationError('Unknown time zone.')
+        return value
+
+    def validate_recurrence_exceptions(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError('Expected a list of datetimes.')
+        field = serializers.DateTimeField()
+        return [field.to_representation(field.to_internal_value(item)) for item in value]
+
+
+class TeamMessageSerializer(serializers.ModelSerializer):
+    author = UserSerializer(read_only=True)
+
+    class Meta:
+        model = TeamMessage
+        fields = ['id', 'team', 'author', 'content', 'created_at']
+        read_only_fields = ['id', 'team', 'author', 'created_at']
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id')
+    team = serializers.IntegerField(source='team_id', allow_null=True)
+    excerpt = serializers.SerializerMethodField()
+    rank = serializers.FloatField(allow_null=True)
+
+    class Meta:
+        model = SearchEntry
+        fields = ['kind', 'id', 'team', 'title', 'excerpt', 'rank', 'updated_at']
+
+    def get_excerpt(self, obj):
+        return Truncator(obj.body).chars(200)
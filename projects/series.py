@@ -0,0 +1,218 @@
+import copy
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import CalendarEvent
+from .recurrence import LONG_EVENT_DURATION, iter_occurrences, occurrence_at, occurrence_index, parse_exceptions
+from .search import index_documents
+
+SERIES_SCOPES = ('this', 'following', 'all')
+
+# Fields a series edit copies to every affected row.
+SERIES_FIELDS = ('title', 'description', 'calendar_id', 'color', 'location', 'participants', 'is_all_day')
+
+# Fields that define the series itself; a series edit cannot change them.
+RECURRENCE_FIELDS = (
+    'recurrence', 'recurrence_interval', 'recurrence_count', 'recurrence_until',
+    'recurrence_exceptions', 'time_zone', 'series_id',
+)
+
+_RESOLUTION = timedelta(microseconds=1)
+
+
+class SeriesEditError(Exception):
+    """A series edit that cannot be applied; `field` names the offending input."""
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+
+
+def is_occurrence(event, occurrence_start):
+    return any(
+        start == occurrence_start
+        for start, _ in iter_occurrences(event, occurrence_start, occurrence_start + _RESOLUTION)
+    )
+
+
+def series_rows(event):
+    """Every stored row of the event's series: recurring masters and detached one-offs."""
+    if not event.series_id:
+        return CalendarEvent.objects.filter(pk=event.pk)
+    return CalendarEvent.objects.filter(owner_id=event.owner_id, series_id=event.series_id)
+
+
+def _ensure_series_id(event):
+    if not event.series_id:
+        event.series_id = f'series-{uuid.uuid4().hex}'
+
+
+def _add_exception(event, occurrence_start):
+    exceptions = list(event.recurrence_exceptions or [])
+    exceptions.append(occurrence_start.isoformat())
+    event.recurrence_exceptions = exceptions
+    event.save(update_fields=['series_id', 'recurrence_exceptions', 'updated_at'])
+
+
+def _end_before(rows, occurrence_start):
+    """Stop every recurring master in `rows` right before `occurrence_start`."""
+    return rows.exclude(recurrence='none').filter(
+        Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=occurrence_start),
+        start_time__lt=occurrence_start,
+    ).update(recurrence_until=occurrence_start - _RESOLUTION, updated_at=timezone.now())
+
+
+def _shift_exceptions(rows, start_delta):
+    if not start_delta:
+        return
+    masters = rows.exclude(recurrence='none').exclude(recurrence_exceptions=[])
+    for master in masters.only('pk', 'recurrence_exceptions'):
+        master.recurrence_exceptions = sorted(
+            (value + start_delta).isoformat() for value in parse_exceptions(master.recurrence_exceptions)
+        )
+        master.save(update_fields=['recurrence_exceptions'])
+
+
+def _split(event, occurrence_start):
+    """Move the occurrences of `event` from `occurrence_start` on into a new master."""
+    _ensure_series_id(event)
+    exceptions = parse_exceptions(event.recurrence_exceptions)
+
+    tail = copy.copy(event)
+    tail.pk = tail.id = None
+    tail._state = copy.copy(event._state)
+    tail._state.adding = True
+    tail.start_time = occurrence_start
+    tail.end_time = occurrence_start + (event.end_time - event.start_time)
+    tail.recurrence_exceptions = sorted(value.isoformat() for value in exceptions if value >= occurrence_start)
+    if event.recurrence_count is not None:
+        # The count includes skipped slots, so subtract the slot index.
+        tail.recurrence_count = event.recurrence_count - occurrence_index(event, occurrence_start)
+    tail.save()
+
+    event.recurrence_until = occurrence_start - _RESOLUTION
+    event.recurrence_exceptions = sorted(value.isoformat() for value in exceptions if value < occurrence_start)
+    event.save(update_fields=['series_id', 'recurrence_until', 'recurrence_exceptions', 'updated_at'])
+
+
+def _split_following(rows, occurrence_start):
+    """
+    Split every recurring master in `rows` that started before
+    `occurrence_start` at its first slot from there on, so the later slots can
+    be edited with the rows that follow (e.g. when a detached one-off is
+    addressed instead of its master).
+    """
+    for master in rows.exclude(recurrence='none').filter(start_time__lt=occurrence_start):
+        index = occurrence_index(master, occurrence_start)
+        if occurrence_at(master, index) < occurrence_start:
+            index += 1
+        split_start = occurrence_at(master, index)
+        if master.recurrence_count is not None and index >= master.recurrence_count:
+            continue
+        if master.recurrence_until is not None and split_start > master.recurrence_until:
+            continue
+        _split(master, split_start)
+
+
+def delete_series(event, occurrence_start, scope):
+    """Delete one occurrence, the occurrences from `occurrence_start` on, or the whole series."""
+    with transaction.atomic():
+        if scope == 'this':
+            if event.recurrence == 'none':
+                event.delete()
+            else:
+                _add_exception(event, occurrence_start)
+            return
+
+        rows = series_rows(event)
+        if scope == 'following':
+            _end_before(rows, occurrence_start)
+            rows = rows.filter(start_time__gte=occurrence_start)
+        rows.delete()
+
+
+def _recurrence_changed(event, field, value):
+    if field == 'recurrence_exceptions':
+        return parse_exceptions(value) != parse_exceptions(event.recurrence_exceptions)
+    return value != getattr(event, field)
+
+
+def edit_series(event, occurrence_start, scope, changes):
+    """
+    Apply `changes` to one occurrence, the occurrences from `occurrence_start`
+    on, or the whole series, and return the number of rows written.
+
+    `start_time`/`end_time` in `changes` are the new times of the addressed
+    occurrence; every affected row is shifted by the same offsets in the one
+    UPDATE that writes the other fields. Raises SeriesEditError for changes to
+    RECURRENCE_FIELDS, or times that would end some row before it starts.
+    """
+    for field in RECURRENCE_FIELDS:
+        if field in changes and _recurrence_changed(event, field, changes[field]):
+            raise SeriesEditError(field, 'Recurrence rules cannot be changed by a series edit.')
+    occurrence_end = occurrence_start + (event.end_time - event.start_time)
+    changes = {field: value for field, value in changes.items() if field in SERIES_FIELDS + ('start_time', 'end_time')}
+    start_delta = changes.pop('start_time', occurrence_start) - occurrence_start
+    end_delta = changes.pop('end_time', occurrence_end) - occurrence_end
+
+    with transaction.atomic():
+        if scope == 'this':
+            if occurrence_end + end_delta <= occurrence_start + start_delta:
+                raise SeriesEditError('end_time', 'End time must be later than start time.')
+            if event.recurrence == 'none':
+                for field, value in changes.items():
+                    setattr(event, field, value)
+                event.start_time += start_delta
+                event.end_time += end_delta
+                event.save()
+                return 1
+            # The detached one-off stays part of the series for later edits.
+            _ensure_series_id(event)
+            _add_exception(event, occurrence_start)
+            detached = CalendarEvent(
+                owner_id=event.owner_id,
+                series_id=event.series_id,
+                start_time=occurrence_start + start_delta,
+                end_time=occurrence_end + end_delta,
+                **{field: getattr(event, field) for field in SERIES_FIELDS},
+            )
+            for field, value in changes.items():
+                setattr(detached, field, value)
+            detached.save()
+            return 1
+
+        if scope == 'following':
+            if event.recurrence == 'none':
+                _split_following(series_rows(event), occurrence_start)
+            elif occurrence_start > event.start_time:
+                _split(event, occurrence_start)
+
+        rows = series_rows(event)
+        if scope == 'following':
+            rows = rows.filter(start_time__gte=occurrence_start)
+        # Rows differ in length, so a shorter shift may invert any of them.
+        if end_delta < start_delta and rows.filter(end_time__lte=F('start_time') + (start_delta - end_delta)).exists():
+            raise SeriesEditError('end_time', 'End time must be later than start time for every event in the series.')
+        updated = rows.update(
+            **changes,
+            start_time=F('start_time') + start_delta,
+            end_time=F('end_time') + end_delta,
+            recurrence_until=F('recurrence_until') + start_delta,
+            # CalendarEvent.save() is skipped; compared on the old times.
+            is_long=ExpressionWrapper(
+                Q(end_time__gt=F('start_time') + (LONG_EVENT_DURATION + start_delta - end_delta)),
+                output_field=BooleanField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        if scope == 'following':
+            rows = series_rows(event).filter(start_time__gte=occurrence_start + start_delta)
+        _shift_exceptions(rows, start_delta)
+        if changes.keys() & {'title', 'description', 'location'}:
+            # The UPDATE above sent no post_save.
+            index_documents(rows)
+        return updated
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent once per TaskQuerySet.complete()/reopen() call, after the UPDATE.
+# kwargs: task_ids, completed, team_counts, category_counts
+# (the *_counts map a team/category id to how many of its tasks flipped).
+tasks_completion_changed = Signal()
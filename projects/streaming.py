@@ -0,0 +1,29 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+async def _iterate_in_thread(chunks):
+    # Thread-sensitive: every chunk is produced on the request's thread, so a
+    # queryset iterator keeps its connection (and cursor) between chunks.
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def streaming_response(request, chunks, **kwargs):
+    """
+    A StreamingHttpResponse that streams under WSGI and ASGI alike. Served over
+    ASGI, Django reads a sync iterator to the end before sending anything, so
+    there the chunks are pulled one at a time by an async generator instead.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _iterate_in_thread(iter(chunks))
+    return StreamingHttpResponse(chunks, **kwargs)
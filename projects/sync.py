@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CalendarEvent, Project, Task, Tombstone
+from .serializers import CalendarEventSerializer, ProjectListSerializer, TaskListSerializer
+from .visibility import get_visible_team_ids, visible_tasks_filter
+
+# Rows are stamped before their transaction commits, so a change can become
+# visible slightly after the watermark it was stamped under. Re-reading this
+# much before the watermark keeps such rows from being missed; clients
+# upsert by id, so the overlap is harmless.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def tombstone_retention():
+    return timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def prune_tombstones():
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()
+    return deleted
+
+
+def build_delta(user, updated_since, context=None):
+    """
+    Everything visible to `user` that changed after `updated_since`: changed
+    tasks, projects and calendar events, plus the ids of deleted ones.
+
+    Without a watermark, or with one older than the tombstone retention, a
+    full snapshot is returned (`full: true`) and the client should replace
+    its cache. The returned `watermark` is the value to send next time.
+    """
+    watermark = timezone.now()
+    team_ids = get_visible_team_ids(user)
+    full = updated_since is None or updated_since < watermark - tombstone_retention()
+
+    visible = {
+        'tasks': Task.objects.filter(visible_tasks_filter(user)),
+        'projects': Project.objects.filter(team_id__in=team_ids),
+        'events': CalendarEvent.objects.filter(owner=user),
+    }
+    tasks = visible['tasks'].select_related('responsible', 'category', 'team')
+    projects = visible['projects'].select_related('team__team_lead').prefetch_related('team__members')
+    events = visible['events'].select_related('owner')
+
+    deleted = {'tasks': [], 'projects': [], 'events': []}
+    if not full:
+        since = updated_since - SYNC_OVERLAP
+        tasks = tasks.filter(updated_at__gt=since)
+        projects = projects.filter(updated_at__gt=since)
+        events = events.filter(updated_at__gt=since)
+
+        tombstones = (
+            Tombstone.objects
+            .filter(Q(team_id__in=team_ids) | Q(user_id=user.id), deleted_at__gt=since)
+            .values_list('kind', 'object_id')
+        )
+        for kind, object_id in tombstones:
+            deleted[f'{kind}s'].append(object_id)
+
+        # A row moved between two scopes the user sees (say, between two of
+        # their teams) is tombstoned in the old one but still visible: only
+        # report ids the user can no longer see.
+        for key, object_ids in deleted.items():
+            if object_ids:
+                still_visible = set(visible[key].filter(pk__in=object_ids).values_list('pk', flat=True))
+                deleted[key] = [pk for pk in dict.fromkeys(object_ids) if pk not in still_visible]
+
+    return {
+        'watermark': watermark,
+        'full': full,
+        'team_ids': team_ids,
+        'tasks': TaskListSerializer(tasks.order_by('updated_at', 'pk'), many=True, context=context).data,
+        'projects': ProjectListSerializer(projects.order_by('updated_at', 'pk'), many=True, context=context).data,
+        'events': CalendarEventSerializer(events.order_by('updated_at', 'pk'), many=True, context=context).data,
+        'deleted': deleted,
+    }
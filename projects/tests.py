@@ -0,0 +1,1019 @@
+import asyncio
+import base64
+import json
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from unittest import skipUnless
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from asgiref.sync import sync_to_async
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .ical import import_ics, iter_ics
+from .models import CalendarEvent, Category, Project, Task, Team, TeamMembership, TeamMessage, Tombstone
+from .realtime import CLOSE_FORBIDDEN, CLOSE_UNAUTHORIZED, TeamChatConsumer
+from .recurrence import iter_occurrences, occurrences_in_window
+from .signals import tasks_completion_changed
+from .streaming import streaming_response
+from .views import TEAM_CHAT_HISTORY
+from .visibility import get_visibility_scope, get_visible_team_ids, visible_tasks_filter
+
+User = get_user_model()
+
+
+class ProjectsTestCase(TestCase):
+    """A team lead, a member, an outsider and an authenticated API client."""
+
+    def setUp(self):
+        cache.clear()
+        self.lead = User.objects.create_user('lead', 'lead@example.com', 'pass')
+        self.member = User.objects.create_user('member', 'member@example.com', 'pass')
+        self.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pass')
+        self.team = Team.objects.create(team_lead=self.lead, name='Core')
+        self.team.members.add(self.member)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def make_task(self, **fields):
+        fields.setdefault('title', 'Task')
+        fields.setdefault('team', self.team)
+        fields.setdefault('responsible', self.member)
+        return Task.objects.create(**fields)
+
+    def make_event(self, **fields):
+        fields.setdefault('owner', self.member)
+        fields.setdefault('title', 'Event')
+        return CalendarEvent.objects.create(**fields)
+
+
+@override_settings(SHARED_CACHE=True)
+class VisibilityCacheTests(ProjectsTestCase):
+    def test_scope_is_served_from_cache(self):
+        self.assertEqual(get_visibility_scope(self.member)['team_ids'], [self.team.id])
+        with self.assertNumQueries(0):
+            get_visibility_scope(self.member)
+
+    def test_membership_change_invalidates_scope(self):
+        get_visibility_scope(self.outsider)
+        self.team.members.add(self.outsider)
+        self.assertEqual(get_visibility_scope(self.outsider)['team_ids'], [self.team.id])
+        self.team.members.remove(self.outsider)
+        self.assertEqual(get_visibility_scope(self.outsider)['team_ids'], [])
+
+    def test_first_personal_task_becomes_visible(self):
+        get_visibility_scope(self.outsider)
+        task = self.make_task(team=None, responsible=self.outsider)
+        visible = Task.objects.filter(visible_tasks_filter(self.outsider))
+        self.assertEqual(list(visible), [task])
+
+
+class VisibilityWithoutSharedCacheTests(ProjectsTestCase):
+    def test_scope_is_a_subquery(self):
+        with self.assertNumQueries(0):
+            condition = visible_tasks_filter(self.outsider)
+        task = self.make_task(responsible=self.outsider)
+        self.assertFalse(Task.objects.filter(condition).exists())
+        self.team.members.add(self.outsider)
+        self.assertEqual(list(Task.objects.filter(condition)), [task])
+
+    def test_team_ids_are_read_every_time(self):
+        self.assertEqual(get_visible_team_ids(self.member), [self.team.id])
+        with self.assertNumQueries(1):
+            self.assertEqual(get_visible_team_ids(self.member), [self.team.id])
+
+
+@override_settings(SHARED_CACHE=True)
+class DashboardStatsTests(ProjectsTestCase):
+    url = '/api/v1/dashboard/'
+
+    def test_counts(self):
+        self.make_task(priority='high', status='progress')
+        self.make_task(priority='high', is_completed=True, status='done')
+        self.make_task(team=None, priority='low')
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['total_tasks'], 3)
+        self.assertEqual(data['completed_tasks'], 1)
+        self.assertEqual(data['in_progress_tasks'], 1)
+        self.assertEqual(data['tasks_by_priority'], {'low': 1, 'high': 2})
+        self.assertEqual(data['total_teams'], 1)
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        for index in range(3):
+            self.make_task(title=f'Task {index}')
+        self.client.get(self.url)  # warms the visibility scope
+        # Two version reads for the ETag, task and project aggregates, recent tasks.
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+        for index in range(30):
+            self.make_task(title=f'More {index}', team=None)
+        self.client.get(self.url)
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+
+class DashboardBenchmarkTests(ProjectsTestCase):
+    """The dashboard over 100k tasks is the same fixed set of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('busy', 'busy@example.com', 'pass')
+        team = Team.objects.create(team_lead=owner, name='Busy')
+        priorities = [priority for priority, _ in Task.PRIORITY_CHOICES]
+        Task.objects.bulk_create(
+            (
+                Task(
+                    title=f'Task {index}', team=team if index % 10 else None, responsible=owner,
+                    priority=priorities[index % 4], priority_rank=Task.PRIORITY_RANKS[priorities[index % 4]],
+                    is_completed=index % 3 == 0, due_date=date(2026, 1, 1) + timedelta(days=index % 60),
+                )
+                for index in range(100000)
+            ),
+            batch_size=5000,
+        )
+        cls.owner = owner
+
+    def test_query_count(self):
+        self.client.force_authenticate(self.owner)
+        self.client.get('/api/v1/dashboard/')
+        # Visible team ids, two version reads for the ETag, task and project
+        # aggregates, recent tasks. `manage.py benchmark_dashboard` times it.
+        with self.assertNumQueries(6):
+            data = self.client.get('/api/v1/dashboard/').json()
+        self.assertEqual((data['total_tasks'], data['completed_tasks']), (100000, 33334))
+        self.assertEqual(sum(data['tasks_by_priority'].values()), 100000)
+
+
+@override_settings(SHARED_CACHE=True)
+class DashboardTeamStatsTests(ProjectsTestCase):
+    url = '/api/v1/dashboard/team-stats/'
+
+    def test_query_count_does_not_grow_with_teams(self):
+        self.make_task(is_completed=True)
+        self.make_task()
+        self.client.get(self.url)  # warms the visibility scope
+        # Annotated teams with lead profiles, members, member profiles.
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).json()
+        team = data['teams'][0]
+        self.assertEqual((team['total_tasks'], team['completed_tasks']), (2, 1))
+        self.assertEqual([member['username'] for member in team['members']], ['lead', 'member'])
+
+        for index in range(5):
+            other = Team.objects.create(team_lead=self.lead, name=f'Team {index}')
+            other.members.add(self.member, self.outsider)
+        self.client.get(self.url)
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data['teams']), 6)
+
+
+class CounterTests(ProjectsTestCase):
+    def assertCounters(self, obj, total, completed):
+        obj.refresh_from_db()
+        self.assertEqual((obj.task_total, obj.task_completed), (total, completed))
+
+    def test_task_lifecycle_keeps_counters(self):
+        category = Category.objects.create(name='Work')
+        project = Project.objects.create(project_title='Launch', team=self.team)
+        task = self.make_task(category=category)
+        project.tasks.add(task)
+        self.assertCounters(self.team, 1, 0)
+        self.assertCounters(category, 1, 0)
+        self.assertCounters(project, 1, 0)
+
+        task.complete()
+        self.assertCounters(self.team, 1, 1)
+        self.assertCounters(category, 1, 1)
+        self.assertCounters(project, 1, 1)
+
+        other = Team.objects.create(team_lead=self.lead, name='Other')
+        other.members.add(self.member)
+        task.team = other
+        task.save()
+        self.assertCounters(self.team, 0, 0)
+        self.assertCounters(other, 1, 1)
+
+        task.delete()
+        self.assertCounters(other, 0, 0)
+        self.assertCounters(category, 0, 0)
+        self.assertCounters(project, 0, 0)
+
+    def test_queryset_complete_updates_counters_in_bulk(self):
+        for index in range(3):
+            self.make_task(title=f'Task {index}')
+        self.assertEqual(Task.objects.filter(team=self.team).complete(), 3)
+        self.assertCounters(self.team, 3, 3)
+        Task.objects.filter(team=self.team).reopen()
+        self.assertCounters(self.team, 3, 0)
+
+    def test_admin_mark_completed_is_one_update(self):
+        category = Category.objects.create(name='Work')
+        tasks = [self.make_task(title=f'Task {index}', category=category) for index in range(3)]
+        tasks[0].complete()
+        sent = []
+
+        def receiver(sender, task_ids, completed, **kwargs):
+            sent.append((sorted(task_ids), completed))
+
+        tasks_completion_changed.connect(receiver, sender=Task)
+        self.addCleanup(tasks_completion_changed.disconnect, receiver, sender=Task)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post('/admin/projects/task/', {
+                'action': 'mark_completed',
+                '_selected_action': [task.pk for task in tasks],
+            })
+        self.assertEqual(response.status_code, 302)
+        task_updates = [
+            query['sql'] for query in captured
+            if query['sql'].startswith('UPDATE') and 'projects_task"' in query['sql'].split(' SET ')[0]
+        ]
+        self.assertEqual(len(task_updates), 1)
+        # The already completed task is left alone.
+        self.assertEqual(sent, [([tasks[1].pk, tasks[2].pk], True)])
+        self.assertCounters(self.team, 3, 3)
+        self.assertCounters(category, 3, 3)
+        self.assertEqual(Task.objects.filter(status='done', completed_at__isnull=False).count(), 3)
+
+    def test_member_count(self):
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.member_count, 1)
+        self.team.members.add(self.outsider)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.member_count, 2)
+
+
+class KeysetPaginationTests(ProjectsTestCase):
+    def walk(self, url):
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+        return ids
+
+    def test_cursor_walks_tasks_in_list_order(self):
+        due_dates = [None, date(2026, 1, 5), date(2026, 1, 1), None, date(2026, 1, 5)]
+        for index, priority in enumerate(['low', 'high', 'urgent', 'high', 'medium', 'high', 'low']):
+            self.make_task(title=f'Task {index}', priority=priority, due_date=due_dates[index % 5])
+        expected = [
+            task.id for task in sorted(
+                Task.objects.all(),
+                key=lambda task: (-task.priority_rank, task.due_date is None, task.due_date or date.min,
+                                  -task.created_at.timestamp(), -task.id),
+            )
+        ]
+        self.assertEqual(self.walk('/api/v1/tasks/?pagination=cursor&page_size=2'), expected)
+
+    def test_cursor_pages_do_not_count(self):
+        for index in range(5):
+            self.make_task(title=f'Task {index}')
+        response = self.client.get('/api/v1/tasks/?pagination=cursor&page_size=2')
+        self.assertNotIn('count', response.json())
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/tasks/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_wrong_types(self):
+        for index in range(3):
+            self.make_task(title=f'Task {index}')
+        next_url = self.client.get('/api/v1/tasks/?pagination=cursor&page_size=2').json()['next']
+        position = json.loads(base64.urlsafe_b64decode(parse_qs(urlsplit(next_url).query)['cursor'][0]))
+        for value in ['x', [1], {'a': 1}]:
+            tampered = base64.urlsafe_b64encode(json.dumps([value] * len(position)).encode()).decode()
+            response = self.client.get('/api/v1/tasks/', {'cursor': tampered})
+            self.assertEqual(response.status_code, 404, value)
+
+    def test_team_messages_page_backwards(self):
+        messages = [
+            TeamMessage.objects.create(team=self.team, author=self.member, content=f'Message {index}')
+            for index in range(5)
+        ]
+        ids = self.walk(f'/api/v1/teams/{self.team.id}/messages/?page_size=2')
+        self.assertEqual(ids, [message.id for message in reversed(messages)])
+
+
+class TeamChatHistoryTests(ProjectsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.messages = [
+            TeamMessage.objects.create(team=self.team, author=self.member, content=f'Message {index}')
+            for index in range(TEAM_CHAT_HISTORY + 5)
+        ]
+
+    def page(self, **params):
+        return self.client.get(f'/api/v1/teams/{self.team.id}/messages/', params)
+
+    def test_team_page_renders_newest_window(self):
+        self.client.force_login(self.member)
+        response = self.client.get(f'/dashboard/team/{self.team.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['chat_messages']), self.messages[-TEAM_CHAT_HISTORY:])
+        self.assertTrue(response.context['chat_has_earlier'])
+
+        TeamMessage.objects.filter(pk__in=[message.pk for message in self.messages[:5]]).delete()
+        response = self.client.get(f'/dashboard/team/{self.team.id}/')
+        self.assertEqual(len(response.context['chat_messages']), TEAM_CHAT_HISTORY)
+        self.assertFalse(response.context['chat_has_earlier'])
+
+    def test_before_is_exclusive_and_breaks_ties_by_id(self):
+        # Same timestamp for a run of messages: the id decides what is older.
+        TeamMessage.objects.filter(pk__in=[message.pk for message in self.messages[10:20]]).update(
+            created_at=self.messages[10].created_at,
+        )
+        anchor = self.messages[15]
+        data = self.page(before=anchor.id, page_size=8).json()
+        self.assertEqual([item['id'] for item in data['results']], [message.id for message in self.messages[14:6:-1]])
+
+    def test_invalid_before(self):
+        self.assertEqual(self.page(before='abc').status_code, 400)
+        self.assertEqual(self.page(before=999999).status_code, 400)
+        other_team = Team.objects.create(team_lead=self.lead, name='Other')
+        other_message = TeamMessage.objects.create(team=other_team, author=self.lead, content='Elsewhere')
+        self.assertEqual(self.page(before=other_message.id).status_code, 400)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN output is checked for SQLite and PostgreSQL')
+class TaskIndexTests(ProjectsTestCase):
+    def test_no_redundant_foreign_key_indexes(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Task._meta.db_table)
+        single_column = [c['columns'] for c in constraints.values() if c['index'] and len(c['columns']) == 1]
+        self.assertNotIn(['team_id'], single_column)
+        self.assertNotIn(['responsible_id'], single_column)
+
+    def assertUsesIndex(self, queryset, index_pattern):
+        """Assert the plan reads projects_task through an index matching `index_pattern`."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # The test table is near empty, so a scan would always win.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan)
+            self.assertRegex(plan, rf'(Index Scan|Index Only Scan|Bitmap Index Scan)( Backward)? (using|on) {index_pattern}')
+        else:
+            plan = queryset.explain()
+            self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_pattern}')
+        return plan
+
+    def test_foreign_key_lookups_use_composite_indexes(self):
+        self.assertUsesIndex(Task.objects.filter(team_id=1), r'task_team_\w+')
+        self.assertUsesIndex(Task.objects.filter(responsible_id=1), r'task_responsible_\w+')
+
+    def test_open_due_date_lookup_uses_partial_index(self):
+        queryset = Task.objects.filter(due_date__lt=date(2026, 1, 1), is_completed=False).order_by()
+        self.assertUsesIndex(queryset, 'task_open_due_date')
+
+    def test_delta_sync_lookup_uses_updated_index(self):
+        queryset = Task.objects.filter(team_id__in=[1, 2], updated_at__gt=date(2026, 1, 1)).order_by()
+        plan = self.assertUsesIndex(queryset, 'task_team_updated')
+        if connection.vendor == 'sqlite':
+            self.assertIn('task_team_updated (team_id=? AND updated_at>?)', plan)
+
+    def test_list_ordering_walks_keyset_index(self):
+        queryset = Task.objects.order_by('-priority_rank', 'due_date', '-created_at', '-id')[:20]
+        plan = self.assertUsesIndex(queryset, 'task_ordering_keyset')
+        self.assertNotIn('Sort' if connection.vendor == 'postgresql' else 'TEMP B-TREE', plan)
+
+
+class BulkTaskTests(ProjectsTestCase):
+    url = '/api/v1/tasks/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        self.other_team = Team.objects.create(team_lead=self.lead, name='Other')
+        self.other_team.members.add(self.member)
+
+    def bulk(self, *operations):
+        response = self.client.post(self.url, {'operations': list(operations)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_mixed_batch(self):
+        first = self.make_task(title='First')
+        second = self.make_task(title='Second')
+        data = self.bulk(
+            {'op': 'create', 'data': {'title': 'New', 'team': self.team.id}},
+            {'op': 'complete', 'id': first.id},
+            {'op': 'delete', 'id': second.id},
+            {'op': 'update', 'id': 999999, 'data': {'title': 'Missing'}},
+        )
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'completed', 'deleted', 'error'])
+        self.team.refresh_from_db()
+        self.assertEqual((self.team.task_total, self.team.task_completed), (2, 1))
+
+    def test_team_move_records_tombstone(self):
+        task = self.make_task()
+        self.bulk({'op': 'update', 'id': task.id, 'data': {'team': self.other_team.id}})
+        self.assertTrue(Tombstone.objects.filter(kind='task', object_id=task.id, team_id=self.team.id).exists())
+        self.team.refresh_from_db()
+        self.other_team.refresh_from_db()
+        self.assertEqual((self.team.task_total, self.other_team.task_total), (0, 1))
+
+    def test_update_without_move_records_no_tombstone(self):
+        task = self.make_task()
+        self.bulk({'op': 'update', 'id': task.id, 'data': {'title': 'Renamed'}})
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_move_to_personal_refreshes_visibility(self):
+        task = self.make_task()
+        get_visibility_scope(self.member)  # cached without personal tasks
+        self.bulk({'op': 'update', 'id': task.id, 'data': {'team': None}})
+        self.assertIn(task, Task.objects.filter(visible_tasks_filter(self.member)))
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class RecurrenceTests(ProjectsTestCase):
+    def starts(self, event, window_start, window_end):
+        return [start for start, _ in iter_occurrences(event, window_start, window_end)]
+
+    def test_daily_keeps_wall_clock_across_dst(self):
+        # 09:00 in New York: 14:00 UTC before the 2026-03-08 change, 13:00 after.
+        event = self.make_event(
+            start_time=utc(2026, 3, 6, 14), end_time=utc(2026, 3, 6, 15),
+            recurrence='daily', time_zone='America/New_York',
+        )
+        self.assertEqual(
+            self.starts(event, utc(2026, 3, 6), utc(2026, 3, 10)),
+            [utc(2026, 3, 6, 14), utc(2026, 3, 7, 14), utc(2026, 3, 8, 13), utc(2026, 3, 9, 13)],
+        )
+        # Far into the series the first candidate is still found.
+        self.assertEqual(self.starts(event, utc(2026, 11, 2), utc(2026, 11, 3)), [utc(2026, 11, 2, 14)])
+        self.assertEqual(self.starts(event, utc(2026, 7, 1), utc(2026, 7, 2)), [utc(2026, 7, 1, 13)])
+
+    def test_count_until_interval_and_exceptions(self):
+        event = self.make_event(
+            start_time=utc(2026, 1, 5, 9), end_time=utc(2026, 1, 5, 10),
+            recurrence='weekly', recurrence_interval=2, recurrence_count=4,
+            recurrence_exceptions=[utc(2026, 1, 19, 9).isoformat()],
+        )
+        self.assertEqual(
+            self.starts(event, utc(2026, 1, 1), utc(2026, 6, 1)),
+            [utc(2026, 1, 5, 9), utc(2026, 2, 2, 9), utc(2026, 2, 16, 9)],
+        )
+        event.recurrence_count = None
+        event.recurrence_until = utc(2026, 2, 2, 9)
+        self.assertEqual(self.starts(event, utc(2026, 1, 1), utc(2026, 6, 1)), [utc(2026, 1, 5, 9), utc(2026, 2, 2, 9)])
+
+    def test_occurrence_overlapping_window_start(self):
+        event = self.make_event(start_time=utc(2026, 1, 1, 22), end_time=utc(2026, 1, 2, 2), recurrence='daily')
+        self.assertEqual(self.starts(event, utc(2026, 1, 5), utc(2026, 1, 6)), [utc(2026, 1, 4, 22), utc(2026, 1, 5, 22)])
+
+    def test_list_expands_recurring_events_in_window(self):
+        self.make_event(
+            title='Standup', start_time=utc(2026, 3, 6, 14), end_time=utc(2026, 3, 6, 15),
+            recurrence='daily', time_zone='America/New_York',
+        )
+        self.make_event(title='Review', start_time=utc(2026, 3, 8, 10), end_time=utc(2026, 3, 8, 11))
+        response = self.client.get('/api/v1/calendar-events/', {'from': '2026-03-07T00:00:00Z', 'to': '2026-03-09T00:00:00Z'})
+        self.assertEqual(
+            [(item['title'], item['occurrence_start']) for item in response.json()],
+            [
+                ('Standup', '2026-03-07T19:00:00+05:00'),
+                ('Review', None),
+                ('Standup', '2026-03-08T18:00:00+05:00'),
+            ],
+        )
+
+    def test_time_zone_is_validated(self):
+        response = self.client.post('/api/v1/calendar-events/', {
+            'title': 'Event', 'start_time': '2026-03-06T14:00:00Z', 'end_time': '2026-03-06T15:00:00Z',
+            'recurrence': 'daily', 'time_zone': 'Mars/Olympus',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('time_zone', response.json())
+
+
+class CalendarWindowTests(ProjectsTestCase):
+    url = '/api/v1/calendar-events/'
+    march = {'from': '2026-03-01T00:00:00Z', 'to': '2026-04-01T00:00:00Z'}
+
+    def titles(self, params):
+        return [item['title'] for item in self.client.get(self.url, params).json()]
+
+    def test_long_event_started_before_window_is_listed(self):
+        self.make_event(title='Sabbatical', start_time=utc(2026, 1, 1), end_time=utc(2026, 6, 1))
+        self.make_event(title='Offsite', start_time=utc(2026, 2, 20), end_time=utc(2026, 3, 2))
+        self.make_event(title='January', start_time=utc(2026, 1, 10), end_time=utc(2026, 1, 11))
+        self.assertEqual(self.titles(self.march), ['Sabbatical', 'Offsite'])
+
+    def test_long_flag_follows_updates(self):
+        event = self.make_event(start_time=utc(2026, 3, 1), end_time=utc(2026, 3, 2))
+        self.assertFalse(event.is_long)
+        event.end_time = utc(2026, 5, 1)
+        event.save(update_fields=['end_time'])
+        event.refresh_from_db()
+        self.assertTrue(event.is_long)
+
+    def test_cursor_walks_window_without_repeats(self):
+        self.make_event(title='Standup', start_time=utc(2026, 3, 2, 9), end_time=utc(2026, 3, 2, 10), recurrence='daily', recurrence_count=5)
+        for day in (2, 3, 4):
+            self.make_event(title=f'Meeting {day}', start_time=utc(2026, 3, day, 9), end_time=utc(2026, 3, day, 11))
+        expected = [(item['id'], item['start_time']) for item in self.client.get(self.url, self.march).json()]
+        self.assertEqual(len(expected), 8)
+
+        walked = []
+        response = self.client.get(self.url, {**self.march, 'pagination': 'cursor', 'page_size': 3}).json()
+        while True:
+            walked += [(item['id'], item['start_time']) for item in response['results']]
+            if not response['next']:
+                break
+            response = self.client.get(response['next']).json()
+        self.assertEqual(walked, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {**self.march, 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is checked in SQLite format')
+    def test_window_read_uses_owner_index(self):
+        queryset = CalendarEvent.objects.filter(
+            owner=self.member, recurrence='none', is_long=False,
+            start_time__gt=utc(2026, 1, 29), start_time__lt=utc(2026, 4, 1), end_time__gt=utc(2026, 3, 1),
+        )
+        self.assertIn('USING INDEX calendarevent_owner_', queryset.explain())
+
+
+class FreeBusyTests(ProjectsTestCase):
+    url = '/api/v1/calendar-events/freebusy/'
+    day = {'from': '2026-03-02T00:00:00Z', 'to': '2026-03-04T00:00:00Z'}
+
+    def busy(self, users, **params):
+        response = self.client.get(self.url, {**self.day, 'users': ','.join(str(user.id) for user in users), **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return {
+            item['id']: [
+                (datetime.fromisoformat(interval['start']), datetime.fromisoformat(interval['end']))
+                for interval in item['busy']
+            ]
+            for item in response.json()['users']
+        }
+
+    def test_merges_recurring_and_one_off_events(self):
+        self.make_event(start_time=utc(2026, 3, 1, 9), end_time=utc(2026, 3, 1, 10), recurrence='daily')
+        self.make_event(start_time=utc(2026, 3, 2, 9, 30), end_time=utc(2026, 3, 2, 11))
+        self.make_event(start_time=utc(2026, 3, 3, 10), end_time=utc(2026, 3, 3, 12))
+        self.make_event(owner=self.lead, start_time=utc(2026, 3, 3, 23), end_time=utc(2026, 3, 4, 2))
+        self.assertEqual(self.busy([self.member, self.lead]), {
+            self.lead.id: [(utc(2026, 3, 3, 23), utc(2026, 3, 4))],
+            self.member.id: [
+                (utc(2026, 3, 2, 9), utc(2026, 3, 2, 11)),
+                (utc(2026, 3, 3, 9), utc(2026, 3, 3, 12)),
+            ],
+        })
+
+    def test_defaults_to_requester(self):
+        self.make_event(start_time=utc(2026, 3, 2, 9), end_time=utc(2026, 3, 2, 10))
+        self.assertEqual(list(self.busy([])), [self.member.id])
+
+    def test_only_team_members_can_be_queried(self):
+        self.make_event(owner=self.outsider, start_time=utc(2026, 3, 2, 9), end_time=utc(2026, 3, 2, 10))
+        response = self.client.get(self.url, {**self.day, 'users': f'{self.member.id},{self.outsider.id}'})
+        self.assertEqual(response.status_code, 403)
+        self.team.members.add(self.outsider)
+        self.assertEqual(len(self.busy([self.outsider])[self.outsider.id]), 1)
+        TeamMembership.objects.filter(user=self.outsider).update(is_active=False)
+        response = self.client.get(self.url, {**self.day, 'users': str(self.outsider.id)})
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_limit(self):
+        response = self.client.get(self.url, {**self.day, 'users': ','.join(str(pk) for pk in range(1, 52))})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('users', response.json())
+
+    def test_bad_requests(self):
+        for params in (
+            {**self.day, 'users': 'me'},
+            {'from': self.day['from']},
+            {'from': 'yesterday', 'to': self.day['to']},
+            {'from': self.day['to'], 'to': self.day['from']},
+            {'from': '2026-01-01T00:00:00Z', 'to': '2027-06-01T00:00:00Z'},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class CalendarWindowBenchmarkTests(ProjectsTestCase):
+    """A month of a 50k-event calendar is a handful of bounded range reads."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('busy', 'busy@example.com', 'pass')
+        start = utc(2020, 1, 1)
+        CalendarEvent.objects.bulk_create(
+            CalendarEvent(
+                owner=owner, title=f'Event {index}',
+                start_time=start + timedelta(hours=index), end_time=start + timedelta(hours=index, minutes=30),
+            )
+            for index in range(50000)
+        )
+        cls.owner = owner
+
+    def test_month_window(self):
+        self.client.force_authenticate(self.owner)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/v1/calendar-events/', {'from': '2023-01-01T00:00:00Z', 'to': '2023-02-01T00:00:00Z'})
+        self.assertEqual(len(response.json()), 31 * 24)
+
+
+class SeriesEditTests(ProjectsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.make_event(
+            title='Standup', start_time=utc(2026, 3, 2, 9), end_time=utc(2026, 3, 2, 10),
+            recurrence='daily', recurrence_count=5,
+        )
+        self.url = f'/api/v1/calendar-events/{self.event.id}/series/'
+
+    def edit(self, scope, data, occurrence=None):
+        query = f'?scope={scope}'
+        if occurrence is not None:
+            query += '&occurrence=' + occurrence.isoformat().replace('+', '%2B')
+        return self.client.patch(self.url + query, data, format='json')
+
+    def test_edit_all(self):
+        response = self.edit('all', {'title': 'Daily'})
+        self.assertEqual(response.json(), {'scope': 'all', 'updated': 1})
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.title, 'Daily')
+
+    def test_edit_this_detaches_occurrence(self):
+        self.edit('this', {'title': 'Moved', 'start_time': '2026-03-04T11:00:00Z', 'end_time': '2026-03-04T12:00:00Z'}, utc(2026, 3, 4, 9))
+        self.event.refresh_from_db()
+        self.assertEqual(
+            [start for start, _ in iter_occurrences(self.event, utc(2026, 3, 1), utc(2026, 4, 1))],
+            [utc(2026, 3, 2, 9), utc(2026, 3, 3, 9), utc(2026, 3, 5, 9), utc(2026, 3, 6, 9)],
+        )
+        detached = CalendarEvent.objects.get(title='Moved')
+        self.assertEqual((detached.recurrence, detached.start_time), ('none', utc(2026, 3, 4, 11)))
+
+    def test_edit_following_splits_series(self):
+        self.edit('following', {'title': 'Late'}, utc(2026, 3, 4, 9))
+        head, tail = CalendarEvent.objects.order_by('start_time')
+        self.assertEqual((head.title, tail.title), ('Standup', 'Late'))
+        self.assertEqual(head.series_id, tail.series_id)
+        self.assertEqual(tail.recurrence_count, 3)
+        self.assertEqual(len(list(iter_occurrences(head, utc(2026, 3, 1), utc(2026, 4, 1)))), 2)
+
+    def test_edit_following_from_detached_occurrence(self):
+        self.edit('this', {'start_time': '2026-03-04T11:00:00Z', 'end_time': '2026-03-04T12:00:00Z'}, utc(2026, 3, 4, 9))
+        detached = CalendarEvent.objects.get(recurrence='none')
+        self.url = f'/api/v1/calendar-events/{detached.id}/series/'
+        self.assertEqual(self.edit('following', {'title': 'Late'}).status_code, 200)
+        events = CalendarEvent.objects.filter(owner=self.member)
+        self.assertEqual([(item.title, item.start_time) for item in occurrences_in_window(events, utc(2026, 3, 1), utc(2026, 4, 1))], [
+            ('Standup', utc(2026, 3, 2, 9)),
+            ('Standup', utc(2026, 3, 3, 9)),
+            ('Late', utc(2026, 3, 4, 11)),
+            ('Late', utc(2026, 3, 5, 9)),
+            ('Late', utc(2026, 3, 6, 9)),
+        ])
+
+    def test_recurrence_changes_are_rejected(self):
+        response = self.edit('all', {'title': 'Weekly', 'recurrence': 'weekly'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recurrence', response.json())
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.title, self.event.recurrence), ('Standup', 'daily'))
+        # Resending the current rule is not a change.
+        self.assertEqual(self.edit('all', {'recurrence': 'daily', 'recurrence_count': 5}).status_code, 200)
+
+    def test_shortening_cannot_invert_a_row(self):
+        self.edit('this', {'end_time': '2026-03-04T09:15:00Z'}, utc(2026, 3, 4, 9))
+        response = self.edit('following', {'end_time': '2026-03-03T09:30:00Z'}, utc(2026, 3, 3, 9))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end_time', response.json())
+        # The split was rolled back with the rejected update.
+        self.assertEqual(CalendarEvent.objects.exclude(recurrence='none').count(), 1)
+        self.event.refresh_from_db()
+        self.assertIsNone(self.event.recurrence_until)
+
+
+class ICalendarTests(ProjectsTestCase):
+    feed = '\r\n'.join([
+        'BEGIN:VCALENDAR',
+        'BEGIN:VEVENT',
+        'UID:standup@example.com',
+        'DTSTART:20260302T090000Z',
+        'DTEND:20260302T093000Z',
+        'SUMMARY:Standup',
+        'RRULE:FREQ=DAILY;COUNT=5',
+        'END:VEVENT',
+        'BEGIN:VEVENT',
+        'UID:standup@example.com',
+        'RECURRENCE-ID:20260304T090000Z',
+        'DTSTART:20260304T110000Z',
+        'DTEND:20260304T113000Z',
+        'SUMMARY:Late standup',
+        'END:VEVENT',
+        'BEGIN:VEVENT',
+        'UID:review@example.com',
+        'DTSTART:20260305T140000Z',
+        'DTEND:20260305T150000Z',
+        'SUMMARY:{review}',
+        'END:VEVENT',
+        'END:VCALENDAR',
+    ]) + '\r\n'
+
+    def import_feed(self, feed, **kwargs):
+        return list(import_ics(self.member, feed.splitlines(keepends=True), **kwargs))[-1]
+
+    def occurrences(self):
+        events = CalendarEvent.objects.filter(owner=self.member)
+        return [(item.title, item.start_time) for item in occurrences_in_window(events, utc(2026, 3, 1), utc(2026, 4, 1))]
+
+    def test_import_applies_overrides(self):
+        self.assertEqual(self.import_feed(self.feed.format(review='Review')), {'imported': 3, 'skipped': 0, 'done': True})
+        self.assertEqual(self.occurrences(), [
+            ('Standup', utc(2026, 3, 2, 9)),
+            ('Standup', utc(2026, 3, 3, 9)),
+            ('Late standup', utc(2026, 3, 4, 11)),
+            ('Standup', utc(2026, 3, 5, 9)),
+            ('Review', utc(2026, 3, 5, 14)),
+            ('Standup', utc(2026, 3, 6, 9)),
+        ])
+
+    def test_reimport_updates_instead_of_duplicating(self):
+        self.import_feed(self.feed.format(review='Review'))
+        first = self.occurrences()
+        # One event per batch: overrides meet their master across batches.
+        self.import_feed(self.feed.format(review='Design review'), batch_size=1)
+        self.assertEqual(CalendarEvent.objects.count(), 3)
+        self.assertEqual(self.occurrences(), [
+            (title.replace('Review', 'Design review'), start) for title, start in first
+        ])
+
+    def test_reimport_of_export(self):
+        self.make_event(title='Planning', start_time=utc(2026, 3, 9, 10), end_time=utc(2026, 3, 9, 11))
+        self.import_feed(self.feed.format(review='Review'))
+        exported = ''.join(iter_ics(CalendarEvent.objects.filter(owner=self.member)))
+        self.import_feed(exported)
+        self.assertEqual(CalendarEvent.objects.count(), 4)
+
+    def test_zoned_series_round_trips(self):
+        # 09:00 in New York, daily across the 2026-03-08 DST change.
+        event = self.make_event(
+            title='Standup', start_time=utc(2026, 3, 6, 14), end_time=utc(2026, 3, 6, 15),
+            recurrence='daily', recurrence_count=4, time_zone='America/New_York',
+            recurrence_exceptions=[utc(2026, 3, 7, 14).isoformat()],
+        )
+        exported = ''.join(iter_ics([event]))
+        self.assertIn('DTSTART;TZID=America/New_York:20260306T090000\r\n', exported)
+        self.assertIn('EXDATE;TZID=America/New_York:20260307T090000\r\n', exported)
+        self.import_feed(exported)
+        event.refresh_from_db()
+        self.assertEqual(CalendarEvent.objects.count(), 1)
+        self.assertEqual(event.time_zone, 'America/New_York')
+        self.assertEqual([start for _, start in self.occurrences()], [
+            utc(2026, 3, 6, 14), utc(2026, 3, 8, 13), utc(2026, 3, 9, 13),
+        ])
+
+    def test_utc_reimport_keeps_zone(self):
+        event = self.make_event(
+            start_time=utc(2026, 3, 6, 14), end_time=utc(2026, 3, 6, 15),
+            recurrence='daily', time_zone='America/New_York',
+        )
+        self.import_feed('\r\n'.join([
+            'BEGIN:VCALENDAR', 'BEGIN:VEVENT', f'UID:event-{event.pk}@taskflow',
+            'DTSTART:20260306T140000Z', 'DTEND:20260306T150000Z', 'SUMMARY:Standup', 'RRULE:FREQ=DAILY',
+            'END:VEVENT', 'END:VCALENDAR',
+        ]))
+        event.refresh_from_db()
+        self.assertEqual((event.title, event.time_zone), ('Standup', 'America/New_York'))
+
+    def test_export_writes_count_or_until(self):
+        event = self.make_event(
+            start_time=utc(2026, 3, 2, 9), end_time=utc(2026, 3, 2, 10),
+            recurrence='daily', recurrence_count=3, recurrence_until=utc(2026, 3, 10),
+        )
+        self.assertIn('RRULE:FREQ=DAILY;UNTIL=20260304T090000Z\r\n', ''.join(iter_ics([event])))
+        event.recurrence_until = utc(2026, 3, 3, 12)
+        self.assertIn('RRULE:FREQ=DAILY;UNTIL=20260303T120000Z\r\n', ''.join(iter_ics([event])))
+        event.recurrence_until = None
+        self.assertIn('RRULE:FREQ=DAILY;COUNT=3\r\n', ''.join(iter_ics([event])))
+
+
+class SyncTests(ProjectsTestCase):
+    url = '/api/v1/sync/'
+
+    def setUp(self):
+        super().setUp()
+        self.other_team = Team.objects.create(team_lead=self.lead, name='Platform')
+        self.other_team.members.add(self.member)
+        self.task = self.make_task(title='Shared')
+        self.watermark = self.client.get(self.url).json()['watermark']
+
+    def delta(self):
+        return self.client.get(self.url, {'updated_since': self.watermark}).json()
+
+    def test_full_snapshot_without_watermark(self):
+        data = self.client.get(self.url).json()
+        self.assertTrue(data['full'])
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.id])
+
+    def test_delta_reports_deleted_rows(self):
+        task_id = self.task.id
+        self.task.delete()
+        data = self.delta()
+        self.assertFalse(data['full'])
+        self.assertEqual(data['deleted']['tasks'], [task_id])
+
+    def test_task_moved_between_visible_teams_is_not_deleted(self):
+        self.task.team = self.other_team
+        self.task.save()
+        data = self.delta()
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.id])
+        self.assertEqual(data['deleted']['tasks'], [])
+
+    def test_task_moved_out_of_sight_is_deleted(self):
+        hidden = Team.objects.create(team_lead=self.lead, name='Hidden')
+        self.task.team = hidden
+        self.task.responsible = self.lead
+        self.task.save()
+        data = self.delta()
+        self.assertEqual(data['tasks'], [])
+        self.assertEqual(data['deleted']['tasks'], [self.task.id])
+
+
+class ETagTests(ProjectsTestCase):
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        self.make_task()
+        etag = self.get('/api/v1/tasks/')['ETag']
+        response = self.get('/api/v1/tasks/', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_with_rows(self):
+        task = self.make_task()
+        etag = self.get('/api/v1/tasks/')['ETag']
+        task.title = 'Renamed'
+        task.save()
+        self.assertEqual(self.get('/api/v1/tasks/', etag).status_code, 200)
+        etag = self.get('/api/v1/tasks/')['ETag']
+        task.delete()
+        self.assertEqual(self.get('/api/v1/tasks/', etag).status_code, 200)
+
+    def test_detail_etag(self):
+        task = self.make_task()
+        url = f'/api/v1/tasks/{task.id}/'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        task.status = 'progress'
+        task.save()
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        task = self.make_task()
+        etag = self.get(f'/api/v1/tasks/{task.id}/')['ETag']
+        self.client.force_authenticate(self.lead)
+        self.assertEqual(self.get(f'/api/v1/tasks/{task.id}/', etag).status_code, 200)
+
+    def test_dashboard_stats(self):
+        self.make_task()
+        etag = self.get('/api/v1/dashboard/')['ETag']
+        self.assertEqual(self.get('/api/v1/dashboard/', etag).status_code, 304)
+        self.make_task(title='Another')
+        self.assertEqual(self.get('/api/v1/dashboard/', etag).status_code, 200)
+
+
+class ChatSocket:
+    """Drives TeamChatConsumer through ASGI messages, like a server would."""
+
+    def __init__(self, team, user=None):
+        query = f'token={AccessToken.for_user(user)}' if user is not None else ''
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/teams/{team.id}/chat/',
+            'headers': [],
+            'query_string': query.encode('latin-1'),
+        }
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.task = asyncio.ensure_future(TeamChatConsumer()(scope, self.incoming.get, self.outgoing.put))
+
+    async def connect(self):
+        await self.incoming.put({'type': 'websocket.connect'})
+        return await self.next_event()
+
+    async def next_event(self):
+        return await asyncio.wait_for(self.outgoing.get(), timeout=5)
+
+    async def post(self, content):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps({'content': content})})
+
+    async def disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+class TeamChatTests(TransactionTestCase):
+    # Socket calls close stale connections, which would end a TestCase transaction.
+
+    def setUp(self):
+        cache.clear()
+        self.lead = User.objects.create_user('lead', 'lead@example.com', 'pass')
+        self.member = User.objects.create_user('member', 'member@example.com', 'pass')
+        self.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pass')
+        self.team = Team.objects.create(team_lead=self.lead, name='Core')
+        self.team.members.add(self.member)
+
+    async def test_unauthenticated_socket_is_refused(self):
+        event = await ChatSocket(self.team).connect()
+        self.assertEqual(event, {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+    async def test_inactive_user_is_refused(self):
+        socket = ChatSocket(self.team, self.member)
+        self.member.is_active = False
+        await sync_to_async(self.member.save)()
+        event = await socket.connect()
+        self.assertEqual(event, {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+    async def test_outsider_is_refused(self):
+        event = await ChatSocket(self.team, self.outsider).connect()
+        self.assertEqual(event, {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+    async def test_member_posts_and_receives(self):
+        socket = ChatSocket(self.team, self.member)
+        self.assertEqual(await socket.connect(), {'type': 'websocket.accept'})
+        await socket.post('Hello')
+        event = json.loads((await socket.next_event())['text'])
+        self.assertEqual((event['type'], event['message']['content']), ('message', 'Hello'))
+        await socket.disconnect()
+
+    async def test_removed_member_is_disconnected(self):
+        socket = ChatSocket(self.team, self.member)
+        await socket.connect()
+        await sync_to_async(self.team.members.remove)(self.member)
+        self.assertEqual(await socket.next_event(), {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        await socket.disconnect()
+
+    async def test_post_rechecks_access(self):
+        socket = ChatSocket(self.team, self.member)
+        await socket.connect()
+        # Revoked without a broker event, e.g. by another process.
+        await sync_to_async(TeamMembership.objects.filter(user=self.member).update)(is_active=False)
+        await socket.post('Hello')
+        self.assertEqual(await socket.next_event(), {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        await socket.disconnect()
+        self.assertFalse(await sync_to_async(TeamMessage.objects.exists)())
+
+
+class StreamingResponseTests(SimpleTestCase):
+    def chunks(self):
+        yield 'a'
+        yield 'b'
+
+    def test_wsgi_streams_sync_iterator(self):
+        response = streaming_response(RequestFactory().get('/'), self.chunks())
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response), b'ab')
+
+    async def test_asgi_streams_async_iterator(self):
+        response = streaming_response(AsyncRequestFactory().get('/'), self.chunks())
+        self.assertTrue(response.is_async)
+        self.assertEqual([part async for part in response], [b'a', b'b'])
+
+
+class SearchTests(ProjectsTestCase):
+    url = '/api/v1/search/'
+
+    def found(self, query):
+        return [(item['kind'], item['id']) for item in self.client.get(self.url, {'q': query}).json()['results']]
+
+    def test_finds_visible_rows_only(self):
+        task = self.make_task(title='Quarterly budget')
+        hidden = Team.objects.create(team_lead=self.lead, name='Hidden')
+        self.make_task(title='Secret budget', team=hidden, responsible=self.lead)
+        self.assertEqual(self.found('budget'), [('task', task.id)])
+
+    def test_index_follows_updates_and_deletes(self):
+        task = self.make_task(title='Draft')
+        task.title = 'Final'
+        task.save()
+        self.assertEqual(self.found('draft'), [])
+        self.assertEqual(self.found('final'), [('task', task.id)])
+        task.delete()
+        self.assertEqual(self.found('final'), [])
+
+    def test_tasks_of_deleted_team_become_personal(self):
+        task = self.make_task(title='Orphaned report')
+        self.team.delete()
+        self.assertEqual(self.found('orphaned'), [('task', task.id)])
+        self.client.force_authenticate(self.lead)
+        self.assertEqual(self.found('orphaned'), [])
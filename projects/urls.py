@@ -13,4 +13,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('dashboard/', views.dashboard_stats, name='dashboard-stats'),
     path('dashboard/team-stats/', views.dashboard_team_stats, name='dashboard-team-stats'),
+    path('sync/', views.sync_delta, name='sync-delta'),
+    path('search/', views.search, name='search'),
 ]
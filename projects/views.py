@@ -1,8 +1,9 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count, Q
 from django.utils import timezone
@@ -13,26 +14,41 @@ from django.views.decorators.http import require_POST
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.core.exceptions import ObjectDoesNotExist
 from urllib.parse import urlencode
-from datetime import datetime
-
+from datetime import datetime, timedelta
+import copy
+import json
+import uuid
+
+from .bulk import BulkTaskOperations
+from .etags import ConditionalGetMixin, conditional_response, make_etag, queryset_version
+from .filters import AliasedOrderingFilter, IndexedSearchFilter
 from .forms import TeamMessageForm
+from .ical import import_ics, iter_ics
 from .invitations import store_invite_code
-from .models import Category, Team, Task, Project, CalendarEvent, TeamMessage
+from .models import Category, Team, TeamMembership, Task, Project, CalendarEvent, TeamMessage
 from .serializers import (
     CategorySerializer,
     TeamListSerializer, TeamDetailSerializer,
     TaskListSerializer, TaskDetailSerializer, TaskCreateSerializer,
     ProjectListSerializer, ProjectDetailSerializer,
     CalendarEventSerializer,
+    TeamMessageSerializer,
+    TaskBulkSerializer,
+    SearchResultSerializer,
 )
+from .pagination import KeysetPagination, OccurrenceKeysetPagination, PageNumberOrKeysetPagination
+from .recurrence import MAX_EXPANSION_WINDOW, merge_busy_intervals, occurrences_in_window
+from .search import MAX_SEARCH_RESULTS, SEARCH_KINDS, search_entries, search_terms
+from .series import SERIES_SCOPES, SeriesEditError, delete_series, edit_series, is_occurrence
+from .streaming import streaming_response
+from .sync import build_delta
+from .visibility import get_visible_team_ids, visible_tasks_filter
+
 
 def _team_invite_payload(team, user):
     is_member = False
     if user.is_authenticated:
-        is_member = (
-            team.team_lead_id == user.id or
-            team.members.filter(id=user.id).exists()
-        )
+        is_member = _is_team_member(team, user)
     return {
         "id": team.id,
         "name": team.name,
@@ -45,15 +61,25 @@ def _team_invite_payload(team, user):
 
 
 def _is_team_member(team, user):
-    return team.team_lead_id == user.id or team.members.filter(id=user.id).exists()
+    if team.team_lead_id == user.id:
+        return True
+    return TeamMembership.objects.filter(team=team, user_id=user.id).exists()
 
 
 def _user_teams(user):
-    return Team.objects.filter(
-        is_active=True,
-    ).filter(
-        Q(team_lead=user) | Q(members=user)
-    ).distinct()
+    return Team.objects.filter(memberships__user=user, memberships__is_active=True)
+
+
+# Latest messages rendered with the team page; older ones load on scroll-back.
+TEAM_CHAT_HISTORY = 50
+
+
+def _messages_before(queryset, before):
+    """Messages older than message `before`, as a (created_at, id) range read."""
+    anchor = queryset.filter(pk=before).values_list('created_at', flat=True).first()
+    if anchor is None:
+        raise ValidationError({'before': 'Unknown message.'})
+    return queryset.filter(Q(created_at__lt=anchor) | Q(created_at=anchor, id__lt=before))
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -65,7 +91,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Team.objects.select_related('team_lead').prefetch_related('members').all()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -74,7 +100,7 @@ class TeamViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
 
     def get_queryset(self):
-        return _user_teams(self.request.user)
+        return _user_teams(self.request.user).select_related('team_lead').prefetch_related('members')
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -110,6 +136,20 @@ class TeamViewSet(viewsets.ModelViewSet):
         serializer = ProjectListSerializer(projects, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        team = self.get_object()
+        chat_messages = TeamMessage.objects.filter(team=team).select_related('author')
+        before = request.query_params.get('before')
+        if before:
+            if not before.isdigit():
+                raise ValidationError({'before': 'Must be a message id.'})
+            chat_messages = _messages_before(chat_messages, int(before))
+        paginator = KeysetPagination(ordering=['-created_at', '-id'])
+        page = paginator.paginate_queryset(chat_messages, request, view=self)
+        serializer = TeamMessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def invite(self, request, pk=None):
         try:
@@ -139,7 +179,7 @@ class TeamViewSet(viewsets.ModelViewSet):
         except Team.DoesNotExist:
             return Response({"detail": "Team not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if team.team_lead_id == request.user.id or team.members.filter(id=request.user.id).exists():
+        if _is_team_member(team, request.user):
             return Response({
                 "detail": "You are already a team member",
                 "team_id": team.id,
@@ -165,7 +205,7 @@ class TeamViewSet(viewsets.ModelViewSet):
         except Team.DoesNotExist:
             return Response({"detail": "Team not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if team.team_lead_id == request.user.id or team.members.filter(id=request.user.id).exists():
+        if _is_team_member(team, request.user):
             return Response({
                 "detail": "You are already a team member",
                 "team_id": team.id,
@@ -180,21 +220,19 @@ class TeamViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Task.objects.select_related('team', 'responsible', 'category').all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = PageNumberOrKeysetPagination
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, AliasedOrderingFilter]
     filterset_fields = ['status', 'priority', 'is_completed', 'team', 'responsible', 'category']
     search_fields = ['title', 'description']
+    search_kind = 'task'
     ordering_fields = ['due_date', 'priority', 'created_at', 'status']
+    ordering_aliases = {'priority': 'priority_rank'}
 
     def get_queryset(self):
-        user = self.request.user
-        user_teams = _user_teams(user)
-        return self.queryset.filter(
-            Q(team__in=user_teams) |
-            Q(team__isnull=True, responsible=user)
-        ).distinct()
+        return self.queryset.filter(visible_tasks_filter(self.request.user))
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -203,6 +241,11 @@ class TaskViewSet(viewsets.ModelViewSet):
             return TaskCreateSerializer
         return TaskDetailSerializer
 
+    def get_object_etag(self, instance):
+        # The detail payload embeds the team with its members.
+        team_version = instance.team.updated_at if instance.team_id else None
+        return make_etag(self.request.user.pk, instance.pk, instance.updated_at, team_version)
+
     def _validate_team_access(self, team, responsible):
         if team is None:
             if responsible and responsible.id != self.request.user.id and not self.request.user.is_superuser:
@@ -217,10 +260,7 @@ class TaskViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("You are not a member of this team.")
 
         if responsible:
-            is_responsible_in_team = (
-                responsible.id == team.team_lead_id or
-                team.members.filter(id=responsible.id).exists()
-            )
+            is_responsible_in_team = _is_team_member(team, responsible)
             if not is_responsible_in_team:
                 raise ValidationError({
                     "responsible": "Responsible user must belong to the selected team."
@@ -252,44 +292,72 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def reopen(self, request, pk=None):
         task = self.get_object()
-        task.is_completed = False
-        task.status = 'todo'
-        task.completed_at = None
-        task.save()
+        task.reopen()
         serializer = TaskDetailSerializer(task)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = TaskBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = BulkTaskOperations(
+            request.user,
+            self.get_queryset(),
+            serializer.validated_data['operations'],
+        ).run()
+        return Response({
+            'results': results,
+            'errors': sum(1 for result in results if result['status'] == 'error'),
+        })
+
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         today = timezone.now().date()
-        tasks = self.queryset.filter(due_date__lt=today, is_completed=False)
+        tasks = self.get_queryset().filter(due_date__lt=today, is_completed=False)
         serializer = TaskListSerializer(tasks, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def today(self, request):
         today = timezone.now().date()
-        tasks = self.queryset.filter(due_date=today)
+        tasks = self.get_queryset().filter(due_date=today)
         serializer = TaskListSerializer(tasks, many=True)
         return Response(serializer.data)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    queryset = Project.objects.select_related('team').prefetch_related('tasks').all()
+class ProjectViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Project.objects.select_related('team__team_lead').prefetch_related('team__members').all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'team']
     search_fields = ['project_title', 'description']
+    search_kind = 'project'
     ordering_fields = ['deadline', 'created_at', 'status']
 
     def get_queryset(self):
-        return self.queryset.filter(team__in=_user_teams(self.request.user)).distinct()
+        queryset = self.queryset.filter(team_id__in=get_visible_team_ids(self.request.user))
+        if self.action != 'list':
+            queryset = queryset.prefetch_related('tasks')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
             return ProjectListSerializer
         return ProjectDetailSerializer
 
+    def get_list_etag(self, *parts):
+        # Every project embeds its team with its members.
+        teams = Team.objects.filter(id__in=get_visible_team_ids(self.request.user))
+        return super().get_list_etag(*queryset_version(teams), *parts)
+
+    def get_object_etag(self, instance):
+        # The detail payload embeds the team and the linked tasks.
+        tasks_version = max((task.updated_at for task in instance.tasks.all()), default=None)
+        return make_etag(
+            self.request.user.pk, instance.pk, instance.updated_at,
+            instance.team.updated_at, tasks_version,
+        )
+
     def _validate_team_access(self, team):
         if team is None:
             raise ValidationError({"team": "Team is required."})
@@ -333,19 +401,192 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
 
 
-class CalendarEventViewSet(viewsets.ModelViewSet):
+class CalendarEventViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CalendarEvent.objects.all()
     serializer_class = CalendarEventSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
     filterset_fields = ['calendar_id']
     search_fields = ['title', 'description', 'location']
-    ordering_fields = ['start_time', 'end_time', 'created_at']
+    search_kind = 'event'
+    freebusy_max_users = 50
 
     def get_queryset(self):
-        return CalendarEvent.objects.filter(owner=self.request.user).order_by('start_time')
+        return CalendarEvent.objects.filter(owner=self.request.user).select_related('owner').order_by('start_time')
+
+    def get_window(self):
+        """
+        The [from, to) range of the request; `start`/`end` are accepted as
+        aliases. Defaults to the current month.
+        """
+        params = self.request.query_params
+        window_from = params.get('from') or params.get('start')
+        window_to = params.get('to') or params.get('end')
+        if not window_from and not window_to:
+            month_start = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            return month_start, timezone.make_aware(next_month.replace(tzinfo=None))
+        if not (window_from and window_to):
+            raise ValidationError({'detail': 'Both from and to are required.'})
+        field = serializers.DateTimeField()
+        try:
+            window = (field.to_internal_value(window_from), field.to_internal_value(window_to))
+        except serializers.ValidationError:
+            raise ValidationError({'detail': 'from and to must be ISO 8601 datetimes.'})
+        if window[0] >= window[1]:
+            raise ValidationError({'detail': 'from must be before to.'})
+        if window[1] - window[0] > MAX_EXPANSION_WINDOW:
+            raise ValidationError({'detail': f'Window must not exceed {MAX_EXPANSION_WINDOW.days} days.'})
+        return window
+
+    def list(self, request, *args, **kwargs):
+        # Every occurrence overlapping the window, recurring events expanded.
+        # The window is bounded, so the response is unpaginated unless the
+        # client opts into cursor pagination.
+        window_start, window_end = self.get_window()
+        queryset = self.filter_queryset(self.get_queryset())
+
+        def build():
+            if not PageNumberOrKeysetPagination().use_keyset(request):
+                occurrences = occurrences_in_window(queryset, window_start, window_end)
+                return Response(self.get_serializer(occurrences, many=True).data)
+            paginator = OccurrenceKeysetPagination()
+            after = paginator.get_after(request)
+            page = paginator.paginate_occurrences(occurrences_in_window(queryset, window_start, window_end, after=after))
+            return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        return conditional_response(request, self.get_list_etag(window_start, window_end), build)
+
+    @action(detail=False, methods=['get'])
+    def freebusy(self, request):
+        """
+        Busy intervals of several users over one window.
+
+        Only the requester and people sharing an active team with them can be
+        queried. Events of all users are read and expanded together and
+        merged per user in a single sweep, so no event details are returned.
+        """
+        window_start, window_end = self.get_window()
+        try:
+            user_ids = {int(value) for value in request.query_params.get('users', '').split(',') if value.strip()}
+        except ValueError:
+            raise ValidationError({'users': 'Expected a comma-separated list of user ids.'})
+        if not user_ids:
+            user_ids = {request.user.id}
+        if len(user_ids) > self.freebusy_max_users:
+            raise ValidationError({'users': f'At most {self.freebusy_max_users} users per request.'})
+
+        allowed_ids = {request.user.id} | set(
+            TeamMembership.objects.filter(
+                team__memberships__user=request.user,
+                team__memberships__is_active=True,
+                user_id__in=user_ids,
+                is_active=True,
+            ).values_list('user_id', flat=True)
+        )
+        if not (request.user.is_superuser or user_ids <= allowed_ids):
+            raise PermissionDenied("You can only see free/busy time of your team members.")
+
+        events = CalendarEvent.objects.filter(owner_id__in=user_ids)
+        busy = merge_busy_intervals(
+            occurrences_in_window(events, window_start, window_end),
+            window_start,
+            window_end,
+        )
+        field = serializers.DateTimeField()
+        return Response({
+            'from': field.to_representation(window_start),
+            'to': field.to_representation(window_end),
+            'users': [
+                {
+                    'id': user_id,
+                    'busy': [
+                        {'start': field.to_representation(start), 'end': field.to_representation(end)}
+                        for start, end in busy.get(user_id, [])
+                    ],
+                }
+                for user_id in sorted(user_ids)
+            ],
+        })
+
+    @action(detail=True, methods=['patch', 'delete'])
+    def series(self, request, pk=None):
+        """
+        Edit or delete a recurring event by scope: `this` occurrence, `following`
+        occurrences or `all` rows sharing the series_id. Recurring masters need
+        `occurrence` (the occurrence_start of the addressed occurrence).
+        """
+        event = self.get_object()
+        scope = request.query_params.get('scope', 'all')
+        if scope not in SERIES_SCOPES:
+            raise ValidationError({'scope': f'Expected one of: {", ".join(SERIES_SCOPES)}.'})
+
+        occurrence_start = event.start_time
+        if event.recurrence != 'none' and scope != 'all':
+            try:
+                occurrence_start = serializers.DateTimeField().to_internal_value(
+                    request.query_params.get('occurrence', '')
+                )
+            except serializers.ValidationError:
+                raise ValidationError({'occurrence': 'An ISO 8601 occurrence start is required.'})
+            if not is_occurrence(event, occurrence_start):
+                raise ValidationError({'occurrence': 'Not an occurrence of this event.'})
+
+        if request.method == 'DELETE':
+            delete_series(event, occurrence_start, scope)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        occurrence = copy.copy(event)
+        occurrence.end_time = occurrence_start + (event.end_time - event.start_time)
+        occurrence.start_time = occurrence_start
+        serializer = self.get_serializer(occurrence, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            updated = edit_series(event, occurrence_start, scope, serializer.validated_data)
+        except SeriesEditError as exc:
+            raise ValidationError({exc.field: str(exc)})
+        return Response({'scope': scope, 'updated': updated})
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_calendar(self, request):
+        """Stream the user's events (and visible task due dates) as an .ics file."""
+        events = self.filter_queryset(self.get_queryset()).order_by('start_time', 'pk')
+        tasks = Task.objects.none()
+        if request.query_params.get('tasks', 'true').lower() not in ('0', 'false'):
+            tasks = (
+                Task.objects.filter(visible_tasks_filter(request.user), due_date__isnull=False)
+                .only('id', 'title', 'description', 'priority', 'due_date', 'is_completed', 'updated_at')
+                .order_by('due_date', 'pk')
+            )
+        response = streaming_response(
+            request,
+            iter_ics(events.iterator(chunk_size=1000), tasks.iterator(chunk_size=1000)),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="taskflow.ics"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_calendar(self, request):
+        """
+        Import an uploaded .ics `file`. The response streams one JSON progress
+        line per stored batch; the last line has "done": true.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'An .ics file is required.'})
+        progress = import_ics(request.user, upload)
+        return streaming_response(
+            request,
+            (json.dumps(step) + '\n' for step in progress),
+            content_type='application/x-ndjson',
+        )
 
     def perform_create(self, serializer):
+        recurrence = serializer.validated_data.get('recurrence', 'none')
+        if recurrence != 'none' and not serializer.validated_data.get('series_id'):
+            serializer.save(owner=self.request.user, series_id=f'series-{uuid.uuid4().hex}')
+            return
         serializer.save(owner=self.request.user)
 
 
@@ -354,65 +595,129 @@ class CalendarEventViewSet(viewsets.ModelViewSet):
 def dashboard_stats(request):
     today = timezone.now().date()
 
-    user_teams = _user_teams(request.user)
+    team_ids = get_visible_team_ids(request.user)
 
-    visible_tasks = Task.objects.filter(
-        Q(responsible=request.user) | Q(team__in=user_teams)
-    ).distinct()
-    visible_projects = Project.objects.filter(team__in=user_teams).distinct()
+    visible_tasks = Task.objects.filter(visible_tasks_filter(request.user))
+    visible_projects = Project.objects.filter(team_id__in=team_ids)
 
-    total_tasks = visible_tasks.count()
-    completed_tasks = visible_tasks.filter(is_completed=True).count()
-    overdue_tasks = visible_tasks.filter(due_date__lt=today, is_completed=False).count()
-    in_progress_tasks = visible_tasks.filter(status='progress').count()
+    etag = make_etag(
+        request.user.pk, today, team_ids,
+        *queryset_version(visible_tasks), *queryset_version(visible_projects),
+    )
+    return conditional_response(
+        request, etag,
+        lambda: Response(_dashboard_stats_data(today, team_ids, visible_tasks, visible_projects)),
+    )
 
-    total_projects = visible_projects.count()
-    active_projects = visible_projects.filter(status='active').count()
-    total_teams = user_teams.filter(is_active=True).count()
 
-    tasks_by_priority = dict(
-        visible_tasks.values('priority')
-        .annotate(count=Count('id'))
-        .values_list('priority', 'count')
+def _dashboard_stats_data(today, team_ids, visible_tasks, visible_projects):
+    # One scan for every task counter, including the priority/status histograms.
+    task_aggregates = {
+        'total_tasks': Count('id'),
+        'completed_tasks': Count('id', filter=Q(is_completed=True)),
+        'overdue_tasks': Count('id', filter=Q(due_date__lt=today, is_completed=False)),
+        'in_progress_tasks': Count('id', filter=Q(status='progress')),
+    }
+    for priority, _ in Task.PRIORITY_CHOICES:
+        task_aggregates[f'priority_{priority}'] = Count('id', filter=Q(priority=priority))
+    for task_status, _ in Task.STATUS_CHOICES:
+        task_aggregates[f'status_{task_status}'] = Count('id', filter=Q(status=task_status))
+    task_stats = visible_tasks.aggregate(**task_aggregates)
+
+    project_stats = visible_projects.aggregate(
+        total_projects=Count('id'),
+        active_projects=Count('id', filter=Q(status='active')),
     )
 
-    tasks_by_status = dict(
-        visible_tasks.values('status')
-        .annotate(count=Count('id'))
-        .values_list('status', 'count')
-    )
+    tasks_by_priority = {
+        priority: task_stats[f'priority_{priority}']
+        for priority, _ in Task.PRIORITY_CHOICES
+        if task_stats[f'priority_{priority}']
+    }
+    tasks_by_status = {
+        task_status: task_stats[f'status_{task_status}']
+        for task_status, _ in Task.STATUS_CHOICES
+        if task_stats[f'status_{task_status}']
+    }
 
-    recent_tasks = visible_tasks.order_by('-created_at')[:5]
+    recent_tasks = visible_tasks.select_related(
+        'team', 'responsible', 'category',
+    ).order_by('-created_at')[:5]
 
     data = {
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'overdue_tasks': overdue_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'total_projects': total_projects,
-        'active_projects': active_projects,
-        'total_teams': total_teams,
+        'total_tasks': task_stats['total_tasks'],
+        'completed_tasks': task_stats['completed_tasks'],
+        'overdue_tasks': task_stats['overdue_tasks'],
+        'in_progress_tasks': task_stats['in_progress_tasks'],
+        'total_projects': project_stats['total_projects'],
+        'active_projects': project_stats['active_projects'],
+        'total_teams': len(team_ids),
         'tasks_by_priority': tasks_by_priority,
         'tasks_by_status': tasks_by_status,
         'recent_tasks': TaskListSerializer(recent_tasks, many=True).data
     }
     
-    return Response(data)
+    return data
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_delta(request):
+    """Tasks, projects and calendar events changed after ?updated_since=<watermark>."""
+    updated_since = request.query_params.get('updated_since')
+    if updated_since:
+        try:
+            updated_since = serializers.DateTimeField().to_internal_value(updated_since)
+        except serializers.ValidationError:
+            raise ValidationError({'updated_since': 'Expected the ISO 8601 watermark of a previous sync.'})
+    return Response(build_delta(request.user, updated_since or None, context={'request': request}))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """Ranked matches for ?q= across tasks, projects, team chat and calendar events."""
+    query = request.query_params.get('q', '').strip()
+    if not search_terms(query):
+        raise ValidationError({'q': 'Enter at least one word to search for.'})
+
+    kinds = request.query_params.get('kind')
+    kinds = [kind.strip() for kind in kinds.split(',')] if kinds else list(SEARCH_KINDS)
+    unknown = set(kinds) - set(SEARCH_KINDS)
+    if unknown:
+        raise ValidationError({'kind': f"Unknown kind(s): {', '.join(sorted(unknown))}."})
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_SEARCH_RESULTS)
+    except ValueError:
+        raise ValidationError({'limit': 'Must be an integer.'})
+
+    entries = search_entries(request.user, query, get_visible_team_ids(request.user), kinds, limit)
+    return Response({'query': query, 'results': SearchResultSerializer(entries, many=True).data})
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_team_stats(request):
     """Get team statistics for the authenticated user"""
-    user_teams = _user_teams(request.user).filter(is_active=True)
+    user_teams = Team.objects.filter(
+        id__in=get_visible_team_ids(request.user),
+    ).select_related(
+        'team_lead__profile',
+    ).prefetch_related(
+        'members__profile',
+    ).annotate(
+        total_tasks=Count('tasks'),
+        completed_tasks=Count('tasks', filter=Q(tasks__is_completed=True)),
+    )
     
     teams_data = []
     overall_team_total = 0
     overall_team_completed = 0
     
     for team in user_teams:
-        total_tasks = team.tasks.count()
-        completed_tasks = team.tasks.filter(is_completed=True).count()
+        total_tasks = team.total_tasks
+        completed_tasks = team.completed_tasks
         progress_percent = _safe_percent(completed_tasks, total_tasks)
         
         overall_team_total += total_tasks
@@ -476,10 +781,9 @@ def _safe_percent(completed, total):
 
 
 def _dashboard_context(user):
-    user_teams = _user_teams(user).order_by('name')
-    visible_tasks = Task.objects.filter(
-        Q(responsible=user) | Q(team__in=user_teams)
-    ).distinct()
+    team_ids = get_visible_team_ids(user)
+    user_teams = Team.objects.filter(id__in=team_ids).order_by('name')
+    visible_tasks = Task.objects.filter(visible_tasks_filter(user))
 
     personal_tasks = visible_tasks.filter(
         team__isnull=True,
@@ -487,29 +791,25 @@ def _dashboard_context(user):
     ).order_by('is_completed', 'due_date', '-created_at')
 
     team_tasks = visible_tasks.filter(
-        team__in=user_teams,
-    ).select_related('team').order_by('is_completed', 'due_date', '-created_at').distinct()
+        team_id__in=team_ids,
+    ).select_related('team').order_by('is_completed', 'due_date', '-created_at')
 
     stats = visible_tasks.aggregate(
         personal_total=Count(
             'id',
             filter=Q(team__isnull=True, responsible=user),
-            distinct=True,
         ),
         personal_completed=Count(
             'id',
             filter=Q(team__isnull=True, responsible=user, is_completed=True),
-            distinct=True,
         ),
         team_total=Count(
             'id',
-            filter=Q(team__in=user_teams),
-            distinct=True,
+            filter=Q(team_id__in=team_ids),
         ),
         team_completed=Count(
             'id',
-            filter=Q(team__in=user_teams, is_completed=True),
-            distinct=True,
+            filter=Q(team_id__in=team_ids, is_completed=True),
         ),
     )
 
@@ -581,22 +881,15 @@ def dashboard_create_task(request):
 @login_required
 @require_POST
 def dashboard_toggle_task(request, task_id):
-    user_teams = _user_teams(request.user)
     task = get_object_or_404(
-        Task.objects.filter(Q(responsible=request.user) | Q(team__in=user_teams)).distinct(),
+        Task.objects.filter(visible_tasks_filter(request.user)),
         pk=task_id,
     )
 
     if task.is_completed:
-        task.is_completed = False
-        task.status = 'todo'
-        task.completed_at = None
+        Task.objects.filter(pk=task.pk).reopen()
     else:
-        task.is_completed = True
-        task.status = 'done'
-        task.completed_at = timezone.now()
-
-    task.save(update_fields=['is_completed', 'status', 'completed_at', 'updated_at'])
+        Task.objects.filter(pk=task.pk).complete()
     next_url = (request.POST.get('next') or '').strip()
     if next_url and url_has_allowed_host_and_scheme(
         url=next_url,
@@ -644,10 +937,14 @@ def team_detail(request, team_id):
         'due_date',
         '-created_at',
     )
-    chat_messages = TeamMessage.objects.filter(team=team).select_related(
-        'author',
-        'author__profile',
+    # Newest first through teammessage_team_created, one extra row to know
+    # whether there is anything to scroll back to.
+    recent_messages = list(
+        TeamMessage.objects.filter(team=team)
+        .select_related('author')
+        .order_by('-created_at', '-id')[:TEAM_CHAT_HISTORY + 1]
     )
+    chat_messages = recent_messages[:TEAM_CHAT_HISTORY][::-1]
 
     members = list(
         team.members.select_related('profile').order_by(
@@ -680,6 +977,8 @@ def team_detail(request, team_id):
         'team_total': team_tasks.count(),
         'team_completed': team_tasks.filter(is_completed=True).count(),
         'chat_messages': chat_messages,
+        'chat_has_earlier': len(recent_messages) > TEAM_CHAT_HISTORY,
+        'chat_page_size': TEAM_CHAT_HISTORY,
         'message_form': TeamMessageForm(),
     }
     return render(request, 'team_detail.html', context)
@@ -0,0 +1,94 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+VISIBILITY_CACHE_TIMEOUT = getattr(settings, 'VISIBILITY_CACHE_TIMEOUT', 300)
+
+
+def _version_key(user_id):
+    return f'task-visibility:version:{user_id}'
+
+
+def _scope_key(user_id, version):
+    return f'task-visibility:scope:{user_id}:{version}'
+
+
+def _current_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(_version_key(user_id), version, None)
+    return version
+
+
+def _active_team_ids(user_id):
+    from .models import TeamMembership
+
+    return TeamMembership.objects.filter(user_id=user_id, is_active=True).values('team_id')
+
+
+def _list_team_ids(user_id):
+    return list(_active_team_ids(user_id).order_by('team_id').values_list('team_id', flat=True))
+
+
+def _load_scope(user_id):
+    from .models import Task
+
+    team_ids = _list_team_ids(user_id)
+    has_personal_tasks = Task.objects.filter(team__isnull=True, responsible_id=user_id).exists()
+    return {
+        'team_ids': team_ids,
+        'has_personal_tasks': has_personal_tasks,
+    }
+
+
+def get_visibility_scope(user):
+    """Cached ids of the user's active teams plus whether they own personal tasks."""
+    key = _scope_key(user.id, _current_version(user.id))
+    scope = cache.get(key)
+    if scope is None:
+        scope = _load_scope(user.id)
+        cache.set(key, scope, VISIBILITY_CACHE_TIMEOUT)
+    return scope
+
+
+def get_visible_team_ids(user):
+    if not settings.SHARED_CACHE:
+        return _list_team_ids(user.id)
+    return get_visibility_scope(user)['team_ids']
+
+
+def visible_tasks_filter(user):
+    """Team tasks of the user's active teams plus their personal (team-less) tasks."""
+    if not settings.SHARED_CACHE:
+        # Without a cache shared by every worker a membership change could not
+        # retire the other workers' copies, so the scope is a subquery instead.
+        return Q(team_id__in=_active_team_ids(user.id)) | Q(team__isnull=True, responsible_id=user.id)
+    scope = get_visibility_scope(user)
+    condition = Q(team_id__in=scope['team_ids'])
+    if scope['has_personal_tasks']:
+        condition |= Q(team__isnull=True, responsible_id=user.id)
+    return condition
+
+
+def invalidate_visibility(user_ids):
+    if not settings.SHARED_CACHE:
+        return
+    cache.set_many(
+        {_version_key(user_id): uuid.uuid4().hex for user_id in set(user_ids) if user_id},
+        None,
+    )
+
+
+def note_personal_task(user_id):
+    """Drop a cached scope that still claims the user has no personal tasks."""
+    if not settings.SHARED_CACHE:
+        return
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        return
+    scope = cache.get(_scope_key(user_id, version))
+    if scope is not None and not scope['has_personal_tasks']:
+        invalidate_visibility([user_id])
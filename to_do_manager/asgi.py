@@ -13,5 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "to_do_manager.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: the router loads models lazily.
+from projects.realtime import websocket_router  # noqa: E402
+
+application = websocket_router(django_application)
 
@@ -115,6 +115,43 @@ else:
         }
     }
 
+# Cache. The task visibility scope, the role table and JWT user snapshots are
+# invalidated through version keys kept in the cache, so they are only cached
+# when every worker shares it, i.e. with Redis (REDIS_URL). Without it they are
+# read from the database on each request and the per-process cache below only
+# serves data that does not need cross-worker invalidation.
+REDIS_URL = os.environ.get('REDIS_URL', '').strip()
+SHARED_CACHE = bool(REDIS_URL)
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds a user's cached team/task visibility scope may be reused.
+VISIBILITY_CACHE_TIMEOUT = int(os.environ.get('VISIBILITY_CACHE_TIMEOUT', '300'))
+
+# Days deleted rows are remembered for delta sync (/api/v1/sync/). Clients
+# with an older watermark get a full snapshot instead.
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Seconds a worker may reuse its snapshot of a JWT-authenticated user
+# (accounts/authentication.py). Saving the user or profile retires it early.
+JWT_USER_CACHE_TIMEOUT = int(os.environ.get('JWT_USER_CACHE_TIMEOUT', '60'))
+
+# Fan-out for team chat sockets (see projects/realtime.py). The in-process
+# broker only reaches sockets held by the same server process.
+CHAT_BROKER = os.environ.get('CHAT_BROKER', 'projects.realtime.InProcessBroker')
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -144,7 +181,7 @@ SITE_ID = 1
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -211,6 +248,14 @@ SOCIALACCOUNT_PROVIDERS = {
         },
     },
 }
+# Token exchange for /api/auth/oauth/<provider>/ (see accounts/oauth.py);
+# point an entry at a subclass to talk to a local fake provider.
+OAUTH_PROVIDERS = {
+    'google': 'accounts.oauth.GoogleProvider',
+    'github': 'accounts.oauth.GitHubProvider',
+}
+OAUTH_CONNECT_TIMEOUT = float(os.environ.get('OAUTH_CONNECT_TIMEOUT', '3'))
+OAUTH_READ_TIMEOUT = float(os.environ.get('OAUTH_READ_TIMEOUT', '5'))
 # Email (консоль для разработки)
 # ==================== EMAIL SETTINGS ====================
 # Для разработки (выводит в консоль):
@@ -243,6 +288,10 @@ SWAGGER_SETTINGS = {
 # reCAPTCHA Settings
 RECAPTCHA_PUBLIC_KEY = os.environ.get('RECAPTCHA_PUBLIC_KEY', '')
 RECAPTCHA_PRIVATE_KEY = os.environ.get('RECAPTCHA_PRIVATE_KEY', '')
+# accounts.captcha.StubCaptchaBackend verifies locally (token "pass").
+RECAPTCHA_BACKEND = os.environ.get('RECAPTCHA_BACKEND', 'accounts.captcha.RecaptchaBackend')
+RECAPTCHA_CONNECT_TIMEOUT = float(os.environ.get('RECAPTCHA_CONNECT_TIMEOUT', '2'))
+RECAPTCHA_READ_TIMEOUT = float(os.environ.get('RECAPTCHA_READ_TIMEOUT', '3'))
 
 # Для разработки (если нет ключей) - тестовые ключи Google
 # RECAPTCHA_PUBLIC_KEY = '6LeIxAcTAAAAAJcZVRqyHh71UMIEGNQ_MXjiZKhI'